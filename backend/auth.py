@@ -1,15 +1,18 @@
 
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
-import bcrypt
 import os
 
-from database import get_db
+from database import get_async_db, get_db
+from utils.passwords import hash_password, needs_rehash, verify_password as check_password
 from crud import get_user_by_email
+from utils.principals import Principal, principal_cache
+import crud_async
 
 # Configurações JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "sua-chave-secreta-super-segura-mude-em-producao")
@@ -22,12 +25,8 @@ class TokenData(BaseModel):
     email: str = None
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica senha usando bcrypt"""
-    try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception as e:
-        print(f"Erro na verificação da senha: {e}")
-        return False
+    """Verifica senha usando bcrypt (no pool dedicado de utils/passwords.py)"""
+    return check_password(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Cria token JWT"""
@@ -40,24 +39,23 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    """Verifica e decodifica token JWT"""
+def decode_token(token: str) -> dict:
+    """Verifica e decodifica token JWT (payload com `sub` e a versão `ver`)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
     except JWTError:
+        payload = {}
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
+
+def verify_token(token: str):
+    """Verifica e decodifica token JWT"""
+    return decode_token(token)["sub"]
 
 def authenticate_user(db: Session, email: str, password: str):
     """Autentica usuário"""
@@ -76,19 +74,22 @@ def authenticate_user(db: Session, email: str, password: str):
             print(f"Senha incorreta para usuário: {email}")
             return False
         
+        # Custo do bcrypt alterado (BCRYPT_ROUNDS): regravar o hash com a senha em mãos
+        if needs_rehash(user.senha_hash):
+            user.senha_hash = hash_password(password)
+            db.commit()
+        
         print(f"Autenticação bem-sucedida para: {email}")
         return user
+    except HTTPException:
+        # Pool de hashing saturado (503)
+        raise
     except Exception as e:
         print(f"Erro na autenticação: {e}")
         return False
 
-async def get_current_user(
-    token: str = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """Obter usuário atual através do token"""
-    email = verify_token(token.credentials)
-    user = get_user_by_email(db, email)
+def _authenticated_user(user, payload: dict):
+    """Validar o usuário do token (inexistente, inativo ou token de versão antiga -> 401)"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -101,17 +102,88 @@ async def get_current_user(
             detail="Usuário inativo",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("ver", 0) != (user.token_version or 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revogado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
-async def get_current_active_user(current_user = Depends(get_current_user)):
+def _cached_principal(payload: dict):
+    """Principal em cache para o token, ou None quando é preciso consultar o banco"""
+    principal = principal_cache.get(payload["sub"])
+    if principal is not None and payload.get("ver", 0) > principal.token_version:
+        # Token emitido depois de uma alteração que este processo ainda não viu
+        return None
+    return principal
+
+def _remember(payload: dict, user):
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    principal_cache.set(payload["sub"], principal)
+    return principal
+
+def get_current_user(
+    token: str = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Obter usuário atual (registro completo do banco) através do token"""
+    payload = decode_token(token.credentials)
+    user = get_user_by_email(db, payload["sub"])
+    if user is not None:
+        db.expunge(user)
+    # Encerrar a transação de leitura: a conexão volta ao pool enquanto o
+    # request espera por uma thread livre para o handler
+    db.rollback()
+    _remember(payload, user)
+    return _authenticated_user(user, payload)
+
+def get_current_principal(
+    token: str = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Obter id, role e status do usuário do token
+    
+    Caminho rápido: enquanto o principal estiver em cache (utils/principals.py)
+    nenhuma consulta é feita; a sessão só abre conexão numa falta de cache.
+    """
+    payload = decode_token(token.credentials)
+    principal = _cached_principal(payload)
+    if principal is None:
+        principal = _remember(payload, get_user_by_email(db, payload["sub"]))
+        db.rollback()
+    return _authenticated_user(principal, payload)
+
+async def get_current_principal_async(
+    token: str = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Obter id, role e status do usuário do token (routers com sessão assíncrona)"""
+    payload = decode_token(token.credentials)
+    principal = _cached_principal(payload)
+    if principal is None:
+        principal = _remember(payload, await crud_async.get_user_by_email(db, payload["sub"]))
+        await db.rollback()
+    return _authenticated_user(principal, payload)
+
+def get_current_active_user(current_user = Depends(get_current_principal)):
     """Verificar se o usuário está ativo"""
     if not current_user.ativo:
         raise HTTPException(status_code=400, detail="Usuário inativo")
     return current_user
 
+async def get_current_active_user_async(current_user = Depends(get_current_principal_async)):
+    """Verificar se o usuário está ativo (routers com sessão assíncrona)"""
+    if not current_user.ativo:
+        raise HTTPException(status_code=400, detail="Usuário inativo")
+    return current_user
+
 def require_role(allowed_roles: list):
     """Decorator para verificar se o usuário tem permissão baseada no role"""
-    async def role_checker(current_user = Depends(get_current_active_user)):
+    def role_checker(current_user = Depends(get_current_active_user)):
         from models import UserRole
         if current_user.role not in allowed_roles:
             raise HTTPException(
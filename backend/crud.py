@@ -1,31 +1,94 @@
 
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from models import User, Client, Service, Appointment, Sale, SaleItem
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import User, Client, Service, Appointment, Sale, SaleItem, CashRegister, PaymentMethod
 from schemas import UserCreate, ClientCreate, ServiceCreate, AppointmentCreate, SaleCreate
-from utils.cache import cache_client_data, cache_service_data, invalidate_client_cache, invalidate_service_cache
-import bcrypt
+from schemas import Client as ClientSchema, Sale as SaleSchema, Service as ServiceSchema
+from utils.cache import cache_client_data, cache_service_data
+from utils.availability import DayAvailability
+from utils.client_search import search_clients
+from utils.date_ranges import filter_day, filter_date_range
+from utils.pagination import paginate
+from utils.passwords import hash_password
+from utils.principals import invalidate_principal
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Perfis de carregamento (eager loading) para evitar consultas N+1
+LOAD_PROFILES = {
+    Appointment: {
+        # Calendário: nomes de serviço, cliente e barbeiro em cada evento
+        "calendar": (
+            joinedload(Appointment.servico),
+            joinedload(Appointment.cliente),
+            joinedload(Appointment.barbeiro),
+        ),
+        "listing": (),
+        "report": (
+            joinedload(Appointment.servico),
+            joinedload(Appointment.cliente),
+            joinedload(Appointment.barbeiro),
+        ),
+    },
+    Sale: {
+        # Resposta `Sale` serializa os itens
+        "listing": (
+            selectinload(Sale.itens),
+        ),
+        "report": (
+            selectinload(Sale.itens).joinedload(SaleItem.servico),
+            joinedload(Sale.vendedor),
+            joinedload(Sale.cliente),
+        ),
+        # Atividades recentes do dashboard: nomes de vendedor e cliente
+        "activity": (
+            joinedload(Sale.vendedor),
+            joinedload(Sale.cliente),
+        ),
+    },
+    Client: {
+        # Exportação LGPD: agendamentos com serviço e barbeiro
+        "export": (
+            selectinload(Client.agendamentos).joinedload(Appointment.servico),
+            selectinload(Client.agendamentos).joinedload(Appointment.barbeiro),
+        ),
+    },
+}
+
+def with_load_profile(query, model, profile: str = None):
+    """Aplicar um perfil de carregamento nomeado à consulta"""
+    if not profile:
+        return query
+    try:
+        options = LOAD_PROFILES[model][profile]
+    except KeyError:
+        raise ValueError(f"Perfil de carregamento desconhecido para {model.__name__}: {profile}")
+    return query.options(*options) if options else query
 
 # User CRUD
+
+# Campos cuja alteração invalida os tokens do usuário
+USER_ACCESS_FIELDS = {"senha_hash", "role", "email", "ativo"}
+
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(User), User.criado_em, User.id, skip, limit, cursor).all()
 
 def create_user(db: Session, user: UserCreate):
-    # Hash da senha
-    hashed_password = bcrypt.hashpw(user.senha.encode('utf-8'), bcrypt.gensalt())
-    
     db_user = User(
         nome=user.nome,
         email=user.email,
         telefone=user.telefone,
-        senha_hash=hashed_password.decode('utf-8'),
+        senha_hash=hash_password(user.senha),
         role=user.role,
         ativo=True
     )
@@ -43,36 +106,42 @@ def update_user(db: Session, user_id: int, user_update):
     
     # Se tem senha nova, fazer hash
     if 'senha' in update_data:
-        hashed_password = bcrypt.hashpw(update_data['senha'].encode('utf-8'), bcrypt.gensalt())
-        update_data['senha_hash'] = hashed_password.decode('utf-8')
-        del update_data['senha']
+        update_data['senha_hash'] = hash_password(update_data.pop('senha'))
+    
+    # Mudanças de acesso revogam os tokens já emitidos
+    previous_email = db_user.email
+    if any(
+        key in USER_ACCESS_FIELDS and getattr(db_user, key) != value
+        for key, value in update_data.items()
+    ):
+        update_data['token_version'] = (db_user.token_version or 0) + 1
     
     for key, value in update_data.items():
         setattr(db_user, key, value)
     
     db.commit()
     db.refresh(db_user)
+    invalidate_principal(previous_email, db_user.email)
     return db_user
 
 # Client CRUD
-def get_client(db: Session, client_id: int):
-    return db.query(Client).filter(Client.id == client_id).first()
+def get_client(db: Session, client_id: int, load: str = None):
+    query = with_load_profile(db.query(Client), Client, load)
+    return query.filter(Client.id == client_id).first()
 
 def get_client_by_email(db: Session, email: str):
     return db.query(Client).filter(Client.email == email).first()
 
-@cache_client_data(ttl=300)
-def get_clients(db: Session, skip: int = 0, limit: int = 100, search: str = None):
-    query = db.query(Client)
+def get_clients(db: Session, skip: int = 0, limit: int = 100, search: str = None, cursor: str = None):
     if search:
-        query = query.filter(
-            or_(
-                Client.nome.ilike(f"%{search}%"),
-                Client.email.ilike(f"%{search}%"),
-                Client.telefone.ilike(f"%{search}%")
-            )
-        )
-    return query.offset(skip).limit(limit).all()
+        # Busca pelo índice (utils/client_search.py), sem cache: cada termo digitado geraria uma chave nova.
+        # Resultados por relevância: paginação por skip, não por cursor
+        return search_clients(db, search, skip=skip, limit=limit)
+    return list_clients(db, skip=skip, limit=limit, cursor=cursor)
+
+@cache_client_data(dto=ClientSchema)
+def list_clients(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(Client), Client.criado_em, Client.id, skip, limit, cursor).all()
 
 def create_client(db: Session, client: ClientCreate):
     db_client = Client(**client.dict())
@@ -82,10 +151,6 @@ def create_client(db: Session, client: ClientCreate):
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
-    
-    # Invalidate client cache
-    invalidate_client_cache()
-    
     return db_client
 
 def update_client(db: Session, client_id: int, client_update):
@@ -106,7 +171,7 @@ def update_client(db: Session, client_id: int, client_update):
 def get_service(db: Session, service_id: int):
     return db.query(Service).filter(Service.id == service_id).first()
 
-@cache_service_data(ttl=600)
+@cache_service_data(stale_ttl=300, dto=ServiceSchema)
 def get_services(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True):
     query = db.query(Service)
     if active_only:
@@ -118,10 +183,6 @@ def create_service(db: Session, service: ServiceCreate):
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
-    
-    # Invalidate service cache
-    invalidate_service_cache()
-    
     return db_service
 
 def update_service(db: Session, service_id: int, service_update):
@@ -142,18 +203,54 @@ def update_service(db: Session, service_id: int, service_update):
 def get_appointment(db: Session, appointment_id: int):
     return db.query(Appointment).filter(Appointment.id == appointment_id).first()
 
-def get_appointments(db: Session, skip: int = 0, limit: int = 100, date_filter=None, barbeiro_id=None):
-    query = db.query(Appointment)
+def get_appointments(db: Session, skip: int = 0, limit: int = 100, date_filter=None, barbeiro_id=None, load: str = None,
+                     cursor: str = None):
+    query = with_load_profile(db.query(Appointment), Appointment, load)
     
     if date_filter:
-        query = query.filter(Appointment.data_hora.date() == date_filter)
+        query = filter_day(query, Appointment.data_hora, date_filter)
     
     if barbeiro_id:
         query = query.filter(Appointment.barbeiro_id == barbeiro_id)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Appointment.data_hora, Appointment.id, skip, limit, cursor).all()
 
-def check_appointment_conflict(db: Session, appointment: AppointmentCreate, exclude_id: int = None):
+def get_calendar_events(db: Session, year: int, month: int, barbeiro_id: int = None):
+    """
+    Agendamentos do mês para o calendário, filtrados no banco
+    Retorna linhas leves (sem objetos ORM) apenas com as colunas do calendário
+    """
+    from calendar import monthrange
+    from datetime import date
+    from models import User as UserModel
+    
+    month_start = date(year, month, 1)
+    month_end = date(year, month, monthrange(year, month)[1])
+    
+    query = db.query(
+        Appointment.id,
+        Appointment.data_hora,
+        Appointment.status,
+        Service.duracao_minutos,
+        Service.nome.label("servico"),
+        Client.nome.label("cliente"),
+        UserModel.nome.label("barbeiro")
+    ).join(
+        Service, Appointment.servico_id == Service.id
+    ).join(
+        Client, Appointment.cliente_id == Client.id
+    ).join(
+        UserModel, Appointment.barbeiro_id == UserModel.id
+    )
+    query = filter_date_range(query, Appointment.data_hora, month_start, month_end)
+    
+    if barbeiro_id:
+        query = query.filter(Appointment.barbeiro_id == barbeiro_id)
+    
+    return query.order_by(Appointment.data_hora, Appointment.id).all()
+
+def check_appointment_conflict(db: Session, appointment: AppointmentCreate, exclude_id: int = None,
+                               availability: DayAvailability = None):
     """
     Verifica se há conflito de horário para um agendamento
     Retorna informações do conflito se houver, ou None se não houver
@@ -169,49 +266,29 @@ def check_appointment_conflict(db: Session, appointment: AppointmentCreate, excl
     start_time = appointment.data_hora
     end_time = start_time + timedelta(minutes=service.duracao_minutos)
     
-    # Buscar agendamentos existentes do mesmo barbeiro no mesmo dia
-    from models import AppointmentStatus
-    query = db.query(Appointment).filter(
-        Appointment.barbeiro_id == appointment.barbeiro_id,
-        Appointment.data_hora.date() == start_time.date(),
-        Appointment.status.in_([
-            AppointmentStatus.AGENDADO,
-            AppointmentStatus.CONFIRMADO,
-            AppointmentStatus.EM_ANDAMENTO
-        ])
-    )
-    
-    # Excluir o próprio agendamento se for uma atualização
-    if exclude_id:
-        query = query.filter(Appointment.id != exclude_id)
-    
-    existing_appointments = query.all()
+    # Agenda do barbeiro no dia (uma única consulta), salvo se quem chama já a carregou
+    if (availability is None or exclude_id
+            or (availability.barbeiro_id, availability.day) != (appointment.barbeiro_id, start_time.date())):
+        availability = DayAvailability.load(
+            db, appointment.barbeiro_id, start_time.date(), exclude_id=exclude_id
+        )
     
-    # Verificar conflitos com cada agendamento existente
-    for existing in existing_appointments:
-        existing_service = existing.servico
-        existing_start = existing.data_hora
-        existing_end = existing_start + timedelta(minutes=existing_service.duracao_minutos)
-        
-        # Verificar sobreposição de horários
-        # Há conflito se:
-        # - O novo agendamento começa antes do existente terminar E
-        # - O novo agendamento termina depois do existente começar
-        if start_time < existing_end and end_time > existing_start:
-            return {
-                'barbeiro_nome': existing.barbeiro.nome,
-                'data': existing_start.strftime('%d/%m/%Y'),
-                'inicio': existing_start.strftime('%H:%M'),
-                'fim': existing_end.strftime('%H:%M'),
-                'servico': existing_service.nome,
-                'cliente': existing.cliente.nome
-            }
+    existing = availability.find_conflict(start_time, end_time)
+    if existing:
+        return {
+            'barbeiro_nome': existing.barbeiro_nome,
+            'data': existing.start.strftime('%d/%m/%Y'),
+            'inicio': existing.start.strftime('%H:%M'),
+            'fim': existing.end.strftime('%H:%M'),
+            'servico': existing.servico_nome,
+            'cliente': existing.cliente_nome
+        }
     
     return None
 
-def create_appointment(db: Session, appointment: AppointmentCreate):
-    # Verificar conflitos de agendamento
-    conflict = check_appointment_conflict(db, appointment)
+def create_appointment(db: Session, appointment: AppointmentCreate, availability: DayAvailability = None):
+    # Verificar conflitos de agendamento (na agenda já carregada pelo chamador, se informada)
+    conflict = check_appointment_conflict(db, appointment, availability=availability)
     if conflict:
         from fastapi import HTTPException
         raise HTTPException(
@@ -261,77 +338,219 @@ def update_appointment(db: Session, appointment_id: int, appointment_update):
     return db_appointment
 
 # Sale CRUD
-def get_sales(db: Session, skip: int = 0, limit: int = 100, start_date=None, end_date=None):
-    query = db.query(Sale)
+def get_sales(db: Session, skip: int = 0, limit: int = 100, start_date=None, end_date=None, load: str = "listing",
+              cursor: str = None):
+    query = with_load_profile(db.query(Sale), Sale, load)
     
-    if start_date:
-        query = query.filter(Sale.criado_em.date() >= start_date)
+    query = filter_date_range(query, Sale.criado_em, start_date, end_date)
     
-    if end_date:
-        query = query.filter(Sale.criado_em.date() <= end_date)
-    
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Sale.criado_em, Sale.id, skip, limit, cursor).all()
 
-def create_sale(db: Session, sale: SaleCreate, vendedor_id: int):
-    # Calcular total
-    total = sum(item.quantidade * item.preco_unitario for item in sale.itens)
-    total_com_desconto = total - sale.desconto
-    
-    db_sale = Sale(
-        vendedor_id=vendedor_id,
-        cliente_id=sale.cliente_id,
-        total=total_com_desconto,
-        desconto=sale.desconto,
-        metodo_pagamento=sale.metodo_pagamento,
-        observacoes=sale.observacoes
-    )
-    
-    db.add(db_sale)
-    db.flush()  # Para obter o ID
-    
-    # Adicionar itens
-    for item_data in sale.itens:
-        subtotal = item_data.quantidade * item_data.preco_unitario
-        db_item = SaleItem(
-            venda_id=db_sale.id,
-            servico_id=item_data.servico_id,
-            quantidade=item_data.quantidade,
-            preco_unitario=item_data.preco_unitario,
-            subtotal=subtotal
+CENT = Decimal("0.01")
+
+def to_cents(value) -> int:
+    """Valor em reais (float da API/banco) para centavos inteiros, arredondando meio centavo para cima"""
+    return int((Decimal(str(value)) / CENT).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+def from_cents(cents: int) -> float:
+    return float(Decimal(cents) * CENT)
+
+def _recorded_sales(db: Session, vendedor_id: int, chaves):
+    """Vendas já registradas do vendedor com as chaves de idempotência informadas"""
+    if not chaves:
+        return {}
+    sales = db.query(Sale).options(selectinload(Sale.itens)).filter(
+        Sale.vendedor_id == vendedor_id,
+        Sale.chave_idempotencia.in_(chaves)
+    ).all()
+    return {sale.chave_idempotencia: SaleSchema.model_validate(sale) for sale in sales}
+
+def _service_prices(db: Session, servico_ids):
+    """Preço cadastrado (em centavos) de cada serviço, numa única consulta IN"""
+    prices = {
+        servico_id: to_cents(preco)
+        for servico_id, preco in db.execute(select(Service.id, Service.preco).where(Service.id.in_(servico_ids)))
+    }
+    missing = sorted(set(servico_ids) - set(prices))
+    if missing:
+        from fastapi import HTTPException
+        raise HTTPException(
+            status_code=400,
+            detail=f"Serviço não encontrado: {', '.join(str(servico_id) for servico_id in missing)}"
         )
-        db.add(db_item)
-    
+    return prices
+
+def _price_sale(sale: SaleCreate, prices, vendedor_id: int, allow_price_override: bool):
+    """
+    Itens (servico_id, quantidade, preço, subtotal) e total da venda, em centavos
+
+    O preço é sempre o cadastrado; o preco_unitario enviado só vale com
+    allow_price_override (perfis autorizados), e cada preço manual é registrado
+    como warning no logger do módulo.
+    """
+    from fastapi import HTTPException
+    itens = []
+    for item in sale.itens:
+        preco = prices[item.servico_id]
+        if allow_price_override and item.preco_unitario is not None and to_cents(item.preco_unitario) != preco:
+            logger.warning(
+                "Preço manual: vendedor %s, serviço %s, cadastrado %.2f, cobrado %.2f",
+                vendedor_id, item.servico_id, from_cents(preco), item.preco_unitario,
+                extra={"vendedor_id": vendedor_id, "servico_id": item.servico_id,
+                       "preco_cadastrado": from_cents(preco), "preco_cobrado": item.preco_unitario}
+            )
+            preco = to_cents(item.preco_unitario)
+        if item.quantidade < 1 or preco < 0:
+            raise HTTPException(status_code=400, detail="Quantidade e preço dos itens devem ser positivos")
+        itens.append((item.servico_id, item.quantidade, preco, item.quantidade * preco))
+    desconto = to_cents(sale.desconto)
+    total = sum(subtotal for *_, subtotal in itens) - desconto
+    if desconto < 0 or total < 0:
+        raise HTTPException(status_code=400, detail="Desconto inválido para o total da venda")
+    return itens, desconto, total
+
+def create_sales(db: Session, sales, vendedor_id: int, allow_price_override: bool = False, _retry: bool = True):
+    """
+    Registrar várias vendas numa única transação (envio em lote dos terminais offline)
+
+    Serviços validados e preços cadastrados lidos numa consulta IN; vendas e
+    itens gravados com um INSERT em lote cada; valores somados em centavos.
+    O preco_unitario enviado é ignorado, exceto com allow_price_override.
+    Vendas com chave_idempotencia já registrada (ou repetida no lote) não são
+    gravadas de novo: a resposta traz a venda original, na mesma posição.
+    """
+    recorded = _recorded_sales(db, vendedor_id, {sale.chave_idempotencia for sale in sales if sale.chave_idempotencia})
+    pending, seen = [], set(recorded)
+    for sale in sales:
+        if sale.chave_idempotencia in seen:
+            continue
+        if sale.chave_idempotencia:
+            seen.add(sale.chave_idempotencia)
+        pending.append(sale)
+
+    created = []
+    if pending:
+        prices = _service_prices(db, {item.servico_id for sale in pending for item in sale.itens})
+        priced = [_price_sale(sale, prices, vendedor_id, allow_price_override) for sale in pending]
+        try:
+            created = _insert_sales(db, pending, priced, vendedor_id)
+        except IntegrityError:
+            db.rollback()
+            if not (_retry and seen):
+                raise
+            # Outro envio com a mesma chave gravou antes: devolver o que foi registrado
+            return create_sales(db, sales, vendedor_id, allow_price_override, _retry=False)
+        for sale in created:
+            if sale.chave_idempotencia:
+                recorded[sale.chave_idempotencia] = sale
+
+    without_key = iter([sale for sale in created if not sale.chave_idempotencia])
+    return [
+        recorded[sale.chave_idempotencia] if sale.chave_idempotencia else next(without_key)
+        for sale in sales
+    ]
+
+def _insert_sales(db: Session, sales, priced, vendedor_id: int):
+    from utils.daily_metrics import rebuild_daily_metrics
+    from utils.date_ranges import as_date
+
+    inserted = db.execute(
+        insert(Sale).returning(Sale.id, Sale.criado_em, sort_by_parameter_order=True),
+        [
+            {
+                "vendedor_id": vendedor_id,
+                "cliente_id": sale.cliente_id,
+                "total": from_cents(total),
+                "desconto": from_cents(desconto),
+                "metodo_pagamento": sale.metodo_pagamento,
+                "observacoes": sale.observacoes,
+                "chave_idempotencia": sale.chave_idempotencia,
+            }
+            for sale, (_, desconto, total) in zip(sales, priced)
+        ]
+    ).all()
+
+    item_rows = [
+        {
+            "venda_id": venda_id,
+            "servico_id": servico_id,
+            "quantidade": quantidade,
+            "preco_unitario": from_cents(preco),
+            "subtotal": from_cents(subtotal),
+        }
+        for (venda_id, _), (itens, _, _) in zip(inserted, priced)
+        for servico_id, quantidade, preco, subtotal in itens
+    ]
+    item_ids = iter([])
+    if item_rows:
+        # executemany sem RETURNING (no SQLite, RETURNING com ordem garantida vira um INSERT por linha);
+        # ids lidos em seguida, na ordem de inserção
+        db.execute(insert(SaleItem), item_rows)
+        item_ids = iter(db.execute(
+            select(SaleItem.id).where(SaleItem.venda_id.in_([venda_id for venda_id, _ in inserted]))
+            .order_by(SaleItem.venda_id, SaleItem.id)
+        ).scalars().all())
+
+    # Saldo corrente do caixa aberto do vendedor (UPDATE col = col + total, atômico)
+    cash_register = get_current_cash_register(db, vendedor_id)
+    if cash_register:
+        totals = {}
+        for sale, (_, _, total) in zip(sales, priced):
+            column = CASH_REGISTER_COLUMNS[sale.metodo_pagamento]
+            totals[column] = totals.get(column, 0) + total
+        for column, total in totals.items():
+            setattr(cash_register, column, getattr(CashRegister, column) + from_cents(total))
+
+    # INSERTs em lote não passam pelo flush: atualizar o rollup dos dias das vendas aqui
+    for day in sorted({as_date(criado_em) for _, criado_em in inserted}):
+        rebuild_daily_metrics(db.connection(), day, day, groups=["sales"])
+
     db.commit()
-    db.refresh(db_sale)
-    return db_sale
+    return [
+        SaleSchema(
+            id=venda_id,
+            vendedor_id=vendedor_id,
+            cliente_id=sale.cliente_id,
+            total=from_cents(total),
+            desconto=from_cents(desconto),
+            metodo_pagamento=sale.metodo_pagamento,
+            observacoes=sale.observacoes,
+            chave_idempotencia=sale.chave_idempotencia,
+            criado_em=criado_em,
+            itens=[
+                {
+                    "id": next(item_ids),
+                    "servico_id": servico_id,
+                    "quantidade": quantidade,
+                    "preco_unitario": from_cents(preco),
+                    "subtotal": from_cents(subtotal),
+                }
+                for servico_id, quantidade, preco, subtotal in itens
+            ],
+        )
+        for sale, (venda_id, criado_em), (itens, desconto, total) in zip(sales, inserted, priced)
+    ]
+
+def create_sale(db: Session, sale: SaleCreate, vendedor_id: int, allow_price_override: bool = False):
+    return create_sales(db, [sale], vendedor_id, allow_price_override)[0]
 
 def get_dashboard_stats(db: Session):
-    """Obter estatísticas para o dashboard"""
+    """Obter estatísticas para o dashboard (lidas do rollup daily_metrics)"""
     from datetime import date
-    from sqlalchemy import func
+    from models import AppointmentStatus
+    from utils.daily_metrics import APPOINTMENTS, SALES, metric_breakdown, metric_totals
     
-    # Contar totais
     total_clients = db.query(Client).filter(Client.ativo == True).count()
-    total_services = db.query(Service).filter(Service.ativo == True).count()
-    total_users = db.query(User).filter(User.ativo == True).count()
     
-    # Agendamentos de hoje
     today = date.today()
-    appointments_today = db.query(Appointment).filter(
-        func.date(Appointment.data_hora) == today
-    ).count()
+    appointments_today = metric_totals(db, [APPOINTMENTS], today, today)[APPOINTMENTS]["quantidade"]
     
-    # Agendamentos pendentes
-    from models import AppointmentStatus
-    appointments_pending = db.query(Appointment).filter(
-        Appointment.status == AppointmentStatus.AGENDADO
-    ).count()
+    # Agendamentos pendentes (todos os dias)
+    by_status = metric_breakdown(db, APPOINTMENTS)
+    appointments_pending = by_status.get(AppointmentStatus.AGENDADO.value, {}).get("quantidade", 0)
     
     # Faturamento do mês atual
-    current_month = today.replace(day=1)
-    monthly_revenue = db.query(func.sum(Sale.total)).filter(
-        func.date(Sale.criado_em) >= current_month
-    ).scalar() or 0.0
+    monthly_revenue = metric_totals(db, [SALES], start_date=today.replace(day=1))[SALES]["valor"]
     
     return {
         "clientes_total": total_clients,
@@ -340,7 +559,46 @@ def get_dashboard_stats(db: Session):
         "faturamento_mes": monthly_revenue
     }
 
+def recent_activities_queries(now: datetime):
+    """
+    Consultas das atividades recentes do dashboard (usadas pelo crud síncrono e assíncrono)
+    
+    Próximos agendamentos (até 5 dias) e vendas de hoje, com os nomes carregados.
+    """
+    from datetime import timedelta
+    from sqlalchemy import select
+    from models import AppointmentStatus
+    
+    appointments = with_load_profile(select(Appointment), Appointment, "calendar").where(
+        Appointment.data_hora >= now,
+        Appointment.data_hora <= now + timedelta(days=5),
+        Appointment.status.in_([
+            AppointmentStatus.AGENDADO,
+            AppointmentStatus.CONFIRMADO
+        ])
+    ).order_by(Appointment.data_hora).limit(10)
+    
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    sales = with_load_profile(select(Sale), Sale, "activity").where(
+        Sale.criado_em >= today_start
+    ).order_by(Sale.criado_em.desc()).limit(5)
+    
+    return appointments, sales
+
+def get_recent_activities(db: Session, now: datetime = None):
+    appointments_query, sales_query = recent_activities_queries(now or datetime.now())
+    return db.scalars(appointments_query).unique().all(), db.scalars(sales_query).unique().all()
+
 # Cash Register CRUD
+
+# Coluna do caixa que acumula cada método de pagamento
+CASH_REGISTER_COLUMNS = {
+    PaymentMethod.DINHEIRO: "valor_vendas_dinheiro",
+    PaymentMethod.CARTAO_DEBITO: "valor_vendas_cartao",
+    PaymentMethod.CARTAO_CREDITO: "valor_vendas_cartao",
+    PaymentMethod.PIX: "valor_vendas_pix",
+}
+
 def get_current_cash_register(db: Session, operador_id: int):
     """Obter caixa atual aberto do operador"""
     from models import CashRegister
@@ -352,7 +610,7 @@ def get_current_cash_register(db: Session, operador_id: int):
 def open_cash_register(db: Session, cash_data, operador_id: int):
     """Abrir caixa"""
     from models import CashRegister
-    from datetime import datetime
+    from sqlalchemy import func
     
     # Verificar se já existe caixa aberto
     existing = get_current_cash_register(db, operador_id)
@@ -365,7 +623,8 @@ def open_cash_register(db: Session, cash_data, operador_id: int):
     
     db_cash = CashRegister(
         operador_id=operador_id,
-        data_abertura=datetime.now(),
+        # Relógio do banco, o mesmo de Sale.criado_em (comparado em get_cash_register_sales_totals)
+        data_abertura=func.now(),
         valor_inicial=cash_data.valor_inicial,
         observacoes_abertura=cash_data.observacoes_abertura,
         status="aberto"
@@ -376,10 +635,40 @@ def open_cash_register(db: Session, cash_data, operador_id: int):
     db.refresh(db_cash)
     return db_cash
 
+def get_cash_register_sales_totals(db: Session, cash_register):
+    """Totais de vendas por coluna do caixa, desde a abertura e apenas do operador"""
+    from sqlalchemy import func
+    
+    # Abertura lida no próprio banco: compara valores gravados pelo mesmo relógio e no mesmo formato
+    data_abertura = select(CashRegister.data_abertura).where(CashRegister.id == cash_register.id).scalar_subquery()
+    rows = db.query(Sale.metodo_pagamento, func.sum(Sale.total)).filter(
+        Sale.vendedor_id == cash_register.operador_id,
+        Sale.criado_em >= data_abertura
+    ).group_by(Sale.metodo_pagamento).all()
+    
+    totals = {column: 0.0 for column in set(CASH_REGISTER_COLUMNS.values())}
+    for metodo_pagamento, total in rows:
+        totals[CASH_REGISTER_COLUMNS[metodo_pagamento]] += total or 0.0
+    return totals
+
+def get_cash_register_balance(cash_register):
+    """Saldo corrente do caixa, a partir dos totais mantidos por create_sale"""
+    dinheiro = cash_register.valor_vendas_dinheiro or 0.0
+    cartao = cash_register.valor_vendas_cartao or 0.0
+    pix = cash_register.valor_vendas_pix or 0.0
+    return {
+        "data_abertura": cash_register.data_abertura,
+        "valor_inicial": cash_register.valor_inicial,
+        "valor_vendas_dinheiro": dinheiro,
+        "valor_vendas_cartao": cartao,
+        "valor_vendas_pix": pix,
+        "total_vendas": dinheiro + cartao + pix,
+        "saldo_dinheiro": (cash_register.valor_inicial or 0.0) + dinheiro
+    }
+
 def close_cash_register(db: Session, cash_register_id: int, close_data):
     """Fechar caixa"""
-    from models import CashRegister, PaymentMethod
-    from datetime import datetime, date
+    from models import CashRegister
     from sqlalchemy import func
     
     cash_register = db.query(CashRegister).filter(CashRegister.id == cash_register_id).first()
@@ -391,41 +680,23 @@ def close_cash_register(db: Session, cash_register_id: int, close_data):
         from fastapi import HTTPException
         raise HTTPException(status_code=400, detail="Caixa já está fechado")
     
-    # Calcular valores das vendas por método de pagamento
-    today = date.today()
-    vendas_query = db.query(Sale).filter(
-        func.date(Sale.criado_em) == today
-    )
-    
-    valor_dinheiro = vendas_query.filter(
-        Sale.metodo_pagamento == PaymentMethod.DINHEIRO
-    ).with_entities(func.sum(Sale.total)).scalar() or 0.0
-    
-    valor_cartao = vendas_query.filter(
-        Sale.metodo_pagamento.in_([
-            PaymentMethod.CARTAO_DEBITO,
-            PaymentMethod.CARTAO_CREDITO
-        ])
-    ).with_entities(func.sum(Sale.total)).scalar() or 0.0
-    
-    valor_pix = vendas_query.filter(
-        Sale.metodo_pagamento == PaymentMethod.PIX
-    ).with_entities(func.sum(Sale.total)).scalar() or 0.0
+    # Vendas do operador desde a abertura deste caixa, numa única consulta agrupada
+    totals = get_cash_register_sales_totals(db, cash_register)
     
     # Atualizar dados do fechamento
-    cash_register.data_fechamento = datetime.now()
+    cash_register.data_fechamento = func.now()
     cash_register.valor_final = close_data.valor_final
     cash_register.observacoes_fechamento = close_data.observacoes_fechamento
-    cash_register.valor_vendas_dinheiro = valor_dinheiro
-    cash_register.valor_vendas_cartao = valor_cartao
-    cash_register.valor_vendas_pix = valor_pix
+    cash_register.valor_vendas_dinheiro = totals["valor_vendas_dinheiro"]
+    cash_register.valor_vendas_cartao = totals["valor_vendas_cartao"]
+    cash_register.valor_vendas_pix = totals["valor_vendas_pix"]
     cash_register.status = "fechado"
     
     db.commit()
     db.refresh(cash_register)
     return cash_register
 
-def get_cash_registers(db: Session, skip: int = 0, limit: int = 100, operador_id: int = None):
+def get_cash_registers(db: Session, skip: int = 0, limit: int = 100, operador_id: int = None, cursor: str = None):
     """Listar caixas"""
     from models import CashRegister
     query = db.query(CashRegister)
@@ -433,4 +704,4 @@ def get_cash_registers(db: Session, skip: int = 0, limit: int = 100, operador_id
     if operador_id:
         query = query.filter(CashRegister.operador_id == operador_id)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, CashRegister.data_abertura, CashRegister.id, skip, limit, cursor).all()
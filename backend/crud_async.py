@@ -0,0 +1,87 @@
+"""
+Versões assíncronas (AsyncSession) das operações do crud usadas pelos routers assíncronos
+
+Leituras simples são consultas select() com os mesmos perfis de carregamento
+(LOAD_PROFILES) do crud. Operações que já existem no crud com regras de
+negócio (conflitos de horário, rollup de métricas, LGPD) rodam a própria
+função síncrona via AsyncSession.run_sync: ela executa na conexão assíncrona,
+sem bloquear o event loop e sem duplicar a regra.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from crud import with_load_profile
+from models import Appointment, Client, Service, User, UserRole
+from schemas import AppointmentCreate, ClientCreate, Service as ServiceSchema
+from utils.availability import DayAvailability
+from utils.cache import cache_service_data
+
+# User
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
+
+async def get_barbers(db: AsyncSession, barbeiro_ids: Optional[Iterable[int]] = None) -> List[User]:
+    """Barbeiros ativos, em ordem alfabética"""
+    query = select(User).where(User.role == UserRole.BARBEIRO, User.ativo == True)
+    if barbeiro_ids:
+        query = query.where(User.id.in_(list(barbeiro_ids)))
+    return list(await db.scalars(query.order_by(User.nome)))
+
+# Client
+async def get_client_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(Client).where(Client.email == email))
+
+async def create_client(db: AsyncSession, client: ClientCreate):
+    return await db.run_sync(crud.create_client, client)
+
+# Service
+async def get_service(db: AsyncSession, service_id: int):
+    return await db.get(Service, service_id)
+
+# Mesma chave de cache de crud.get_services: as duas versões compartilham as entradas
+@cache_service_data(stale_ttl=300, dto=ServiceSchema)
+async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100, active_only: bool = True):
+    query = select(Service)
+    if active_only:
+        query = query.where(Service.ativo == True)
+    return list(await db.scalars(query.offset(skip).limit(limit)))
+
+# Appointment
+async def get_appointment(db: AsyncSession, appointment_id: int, load: str = None):
+    query = with_load_profile(select(Appointment), Appointment, load)
+    return await db.scalar(query.where(Appointment.id == appointment_id))
+
+async def create_appointment(db: AsyncSession, appointment: AppointmentCreate, load: str = "calendar",
+                             availability: DayAvailability = None):
+    """Criar agendamento (com verificação de conflito) e recarregá-lo com o perfil `load`"""
+    db_appointment = await db.run_sync(crud.create_appointment, appointment, availability)
+    return await get_appointment(db, db_appointment.id, load)
+
+async def update_appointment(db: AsyncSession, appointment_id: int, appointment_update, load: str = "calendar"):
+    db_appointment = await db.run_sync(crud.update_appointment, appointment_id, appointment_update)
+    if db_appointment is None:
+        return None
+    return await get_appointment(db, appointment_id, load)
+
+async def get_day_availability(db: AsyncSession, barbeiro_id: int, day: date) -> DayAvailability:
+    return await db.run_sync(DayAvailability.load, barbeiro_id, day)
+
+async def get_availability_range(
+    db: AsyncSession, barbeiro_ids: List[int], start_date: date, end_date: date
+) -> Dict[Tuple[int, date], DayAvailability]:
+    return await db.run_sync(DayAvailability.load_range, barbeiro_ids, start_date, end_date)
+
+# Dashboard
+async def get_dashboard_stats(db: AsyncSession):
+    return await db.run_sync(crud.get_dashboard_stats)
+
+async def get_recent_activities(db: AsyncSession, now: Optional[datetime] = None):
+    """Próximos agendamentos (5 dias) e vendas de hoje, com os relacionamentos carregados"""
+    appointments_query, sales_query = crud.recent_activities_queries(now or datetime.now())
+    appointments = (await db.scalars(appointments_query)).unique().all()
+    sales = (await db.scalars(sales_query)).unique().all()
+    return appointments, sales
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -14,19 +15,34 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./barbearia.db")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     """Optimize SQLite performance with PRAGMA settings"""
     if isinstance(dbapi_connection, sqlite3.Connection):
-        cursor = dbapi_connection.cursor()
-        # Enable WAL mode for better concurrency
-        cursor.execute("PRAGMA journal_mode=WAL")
-        # Enable foreign key constraints
-        cursor.execute("PRAGMA foreign_keys=ON")
-        # Optimize SQLite performance
-        cursor.execute("PRAGMA synchronous=NORMAL")
-        cursor.execute("PRAGMA cache_size=1000")
-        cursor.execute("PRAGMA temp_store=memory")
-        cursor.close()
+        apply_sqlite_pragmas(dbapi_connection)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """PRAGMAs for every SQLite connection (sqlite3 or aiosqlite)"""
+    cursor = dbapi_connection.cursor()
+    # Enable WAL mode for better concurrency
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Enable foreign key constraints
+    cursor.execute("PRAGMA foreign_keys=ON")
+    # Optimize SQLite performance
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=1000")
+    cursor.execute("PRAGMA temp_store=memory")
+    cursor.close()
+
+# Connection pool size; keep it at least THREADPOOL_SIZE (utils/threadpool.py)
+# so handler threads do not wait on each other for a connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
 
 # Handle SQLite URL format for SQLAlchemy with optimizations
 if DATABASE_URL.startswith("sqlite"):
+    if ":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:":
+        # An in-memory database only exists inside its single connection
+        pool_options = {"poolclass": StaticPool}
+    else:
+        # One connection per handler thread: a shared connection would mix
+        # the transactions of concurrent requests
+        pool_options = {"pool_size": DB_POOL_SIZE, "max_overflow": 0}
     engine = create_engine(
         DATABASE_URL, 
         connect_args={
@@ -34,14 +50,14 @@ if DATABASE_URL.startswith("sqlite"):
             "timeout": 5
         },
         pool_pre_ping=True,
-        poolclass=StaticPool,
-        echo=True  # Enable SQL logging to debug issues
+        echo=True,  # Enable SQL logging to debug issues
+        **pool_options
     )
 else:
     # PostgreSQL optimizations for production
     engine = create_engine(
         DATABASE_URL,
-        pool_size=20,
+        pool_size=DB_POOL_SIZE,
         max_overflow=0,
         pool_pre_ping=True,
         pool_recycle=300,
@@ -59,3 +75,87 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async engine (aiosqlite / asyncpg) for routers selected in ASYNC_DB_ROUTERS.
+# Same database and models; created on first use so the async drivers are
+# only needed when some router uses them.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+_async_engine = None
+_async_sessionmaker = None
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """URL do mesmo banco com o driver asyncio correspondente"""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+def get_async_engine() -> AsyncEngine:
+    """Engine assíncrona compartilhada (criada no primeiro uso)"""
+    global _async_engine
+    if _async_engine is None:
+        if DATABASE_URL.startswith("sqlite"):
+            _async_engine = create_async_engine(
+                async_database_url(),
+                connect_args={"timeout": 5},
+                pool_pre_ping=True,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=0
+            )
+            event.listen(_async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        else:
+            _async_engine = create_async_engine(
+                async_database_url(),
+                pool_size=DB_POOL_SIZE,
+                max_overflow=0,
+                pool_pre_ping=True,
+                pool_recycle=300
+            )
+    return _async_engine
+
+def AsyncSessionLocal():
+    """Nova AsyncSession (objetos continuam legíveis após o commit, sem I/O implícito)"""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        _async_sessionmaker = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker()
+
+async def dispose_async_engine():
+    """Fechar as conexões da engine assíncrona (no encerramento da aplicação)"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco de dados"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def ensure_columns(bind=None):
+    """Adicionar colunas declaradas nos modelos que ainda não existem em tabelas já criadas"""
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateColumn
+    
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+def ensure_indexes(bind=None):
+    """Criar índices declarados nos modelos que ainda não existem em tabelas já criadas"""
+    bind = bind or engine
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
@@ -5,24 +5,37 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
+import os
 import time
 from typing import Callable
 from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
 
-from database import engine, Base
-from routes import auth, users, clients, services, appointments, pos, dashboard, cash, public, reports
+from database import engine, Base, dispose_async_engine, ensure_columns, ensure_indexes
+from routes import auth, users, clients, services, appointments, pos, dashboard, cash, public, reports, exports
+from routes import dashboard_async, public_async
 from utils.rate_limiter import rate_limit_middleware
 from utils.security import security_validation_middleware
+from utils.query_counter import query_budget_middleware
+from utils.daily_metrics import ensure_daily_metrics
+from utils.client_search import ensure_client_search
+from utils.threadpool import configure_threadpool, get_threadpool_stats
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+ensure_columns(engine)
+ensure_indexes(engine)
+ensure_daily_metrics(engine)
+ensure_client_search(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Sistema de Gestão de Barbearia iniciado!")
+    threads = configure_threadpool()
+    print(f"🚀 Sistema de Gestão de Barbearia iniciado! ({threads} threads para handlers síncronos)")
     yield
     # Shutdown
+    await dispose_async_engine()
     print("📴 Sistema encerrado!")
 
 app = FastAPI(
@@ -51,6 +64,9 @@ app.middleware("http")(rate_limit_middleware)
 # Security validation middleware - FIXED
 app.middleware("http")(security_validation_middleware)
 
+# SQL query budget (enabled via SQL_QUERY_BUDGET, used by the test suite)
+app.middleware("http")(query_budget_middleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -58,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Export-Watermark"],
 )
 
 # Health endpoint (must be before static files mount)
@@ -71,12 +88,14 @@ async def system_stats():
     """Estatísticas do sistema para monitoramento"""
     from utils.cache import cache
     from utils.rate_limiter import get_rate_limit_stats
+    from utils.passwords import get_password_hashing_stats
+    from utils.principals import principal_cache
     import psutil
     import os
     
     try:
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # System metrics (cpu_percent samples for 1s, so keep it off the event loop)
+        cpu_percent = await run_in_threadpool(psutil.cpu_percent, interval=1)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
@@ -91,6 +110,9 @@ async def system_stats():
             },
             "cache": cache.get_stats(),
             "rate_limiting": get_rate_limit_stats(),
+            "threadpool": get_threadpool_stats(),
+            "password_hashing": get_password_hashing_stats(),
+            "auth_principals": principal_cache.get_stats(),
             "process_id": os.getpid()
         }
     except ImportError:
@@ -99,20 +121,32 @@ async def system_stats():
             "status": "OK",
             "message": "System monitoring limited - psutil not available",
             "cache": cache.get_stats(),
-            "rate_limiting": get_rate_limit_stats()
+            "rate_limiting": get_rate_limit_stats(),
+            "threadpool": get_threadpool_stats(),
+            "password_hashing": get_password_hashing_stats(),
+            "auth_principals": principal_cache.get_stats()
         }
 
 # Routes
+# Routers served with AsyncSession instead of the threadpool, e.g. ASYNC_DB_ROUTERS=public,dashboard
+ASYNC_DB_ROUTERS = {name.strip() for name in os.getenv("ASYNC_DB_ROUTERS", "").split(",") if name.strip()}
+ASYNC_ROUTER_MODULES = {"dashboard": dashboard_async, "public": public_async}
+
+def select_router(name: str, module):
+    """Versão assíncrona do router quando listada em ASYNC_DB_ROUTERS"""
+    return ASYNC_ROUTER_MODULES[name].router if name in ASYNC_DB_ROUTERS else module.router
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(users.router, prefix="/api/users", tags=["Usuários"])
 app.include_router(clients.router, prefix="/api/clients", tags=["Clientes"])
 app.include_router(services.router, prefix="/api/services", tags=["Serviços"])
 app.include_router(appointments.router, prefix="/api/appointments", tags=["Agendamentos"])
 app.include_router(pos.router, prefix="/api/pos", tags=["Ponto de Venda"])
-app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(select_router("dashboard", dashboard), prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(cash.router, prefix="/api/cash", tags=["Caixa"])
-app.include_router(public.router, prefix="/api/public", tags=["Agendamento Público"])
+app.include_router(select_router("public", public), prefix="/api/public", tags=["Agendamento Público"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Relatórios"])
+app.include_router(exports.router, prefix="/api/exports", tags=["Exportação"])
 
 # Static files for frontend (must be last)
 # app.mount("/", StaticFiles(directory="../frontend/build", html=True), name="frontend")
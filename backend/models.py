@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, Float, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -32,6 +32,8 @@ class User(Base):
     senha_hash = Column(String(255), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.RECEPCIONISTA)
     ativo = Column(Boolean, default=True)
+    # Incrementada quando senha, role, email ou status mudam: tokens com versão anterior deixam de valer
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
     atualizado_em = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -41,17 +43,25 @@ class User(Base):
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Autocomplete: nome / telefone começando com o texto digitado
+        Index("ix_clients_nome_normalizado", "nome_normalizado"),
+        Index("ix_clients_telefone_digitos", "telefone_digitos"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True)
     telefone = Column(String(20), nullable=False)
+    # Chaves de busca derivadas de nome e telefone (mantidas por utils/client_search.py)
+    nome_normalizado = Column(String(100))
+    telefone_digitos = Column(String(20))
     cpf = Column(String(14), unique=True)
     data_nascimento = Column(DateTime)
     endereco = Column(Text)
     observacoes = Column(Text)
     ativo = Column(Boolean, default=True)
-    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    criado_em = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     atualizado_em = Column(DateTime(timezone=True), onupdate=func.now())
 
     # LGPD
@@ -79,12 +89,17 @@ class Service(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Agenda do barbeiro e filtros por status em intervalos de data/hora
+        Index("ix_appointments_barbeiro_data_hora", "barbeiro_id", "data_hora"),
+        Index("ix_appointments_status_data_hora", "status", "data_hora"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
     barbeiro_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     servico_id = Column(Integer, ForeignKey("services.id"), nullable=False)
-    data_hora = Column(DateTime, nullable=False)
+    data_hora = Column(DateTime, nullable=False, index=True)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.AGENDADO)
     observacoes = Column(Text)
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
@@ -97,6 +112,14 @@ class Appointment(Base):
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Faturamento por período e método de pagamento
+        Index("ix_sales_criado_em_metodo_pagamento", "criado_em", "metodo_pagamento"),
+        # Vendas do operador desde a abertura do caixa
+        Index("ix_sales_vendedor_criado_em", "vendedor_id", "criado_em"),
+        # Reenvios do mesmo terminal (mesma chave) não duplicam a venda
+        Index("ix_sales_vendedor_chave_idempotencia", "vendedor_id", "chave_idempotencia", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vendedor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -105,6 +128,7 @@ class Sale(Base):
     desconto = Column(Float, default=0)
     metodo_pagamento = Column(Enum(PaymentMethod), nullable=False)
     observacoes = Column(Text)
+    chave_idempotencia = Column(String(64))
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -131,7 +155,7 @@ class CashRegister(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     operador_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    data_abertura = Column(DateTime, nullable=False)
+    data_abertura = Column(DateTime, nullable=False, server_default=func.now())
     data_fechamento = Column(DateTime)
     valor_inicial = Column(Float, default=0.0)
     valor_final = Column(Float)
@@ -144,4 +168,18 @@ class CashRegister(Base):
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
-    operador = relationship("User")
\ No newline at end of file
+    operador = relationship("User")
+
+class DailyMetric(Base):
+    """Agregados diários mantidos por utils/daily_metrics.py"""
+    __tablename__ = "daily_metrics"
+    __table_args__ = (
+        # Totais de uma métrica por período
+        Index("ix_daily_metrics_metrica_dia", "metrica", "dia"),
+    )
+
+    dia = Column(Date, primary_key=True)
+    metrica = Column(String(40), primary_key=True)
+    chave = Column(String(40), primary_key=True, default="")
+    valor = Column(Float, nullable=False, default=0.0)
+    quantidade = Column(Integer, nullable=False, default=0)
@@ -1,23 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import date
+from datetime import date, timedelta
+import hashlib
+import json
+import re
 
 from database import get_db
 from schemas import Appointment, AppointmentCreate, AppointmentUpdate
-from crud import get_appointments, get_appointment, create_appointment, update_appointment
+from crud import get_appointments, get_appointment, create_appointment, update_appointment, get_calendar_events
 from auth import get_current_active_user
-from models import User, UserRole
+from models import User, UserRole, Appointment as AppointmentModel
 from utils.notifications import send_appointment_notification
+from utils.pagination import set_next_cursor
 
 router = APIRouter()
 
+# Entity-tags de um If-None-Match: "*" ou lista de tags (fracas ou fortes) separadas por vírgula
+ENTITY_TAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110): ignora o prefixo W/ dos dois lados"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(tag == "*" or tag.removeprefix("W/") == opaque for tag in ENTITY_TAG.findall(if_none_match))
+
 @router.get("/", response_model=List[Appointment])
-async def read_appointments(
+def read_appointments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     date_filter: Optional[date] = None,
     barbeiro_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -26,10 +42,14 @@ async def read_appointments(
     if current_user.role == UserRole.BARBEIRO:
         barbeiro_id = current_user.id
     
-    return get_appointments(db, skip=skip, limit=limit, date_filter=date_filter, barbeiro_id=barbeiro_id)
+    appointments = get_appointments(
+        db, skip=skip, limit=limit, date_filter=date_filter, barbeiro_id=barbeiro_id, cursor=cursor
+    )
+    set_next_cursor(response, appointments, AppointmentModel.data_hora, limit)
+    return appointments
 
 @router.get("/{appointment_id}", response_model=Appointment)
-async def read_appointment(
+def read_appointment(
     appointment_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -46,7 +66,7 @@ async def read_appointment(
     return db_appointment
 
 @router.post("/", response_model=Appointment)
-async def create_new_appointment(
+def create_new_appointment(
     appointment: AppointmentCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -63,7 +83,7 @@ async def create_new_appointment(
     return db_appointment
 
 @router.put("/{appointment_id}", response_model=Appointment)
-async def update_existing_appointment(
+def update_existing_appointment(
     appointment_id: int,
     appointment_update: AppointmentUpdate,
     db: Session = Depends(get_db),
@@ -90,33 +110,46 @@ async def update_existing_appointment(
     return updated_appointment
 
 @router.get("/calendar/{year}/{month}")
-async def get_calendar_appointments(
+def get_calendar_appointments(
     year: int,
     month: int,
+    request: Request,
     barbeiro_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obter agendamentos para visualização de calendário"""
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mês inválido")
+    # Limites do mês calculados com date(): fora de 1..9998 estouram o intervalo do tipo
+    if not 1 <= year <= 9998:
+        raise HTTPException(status_code=400, detail="Ano inválido")
+    
     # Se for barbeiro, mostrar apenas seus agendamentos
     if current_user.role == UserRole.BARBEIRO:
         barbeiro_id = current_user.id
     
-    # Buscar agendamentos do mês
-    appointments = get_appointments(db, limit=1000, barbeiro_id=barbeiro_id)
+    # Buscar agendamentos do mês (filtro e projeção feitos no banco)
+    calendar_events = [
+        {
+            "id": event.id,
+            "title": f"{event.servico} - {event.cliente}",
+            "start": event.data_hora.isoformat(),
+            "end": (event.data_hora + timedelta(minutes=event.duracao_minutos)).isoformat(),
+            "status": event.status.value,
+            "barbeiro": event.barbeiro,
+            "cliente": event.cliente,
+            "servico": event.servico
+        }
+        for event in get_calendar_events(db, year, month, barbeiro_id=barbeiro_id)
+    ]
+    
+    # ETag para que atualizações periódicas sem mudanças custem um 304
+    body = json.dumps(calendar_events, ensure_ascii=False, separators=(",", ":"))
+    etag = f'W/"{hashlib.md5(body.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
     
-    # Filtrar por mês/ano e formatar para calendário
-    calendar_events = []
-    for appointment in appointments:
-        if appointment.data_hora.year == year and appointment.data_hora.month == month:
-            calendar_events.append({
-                "id": appointment.id,
-                "title": f"{appointment.servico.nome} - {appointment.cliente.nome}",
-                "start": appointment.data_hora.isoformat(),
-                "status": appointment.status.value,
-                "barbeiro": appointment.barbeiro.nome,
-                "cliente": appointment.cliente.nome,
-                "servico": appointment.servico.nome
-            })
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    return calendar_events
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -5,14 +5,14 @@ from datetime import timedelta
 
 from database import get_db
 from schemas import Token, Login, User as UserSchema, UserCreate
-from auth import authenticate_user, create_access_token, get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import authenticate_user, create_access_token, get_current_active_user, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
 from crud import create_user, get_user_by_email
 from models import UserRole
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-async def login(login_data: Login, db: Session = Depends(get_db)):
+def login(login_data: Login, db: Session = Depends(get_db)):
     """Login do usuário"""
     try:
         print(f"Tentativa de login: email={login_data.email}")
@@ -28,7 +28,7 @@ async def login(login_data: Login, db: Session = Depends(get_db)):
         print(f"Login bem-sucedido para: {login_data.email}")
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "ver": user.token_version or 0}, expires_delta=access_token_expires
         )
         
         return {"access_token": access_token, "token_type": "bearer"}
@@ -43,7 +43,7 @@ async def login(login_data: Login, db: Session = Depends(get_db)):
         )
 
 @router.post("/register", response_model=UserSchema)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Registro de novo usuário (apenas admin pode criar usuários)"""
     # Verificar se já existe usuário com este email
     db_user = get_user_by_email(db, user_data.email)
@@ -57,16 +57,16 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return create_user(db, user_data)
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: UserSchema = Depends(get_current_active_user)):
+def read_users_me(current_user: UserSchema = Depends(get_current_user)):
     """Obter dados do usuário atual"""
     return current_user
 
 @router.post("/refresh")
-async def refresh_token(current_user: UserSchema = Depends(get_current_active_user)):
+def refresh_token(current_user: UserSchema = Depends(get_current_active_user)):
     """Renovar token de acesso"""
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": current_user.email}, expires_delta=access_token_expires
+        data={"sub": current_user.email, "ver": current_user.token_version or 0}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
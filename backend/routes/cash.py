@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from database import get_db
 from schemas import CashRegister, CashRegisterOpen, CashRegisterClose
@@ -8,15 +8,17 @@ from crud import (
     get_current_cash_register, 
     open_cash_register, 
     close_cash_register, 
-    get_cash_registers
+    get_cash_registers,
+    get_cash_register_balance
 )
 from auth import get_current_active_user
-from models import User, UserRole
+from models import User, UserRole, CashRegister as CashRegisterModel
+from utils.pagination import set_next_cursor
 
 router = APIRouter()
 
 @router.get("/current", response_model=CashRegister)
-async def get_current_cash(
+def get_current_cash(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -27,7 +29,7 @@ async def get_current_cash(
     return cash_register
 
 @router.post("/open", response_model=CashRegister)
-async def open_cash(
+def open_cash(
     cash_data: CashRegisterOpen,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -36,7 +38,7 @@ async def open_cash(
     return open_cash_register(db, cash_data, current_user.id)
 
 @router.put("/{cash_register_id}/close", response_model=CashRegister)
-async def close_cash(
+def close_cash(
     cash_register_id: int,
     close_data: CashRegisterClose,
     db: Session = Depends(get_db),
@@ -51,25 +53,33 @@ async def close_cash(
     return close_cash_register(db, cash_register_id, close_data)
 
 @router.get("/", response_model=List[CashRegister])
-async def list_cash_registers(
+def list_cash_registers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Listar caixas"""
     # Se não for admin, mostrar apenas os próprios caixas
     operador_id = None if current_user.role == UserRole.ADMIN else current_user.id
-    return get_cash_registers(db, skip=skip, limit=limit, operador_id=operador_id)
+    cash_registers = get_cash_registers(db, skip=skip, limit=limit, operador_id=operador_id, cursor=cursor)
+    set_next_cursor(response, cash_registers, CashRegisterModel.data_abertura, limit)
+    return cash_registers
 
 @router.get("/status")
-async def get_cash_status(
+def get_cash_status(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Verificar status do caixa (aberto/fechado)"""
+    """Verificar status do caixa (aberto/fechado) e saldo corrente"""
     cash_register = get_current_cash_register(db, current_user.id)
-    return {
+    status = {
         "has_open_cash": cash_register is not None,
         "cash_register_id": cash_register.id if cash_register else None
-    }
\ No newline at end of file
+    }
+    if cash_register:
+        # Totais mantidos a cada venda, sem varrer a tabela de vendas
+        status.update(get_cash_register_balance(cash_register))
+    return status
\ No newline at end of file
@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from database import get_db
-from schemas import Client, ClientCreate, ClientUpdate
+from schemas import Client, ClientCreate, ClientSuggestion, ClientUpdate, ImportResult
 from crud import get_clients, get_client, create_client, update_client
-from auth import get_current_active_user
-from models import User
+from utils.client_search import autocomplete_clients
+from utils.bulk_import import detect_format, import_file
+from auth import get_current_active_user, require_role
+from models import User, UserRole, Client as ClientModel
+from utils.pagination import set_next_cursor
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Client])
-async def read_clients(
+def read_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Listar clientes com busca opcional"""
-    return get_clients(db, skip=skip, limit=limit, search=search)
+    """Listar clientes com busca opcional (por relevância quando há busca)"""
+    clients = get_clients(db, skip=skip, limit=limit, search=search, cursor=cursor)
+    if not search:
+        set_next_cursor(response, clients, ClientModel.criado_em, limit)
+    return clients
+
+@router.get("/autocomplete", response_model=List[ClientSuggestion])
+def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Sugestões de clientes cujo nome (ou telefone) começa com o texto digitado"""
+    return autocomplete_clients(db, q, limit=limit)
 
 @router.get("/{client_id}", response_model=Client)
-async def read_client(
+def read_client(
     client_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -34,7 +52,7 @@ async def read_client(
     return db_client
 
 @router.post("/", response_model=Client)
-async def create_new_client(
+def create_new_client(
     client: ClientCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -42,8 +60,26 @@ async def create_new_client(
     """Criar novo cliente"""
     return create_client(db, client)
 
+@router.post("/import", response_model=ImportResult)
+def import_clients(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, regex="^(csv|json|ndjson)$", description="Padrão: pela extensão do arquivo"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.RECEPCIONISTA]))
+):
+    """
+    Importar clientes em lote (CSV, JSON ou NDJSON)
+
+    Colunas iguais às do cadastro. Linhas inválidas ou com email/CPF já
+    cadastrado são ignoradas e listadas em **errors** com o número da linha.
+    """
+    try:
+        return import_file(db, "clients", file.file, format or detect_format(file.filename))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Arquivo inválido: {exc}")
+
 @router.put("/{client_id}", response_model=Client)
-async def update_existing_client(
+def update_existing_client(
     client_id: int,
     client_update: ClientUpdate,
     db: Session = Depends(get_db),
@@ -56,7 +92,7 @@ async def update_existing_client(
     return db_client
 
 @router.delete("/{client_id}")
-async def deactivate_client(
+def deactivate_client(
     client_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from datetime import date, datetime, timedelta
 
 from database import get_db
 from schemas import DashboardStats
-from crud import get_dashboard_stats
+from crud import get_dashboard_stats, get_recent_activities as crud_recent_activities
 from auth import get_current_active_user
 from utils.cache import cache_dashboard_stats
 from models import User
@@ -12,50 +11,15 @@ from models import User
 router = APIRouter()
 
 @router.get("/stats", response_model=DashboardStats)
-async def read_dashboard_stats(
+def read_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obter estatísticas do dashboard"""
     return get_dashboard_stats(db)
 
-@router.get("/recent-activities")
-@cache_dashboard_stats(ttl=120)  # Cache for 2 minutes
-async def get_recent_activities(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Obter atividades recentes para o dashboard"""
-    from datetime import datetime, timedelta
-    from models import Appointment, Sale, AppointmentStatus
-    from sqlalchemy.orm import joinedload
-    
-    # Últimos agendamentos (próximos 5 dias)
-    today = datetime.now()
-    five_days_ahead = today + timedelta(days=5)
-    
-    recent_appointments = db.query(Appointment).options(
-        joinedload(Appointment.cliente),
-        joinedload(Appointment.barbeiro),
-        joinedload(Appointment.servico)
-    ).filter(
-        Appointment.data_hora >= today,
-        Appointment.data_hora <= five_days_ahead,
-        Appointment.status.in_([
-            AppointmentStatus.AGENDADO,
-            AppointmentStatus.CONFIRMADO
-        ])
-    ).order_by(Appointment.data_hora).limit(10).all()
-    
-    # Últimas vendas (hoje)
-    today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
-    recent_sales = db.query(Sale).options(
-        joinedload(Sale.vendedor),
-        joinedload(Sale.cliente)
-    ).filter(
-        Sale.criado_em >= today_start
-    ).order_by(Sale.criado_em.desc()).limit(5).all()
-    
+def recent_activities_response(appointments, sales) -> dict:
+    """Resposta de /recent-activities (compartilhada com o router assíncrono)"""
     return {
         "agendamentos": [
             {
@@ -66,7 +30,7 @@ async def get_recent_activities(
                 "data_hora": apt.data_hora.isoformat(),
                 "status": apt.status.value
             }
-            for apt in recent_appointments
+            for apt in appointments
         ],
         "vendas": [
             {
@@ -77,6 +41,17 @@ async def get_recent_activities(
                 "metodo_pagamento": sale.metodo_pagamento.value,
                 "criado_em": sale.criado_em.isoformat()
             }
-            for sale in recent_sales
+            for sale in sales
         ]
     }
+
+@router.get("/recent-activities")
+# Invalidated by writes to the tables read; the TTL only bounds how long "today" / "next 5 days" stay fixed
+@cache_dashboard_stats(ttl=300, stale_ttl=60, tables=("appointments", "sales", "clients", "users", "services"))
+def get_recent_activities(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Obter atividades recentes para o dashboard"""
+    # Próximos agendamentos (5 dias) e vendas de hoje
+    return recent_activities_response(*crud_recent_activities(db))
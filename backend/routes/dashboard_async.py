@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from schemas import DashboardStats
+import crud_async
+from auth import get_current_active_user_async
+from utils.cache import cache_dashboard_stats
+from models import User
+from routes.dashboard import recent_activities_response
+
+# Mesmos endpoints de routes/dashboard.py com AsyncSession (ativado por ASYNC_DB_ROUTERS)
+router = APIRouter()
+
+@router.get("/stats", response_model=DashboardStats)
+async def read_dashboard_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obter estatísticas do dashboard"""
+    return await crud_async.get_dashboard_stats(db)
+
+@router.get("/recent-activities")
+# Mesma chave de cache do router síncrono
+@cache_dashboard_stats(ttl=300, stale_ttl=60, tables=("appointments", "sales", "clients", "users", "services"))
+async def get_recent_activities(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obter atividades recentes para o dashboard"""
+    return recent_activities_response(*await crud_async.get_recent_activities(db))
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Optional
+
+from database import get_db
+from auth import require_role
+from models import User, UserRole
+from utils.exports import EXPORTS, MEDIA_TYPES, export_query, export_watermark, iter_export
+
+router = APIRouter()
+
+@router.get("/{entity}")
+def export_entity(
+    entity: str,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="Formato (ndjson ou csv)"),
+    start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    updated_since: Optional[datetime] = Query(None, description="Apenas registros criados/alterados desde"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Exportar clientes, agendamentos ou vendas em streaming
+
+    - **entity**: clients, appointments ou sales
+    - **start_date** / **end_date**: período (data do cadastro, do agendamento ou da venda)
+    - **updated_since**: sincronização incremental; use o X-Export-Watermark da resposta anterior
+    """
+    if entity not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
+
+    watermark = export_watermark(db)
+    query = export_query(entity, start_date=start_date, end_date=end_date, updated_since=updated_since)
+    filename = f"{entity}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        iter_export(db.get_bind(), query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Watermark": watermark.isoformat()
+        }
+    )
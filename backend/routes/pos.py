@@ -1,39 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 
 from database import get_db
-from schemas import Sale, SaleCreate
-from crud import create_sale, get_sales
+from schemas import Sale, SaleBatchCreate, SaleCreate
+from crud import create_sale, create_sales, get_sales
 from auth import get_current_active_user
-from models import User
+from models import User, UserRole, Sale as SaleModel
+from utils.pagination import set_next_cursor
 
 router = APIRouter()
 
+# Perfis que podem cobrar um preço diferente do cadastrado (registrado no log)
+PRICE_OVERRIDE_ROLES = (UserRole.ADMIN,)
+
 @router.post("/sale", response_model=Sale)
-async def create_new_sale(
+def create_new_sale(
     sale: SaleCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Criar nova venda"""
-    return create_sale(db, sale, current_user.id)
+    """Criar nova venda com o preço cadastrado dos serviços (preço manual só para administradores)"""
+    return create_sale(db, sale, current_user.id, current_user.role in PRICE_OVERRIDE_ROLES)
+
+@router.post("/sales/batch", response_model=List[Sale])
+def create_sales_batch(
+    batch: SaleBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Sincronizar a fila de vendas de um terminal offline
+
+    Todas as vendas são gravadas numa única transação (ou nenhuma). Cada venda
+    precisa de **chave_idempotencia**: reenviar o lote após uma falha devolve
+    as vendas já registradas em vez de cobrar de novo.
+    """
+    if any(not sale.chave_idempotencia for sale in batch.vendas):
+        raise HTTPException(status_code=400, detail="Informe chave_idempotencia em todas as vendas do lote")
+    return create_sales(db, batch.vendas, current_user.id, current_user.role in PRICE_OVERRIDE_ROLES)
 
 @router.get("/sales", response_model=List[Sale])
-async def read_sales(
+def read_sales(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Listar vendas com filtros opcionais"""
-    return get_sales(db, skip=skip, limit=limit, start_date=start_date, end_date=end_date)
+    sales = get_sales(db, skip=skip, limit=limit, start_date=start_date, end_date=end_date, cursor=cursor)
+    set_next_cursor(response, sales, SaleModel.criado_em, limit)
+    return sales
 
 @router.get("/payment-methods")
-async def get_payment_methods():
+def get_payment_methods():
     """Obter métodos de pagamento disponíveis"""
     return [
         {"value": "dinheiro", "label": "Dinheiro"},
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, date, timedelta
@@ -7,14 +7,18 @@ from pydantic import BaseModel, EmailStr
 from database import get_db
 from schemas import ClientCreate, AppointmentCreate, Service, User
 from crud import (
-    get_services, get_users, create_client, create_appointment, 
-    get_appointments, get_client_by_email
+    get_services, get_service, get_users, create_client, create_appointment, 
+    get_client_by_email
 )
-from models import UserRole, AppointmentStatus
+from models import User as UserModel, UserRole, AppointmentStatus
+from utils.availability import BUSINESS_HOURS, DayAvailability, business_hours_for
 from utils.notifications import send_appointment_notification
 
 router = APIRouter()
 
+SLOT_MINUTES = 30  # 30 minutes between slot starts
+MAX_AVAILABILITY_DAYS = 31  # Longest range served by the availability matrix
+
 class PublicClientCreate(BaseModel):
     """Schema for public client creation"""
     nome: str
@@ -36,15 +40,128 @@ class AvailableSlot(BaseModel):
     formatted_time: str
     available: bool
 
+# Validation and responses shared with the async router (routes/public_async.py)
+
+def validate_availability_range(start_date: date, end_date: date):
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    if (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum range is {MAX_AVAILABILITY_DAYS} days"
+        )
+
+def day_slots(availability: DayAvailability, target_date: date) -> list:
+    """Slots of one barber's day (empty when the shop is closed)"""
+    hours = business_hours_for(target_date)
+    if hours is None:
+        return []
+    return availability.slots(
+        open_time=hours[0],
+        close_time=hours[1],
+        slot_minutes=SLOT_MINUTES
+    )
+
+def availability_matrix(barbers, schedules, start_date: date, end_date: date,
+                        servico_id: Optional[int], duration_minutes: int) -> dict:
+    """Slots per barber and day, built from schedules loaded by DayAvailability.load_range"""
+    now = datetime.now()
+    result = []
+    for barber in barbers:
+        days = {}
+        current_date = start_date
+        while current_date <= end_date:
+            hours = business_hours_for(current_date)
+            days[current_date.isoformat()] = schedules[(barber.id, current_date)].slots(
+                open_time=hours[0],
+                close_time=hours[1],
+                slot_minutes=SLOT_MINUTES,
+                now=now,
+                duration_minutes=duration_minutes
+            ) if hours else []
+            current_date += timedelta(days=1)
+        
+        result.append({
+            "barbeiro_id": barber.id,
+            "barbeiro_nome": barber.nome,
+            "dias": days
+        })
+    
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "servico_id": servico_id,
+        "slot_minutes": SLOT_MINUTES,
+        "duracao_minutos": duration_minutes,
+        "barbeiros": result
+    }
+
+def validate_booking_time(booking: PublicAppointmentCreate):
+    if booking.data_hora <= datetime.now():
+        raise HTTPException(
+            status_code=400, 
+            detail="Não é possível agendar para datas passadas"
+        )
+
+def check_slot_free(availability: DayAvailability, start: datetime, end: datetime):
+    conflict = availability.find_conflict(start, end)
+    if conflict:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Horário não disponível. Conflito com agendamento às {conflict.start.strftime('%H:%M')}"
+        )
+
+def booking_client(booking: PublicAppointmentCreate) -> ClientCreate:
+    return ClientCreate(
+        nome=booking.cliente.nome,
+        email=booking.cliente.email,
+        telefone=booking.cliente.telefone,
+        aceite_lgpd=booking.cliente.aceite_lgpd
+    )
+
+def booking_appointment(booking: PublicAppointmentCreate, client_id: int) -> AppointmentCreate:
+    return AppointmentCreate(
+        cliente_id=client_id,
+        barbeiro_id=booking.barbeiro_id,
+        servico_id=booking.servico_id,
+        data_hora=booking.data_hora,
+        observacoes=booking.observacoes,
+        status=AppointmentStatus.AGENDADO
+    )
+
+def booking_response(appointment) -> dict:
+    return {
+        "message": "Agendamento criado com sucesso!",
+        "appointment_id": appointment.id,
+        "cliente_nome": appointment.cliente.nome,
+        "barbeiro_nome": appointment.barbeiro.nome,
+        "servico_nome": appointment.servico.nome,
+        "data_hora": appointment.data_hora.strftime("%d/%m/%Y às %H:%M"),
+        "valor": f"R$ {appointment.servico.preco:.2f}"
+    }
+
+def confirmation_response(message: str, appointment) -> dict:
+    return {
+        "message": message,
+        "appointment": {
+            "cliente_nome": appointment.cliente.nome,
+            "barbeiro_nome": appointment.barbeiro.nome,
+            "servico_nome": appointment.servico.nome,
+            "data_hora": appointment.data_hora.strftime("%d/%m/%Y às %H:%M"),
+            "status": appointment.status.value
+        }
+    }
+
 @router.get("/services", response_model=List[Service])
-async def get_public_services(
+def get_public_services(
     db: Session = Depends(get_db)
 ):
     """Get available services for public booking"""
     return get_services(db, active_only=True)
 
 @router.get("/barbers", response_model=List[User])
-async def get_public_barbers(
+def get_public_barbers(
     db: Session = Depends(get_db)
 ):
     """Get available barbers for public booking"""
@@ -53,7 +170,7 @@ async def get_public_barbers(
     return barbers
 
 @router.get("/availability/{barbeiro_id}")
-async def get_barber_availability(
+def get_barber_availability(
     barbeiro_id: int,
     date_str: str,  # Format: YYYY-MM-DD
     db: Session = Depends(get_db)
@@ -64,94 +181,68 @@ async def get_barber_availability(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Define working hours (9 AM to 6 PM)
-    start_hour = 9
-    end_hour = 18
-    slot_duration = 30  # 30 minutes per slot
+    # Working hours follow the business-hours schedule
+    if business_hours_for(target_date) is None:
+        return []
     
-    # Get existing appointments for this barber on this date
-    existing_appointments = get_appointments(
-        db, 
-        date_filter=target_date, 
-        barbeiro_id=barbeiro_id,
-        limit=100
-    )
+    # Load the barber's busy intervals once and answer every slot from them
+    availability = DayAvailability.load(db, barbeiro_id, target_date)
+    return day_slots(availability, target_date)
+
+@router.get("/availability")
+def get_availability_matrix(
+    start_date: date,
+    end_date: date,
+    barbeiro_ids: Optional[List[int]] = Query(None),
+    servico_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get available time slots for several barbers over a date range in one request"""
+    validate_availability_range(start_date, end_date)
     
-    # Create time slots
-    available_slots = []
-    current_datetime = datetime.combine(target_date, datetime.min.time().replace(hour=start_hour))
-    end_datetime = datetime.combine(target_date, datetime.min.time().replace(hour=end_hour))
+    # Slot length follows the requested service duration
+    duration_minutes = SLOT_MINUTES
+    if servico_id is not None:
+        service = get_service(db, servico_id)
+        if not service:
+            raise HTTPException(status_code=404, detail="Serviço não encontrado")
+        duration_minutes = service.duracao_minutos
     
-    while current_datetime < end_datetime:
-        # Check if this slot conflicts with existing appointments
-        is_available = True
-        
-        for appointment in existing_appointments:
-            # Calculate appointment end time based on service duration
-            appointment_start = appointment.data_hora
-            appointment_end = appointment_start + timedelta(minutes=appointment.servico.duracao_minutos)
-            
-            # Check for overlap
-            slot_end = current_datetime + timedelta(minutes=slot_duration)
-            if (current_datetime < appointment_end and slot_end > appointment_start):
-                is_available = False
-                break
-        
-        # Don't allow booking in the past
-        if current_datetime <= datetime.now():
-            is_available = False
-        
-        available_slots.append({
-            "datetime": current_datetime.isoformat(),
-            "formatted_time": current_datetime.strftime("%H:%M"),
-            "available": is_available
-        })
-        
-        current_datetime += timedelta(minutes=slot_duration)
+    query = db.query(UserModel).filter(
+        UserModel.role == UserRole.BARBEIRO,
+        UserModel.ativo == True
+    )
+    if barbeiro_ids:
+        query = query.filter(UserModel.id.in_(barbeiro_ids))
+    barbers = query.order_by(UserModel.nome).all()
+    
+    # Single range query over appointments for every barber and day
+    schedules = DayAvailability.load_range(
+        db, [barber.id for barber in barbers], start_date, end_date
+    )
     
-    return available_slots
+    return availability_matrix(barbers, schedules, start_date, end_date, servico_id, duration_minutes)
 
 @router.post("/book-appointment")
-async def create_public_appointment(
+def create_public_appointment(
     booking: PublicAppointmentCreate,
     db: Session = Depends(get_db)
 ):
     """Create a new appointment from public booking"""
     try:
         # Check if appointment time is in the future
-        if booking.data_hora <= datetime.now():
-            raise HTTPException(
-                status_code=400, 
-                detail="Não é possível agendar para datas passadas"
-            )
+        validate_booking_time(booking)
         
-        # Check if the time slot is available
-        existing_appointments = get_appointments(
-            db,
-            date_filter=booking.data_hora.date(),
-            barbeiro_id=booking.barbeiro_id,
-            limit=100
-        )
+        # Get the requested service duration
+        new_service = get_service(db, booking.servico_id)
+        if not new_service:
+            raise HTTPException(status_code=404, detail="Serviço não encontrado")
         
-        # Verify no conflicts with existing appointments
-        for appointment in existing_appointments:
-            appointment_start = appointment.data_hora
-            appointment_end = appointment_start + timedelta(minutes=appointment.servico.duracao_minutos)
-            
-            # For the new appointment, we need to get service duration
-            from crud import get_service
-            new_service = get_service(db, booking.servico_id)
-            if not new_service:
-                raise HTTPException(status_code=404, detail="Serviço não encontrado")
-            
-            new_appointment_end = booking.data_hora + timedelta(minutes=new_service.duracao_minutos)
-            
-            # Check for overlap
-            if (booking.data_hora < appointment_end and new_appointment_end > appointment_start):
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Horário não disponível. Conflito com agendamento às {appointment_start.strftime('%H:%M')}"
-                )
+        new_appointment_end = booking.data_hora + timedelta(minutes=new_service.duracao_minutos)
+        
+        # Check if the time slot is available
+        availability = DayAvailability.load(db, booking.barbeiro_id, booking.data_hora.date())
+        check_slot_free(availability, booking.data_hora, new_appointment_end)
         
         # Check if client already exists by email
         existing_client = get_client_by_email(db, booking.cliente.email)
@@ -161,26 +252,12 @@ async def create_public_appointment(
             client_id = existing_client.id
         else:
             # Create new client
-            client_data = ClientCreate(
-                nome=booking.cliente.nome,
-                email=booking.cliente.email,
-                telefone=booking.cliente.telefone,
-                aceite_lgpd=booking.cliente.aceite_lgpd
-            )
-            new_client = create_client(db, client_data)
+            new_client = create_client(db, booking_client(booking))
             client_id = new_client.id
         
         # Create appointment
-        appointment_data = AppointmentCreate(
-            cliente_id=client_id,
-            barbeiro_id=booking.barbeiro_id,
-            servico_id=booking.servico_id,
-            data_hora=booking.data_hora,
-            observacoes=booking.observacoes,
-            status=AppointmentStatus.AGENDADO
-        )
-        
-        new_appointment = create_appointment(db, appointment_data)
+        # Same schedule as the pre-check: the conflict check doesn't load it again
+        new_appointment = create_appointment(db, booking_appointment(booking, client_id), availability=availability)
         
         # Send notification
         try:
@@ -188,15 +265,7 @@ async def create_public_appointment(
         except Exception as e:
             print(f"Erro ao enviar notificação: {e}")
         
-        return {
-            "message": "Agendamento criado com sucesso!",
-            "appointment_id": new_appointment.id,
-            "cliente_nome": new_appointment.cliente.nome,
-            "barbeiro_nome": new_appointment.barbeiro.nome,
-            "servico_nome": new_appointment.servico.nome,
-            "data_hora": new_appointment.data_hora.strftime("%d/%m/%Y às %H:%M"),
-            "valor": f"R$ {new_appointment.servico.preco:.2f}"
-        }
+        return booking_response(new_appointment)
         
     except HTTPException:
         raise
@@ -204,7 +273,7 @@ async def create_public_appointment(
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
 
 @router.get("/appointment/{appointment_id}/confirm")
-async def confirm_public_appointment(
+def confirm_public_appointment(
     appointment_id: int,
     token: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -221,38 +290,11 @@ async def confirm_public_appointment(
     if appointment.status == AppointmentStatus.AGENDADO:
         update_data = AppointmentUpdate(status=AppointmentStatus.CONFIRMADO)
         updated_appointment = update_appointment(db, appointment_id, update_data)
-        
-        return {
-            "message": "Agendamento confirmado com sucesso!",
-            "appointment": {
-                "cliente_nome": updated_appointment.cliente.nome,
-                "barbeiro_nome": updated_appointment.barbeiro.nome,
-                "servico_nome": updated_appointment.servico.nome,
-                "data_hora": updated_appointment.data_hora.strftime("%d/%m/%Y às %H:%M"),
-                "status": updated_appointment.status.value
-            }
-        }
+        return confirmation_response("Agendamento confirmado com sucesso!", updated_appointment)
     else:
-        return {
-            "message": "Agendamento já foi confirmado anteriormente",
-            "appointment": {
-                "cliente_nome": appointment.cliente.nome,
-                "barbeiro_nome": appointment.barbeiro.nome,
-                "servico_nome": appointment.servico.nome,
-                "data_hora": appointment.data_hora.strftime("%d/%m/%Y às %H:%M"),
-                "status": appointment.status.value
-            }
-        }
+        return confirmation_response("Agendamento já foi confirmado anteriormente", appointment)
 
 @router.get("/business-hours")
-async def get_business_hours():
+def get_business_hours():
     """Get business hours for the barbershop"""
-    return {
-        "monday": {"open": "09:00", "close": "18:00", "closed": False},
-        "tuesday": {"open": "09:00", "close": "18:00", "closed": False},
-        "wednesday": {"open": "09:00", "close": "18:00", "closed": False},
-        "thursday": {"open": "09:00", "close": "18:00", "closed": False},
-        "friday": {"open": "09:00", "close": "18:00", "closed": False},
-        "saturday": {"open": "09:00", "close": "16:00", "closed": False},
-        "sunday": {"open": "09:00", "close": "14:00", "closed": False}
-    }
\ No newline at end of file
+    return BUSINESS_HOURS
@@ -0,0 +1,140 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, date, timedelta
+
+from database import get_async_db
+from schemas import AppointmentUpdate, Service, User
+import crud_async
+from models import AppointmentStatus
+from utils.availability import BUSINESS_HOURS, business_hours_for
+from utils.notifications import send_appointment_notification
+from routes.public import (
+    SLOT_MINUTES, PublicAppointmentCreate, availability_matrix, booking_appointment, booking_client,
+    booking_response, check_slot_free, confirmation_response, day_slots, validate_availability_range,
+    validate_booking_time
+)
+
+# Same endpoints as routes/public.py on an AsyncSession (enabled through ASYNC_DB_ROUTERS)
+router = APIRouter()
+
+@router.get("/services", response_model=List[Service])
+async def get_public_services(
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get available services for public booking"""
+    return await crud_async.get_services(db, active_only=True)
+
+@router.get("/barbers", response_model=List[User])
+async def get_public_barbers(
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get available barbers for public booking"""
+    return await crud_async.get_barbers(db)
+
+@router.get("/availability/{barbeiro_id}")
+async def get_barber_availability(
+    barbeiro_id: int,
+    date_str: str,  # Format: YYYY-MM-DD
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get available time slots for a barber on a specific date"""
+    try:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if business_hours_for(target_date) is None:
+        return []
+    
+    availability = await crud_async.get_day_availability(db, barbeiro_id, target_date)
+    return day_slots(availability, target_date)
+
+@router.get("/availability")
+async def get_availability_matrix(
+    start_date: date,
+    end_date: date,
+    barbeiro_ids: Optional[List[int]] = Query(None),
+    servico_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get available time slots for several barbers over a date range in one request"""
+    validate_availability_range(start_date, end_date)
+    
+    duration_minutes = SLOT_MINUTES
+    if servico_id is not None:
+        service = await crud_async.get_service(db, servico_id)
+        if not service:
+            raise HTTPException(status_code=404, detail="Serviço não encontrado")
+        duration_minutes = service.duracao_minutos
+    
+    barbers = await crud_async.get_barbers(db, barbeiro_ids)
+    schedules = await crud_async.get_availability_range(
+        db, [barber.id for barber in barbers], start_date, end_date
+    )
+    
+    return availability_matrix(barbers, schedules, start_date, end_date, servico_id, duration_minutes)
+
+@router.post("/book-appointment")
+async def create_public_appointment(
+    booking: PublicAppointmentCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new appointment from public booking"""
+    try:
+        validate_booking_time(booking)
+        
+        new_service = await crud_async.get_service(db, booking.servico_id)
+        if not new_service:
+            raise HTTPException(status_code=404, detail="Serviço não encontrado")
+        
+        new_appointment_end = booking.data_hora + timedelta(minutes=new_service.duracao_minutos)
+        
+        availability = await crud_async.get_day_availability(db, booking.barbeiro_id, booking.data_hora.date())
+        check_slot_free(availability, booking.data_hora, new_appointment_end)
+        
+        existing_client = await crud_async.get_client_by_email(db, booking.cliente.email)
+        if existing_client:
+            client_id = existing_client.id
+        else:
+            client_id = (await crud_async.create_client(db, booking_client(booking))).id
+        
+        # Reloaded with cliente / barbeiro / servico for the notification and response
+        new_appointment = await crud_async.create_appointment(
+            db, booking_appointment(booking, client_id), availability=availability
+        )
+        
+        try:
+            send_appointment_notification(new_appointment, "criado")
+        except Exception as e:
+            print(f"Erro ao enviar notificação: {e}")
+        
+        return booking_response(new_appointment)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
+
+@router.get("/appointment/{appointment_id}/confirm")
+async def confirm_public_appointment(
+    appointment_id: int,
+    token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Confirm a public appointment (for email links)"""
+    appointment = await crud_async.get_appointment(db, appointment_id, load="calendar")
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Agendamento não encontrado")
+    
+    if appointment.status == AppointmentStatus.AGENDADO:
+        update_data = AppointmentUpdate(status=AppointmentStatus.CONFIRMADO)
+        updated_appointment = await crud_async.update_appointment(db, appointment_id, update_data)
+        return confirmation_response("Agendamento confirmado com sucesso!", updated_appointment)
+    else:
+        return confirmation_response("Agendamento já foi confirmado anteriormente", appointment)
+
+@router.get("/business-hours")
+async def get_business_hours():
+    """Get business hours for the barbershop"""
+    return BUSINESS_HOURS
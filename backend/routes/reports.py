@@ -1,19 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import date, datetime, timedelta
 from typing import Optional
-import io
 
 from database import get_db
 from auth import get_current_active_user, require_role
 from models import User, UserRole
-from utils.reports import create_report_generator
+from schemas import ReportJobCreate
+from utils.reports import create_report_generator, iter_report_chunks
+from utils.report_jobs import get_report_job_manager
 
 router = APIRouter()
 
 @router.get("/financial")
-async def generate_financial_report(
+def generate_financial_report(
     start_date: date = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: date = Query(..., description="Data final (YYYY-MM-DD)"),
     format: str = Query("excel", regex="^(excel|pdf)$", description="Formato do relatório"),
@@ -37,7 +38,7 @@ async def generate_financial_report(
         
         # Generate report
         report_generator = create_report_generator(db)
-        report_data = report_generator.generate_financial_report(
+        report_file = report_generator.generate_financial_report(
             start_date=start_date,
             end_date=end_date,
             format_type=format
@@ -48,7 +49,7 @@ async def generate_financial_report(
         media_type = "application/pdf" if format == "pdf" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
         return StreamingResponse(
-            io.BytesIO(report_data),
+            iter_report_chunks(report_file),
             media_type=media_type,
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -57,7 +58,7 @@ async def generate_financial_report(
         raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório: {str(e)}")
 
 @router.get("/clients")
-async def generate_client_report(
+def generate_client_report(
     format: str = Query("excel", regex="^(excel|pdf)$", description="Formato do relatório"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.RECEPCIONISTA]))
@@ -70,7 +71,7 @@ async def generate_client_report(
     try:
         # Generate report
         report_generator = create_report_generator(db)
-        report_data = report_generator.generate_client_report(format_type=format)
+        report_file = report_generator.generate_client_report(format_type=format)
         
         # Prepare response
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -78,7 +79,7 @@ async def generate_client_report(
         media_type = "application/pdf" if format == "pdf" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
         return StreamingResponse(
-            io.BytesIO(report_data),
+            iter_report_chunks(report_file),
             media_type=media_type,
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -87,7 +88,7 @@ async def generate_client_report(
         raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório: {str(e)}")
 
 @router.get("/appointments")
-async def generate_appointment_report(
+def generate_appointment_report(
     start_date: date = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: date = Query(..., description="Data final (YYYY-MM-DD)"),
     format: str = Query("excel", regex="^(excel|pdf)$", description="Formato do relatório"),
@@ -111,7 +112,7 @@ async def generate_appointment_report(
         
         # Generate report
         report_generator = create_report_generator(db)
-        report_data = report_generator.generate_appointment_report(
+        report_file = report_generator.generate_appointment_report(
             start_date=start_date,
             end_date=end_date,
             format_type=format
@@ -122,7 +123,7 @@ async def generate_appointment_report(
         media_type = "application/pdf" if format == "pdf" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
         return StreamingResponse(
-            io.BytesIO(report_data),
+            iter_report_chunks(report_file),
             media_type=media_type,
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -130,8 +131,67 @@ async def generate_appointment_report(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório: {str(e)}")
 
+def _report_job_response(job: dict) -> dict:
+    """Public view of a report job (the download URL carries its token)"""
+    response = {
+        key: job[key] for key in (
+            "job_id", "tipo", "formato", "start_date", "end_date", "status",
+            "progress", "error", "created_at", "finished_at", "expires_at"
+        )
+    }
+    response["download_url"] = (
+        f"/api/reports/jobs/{job['job_id']}/download?token={job['token']}" if job["status"] == "done" else None
+    )
+    return response
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(
+    job_request: ReportJobCreate,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.RECEPCIONISTA]))
+):
+    """
+    Enfileirar a geração de um relatório em segundo plano
+    
+    Pedidos idênticos do mesmo usuário, sem alterações nos dados desde então, reaproveitam o mesmo job.
+    """
+    if job_request.tipo != "clients":
+        if not job_request.start_date or not job_request.end_date:
+            raise HTTPException(status_code=400, detail="start_date e end_date são obrigatórios")
+        if job_request.start_date > job_request.end_date:
+            raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
+        if (job_request.end_date - job_request.start_date).days > 365:
+            raise HTTPException(status_code=400, detail="Período máximo de 1 ano")
+    
+    job = get_report_job_manager().submit(
+        tipo=job_request.tipo,
+        formato=job_request.formato,
+        owner_id=current_user.id,
+        start_date=job_request.start_date if job_request.tipo != "clients" else None,
+        end_date=job_request.end_date if job_request.tipo != "clients" else None
+    )
+    return _report_job_response(job)
+
+@router.get("/jobs/{job_id}")
+def get_report_job(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.RECEPCIONISTA]))
+):
+    """Status e progresso de um job de relatório (do próprio usuário; administradores veem todos)"""
+    job = get_report_job_manager().get(job_id)
+    if job is None or (job["owner_id"] != current_user.id and current_user.role != UserRole.ADMIN):
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+    return _report_job_response(job)
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(job_id: str, token: str = Query(...)):
+    """Baixar o arquivo de um job concluído (autenticado pelo token do job)"""
+    job = get_report_job_manager().artifact(job_id, token)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado, expirado ou token inválido")
+    return FileResponse(job["artifact_path"], media_type=job["media_type"], filename=job["filename"])
+
 @router.get("/quick-stats")
-async def get_quick_stats(
+def get_quick_stats(
     period: str = Query("month", regex="^(week|month|quarter|year)$", description="Período para estatísticas"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -143,8 +203,7 @@ async def get_quick_stats(
     """
     try:
         from datetime import datetime, timedelta
-        from sqlalchemy import func
-        from models import Sale, Appointment, Client
+        from utils.daily_metrics import APPOINTMENTS, NEW_CLIENTS, SALES, metric_totals
         
         # Calculate date range based on period
         today = date.today()
@@ -158,28 +217,18 @@ async def get_quick_stats(
         else:  # year
             start_date = today.replace(month=1, day=1)
         
-        # Get statistics
-        total_sales = db.query(func.sum(Sale.total)).filter(
-            func.date(Sale.criado_em) >= start_date
-        ).scalar() or 0
-        
-        total_appointments = db.query(Appointment).filter(
-            func.date(Appointment.data_hora) >= start_date
-        ).count()
-        
-        new_clients = db.query(Client).filter(
-            func.date(Client.criado_em) >= start_date
-        ).count()
+        # Get statistics (from the daily_metrics rollup: cost doesn't grow with the period)
+        current = metric_totals(db, [SALES, APPOINTMENTS, NEW_CLIENTS], start_date=start_date)
+        total_sales = current[SALES]["valor"]
+        total_appointments = current[APPOINTMENTS]["quantidade"]
+        new_clients = current[NEW_CLIENTS]["quantidade"]
         
         # Calculate trends (compare with previous period)
         period_days = (today - start_date).days
         previous_start = start_date - timedelta(days=period_days)
         previous_end = start_date - timedelta(days=1)
         
-        previous_sales = db.query(func.sum(Sale.total)).filter(
-            func.date(Sale.criado_em) >= previous_start,
-            func.date(Sale.criado_em) <= previous_end
-        ).scalar() or 0
+        previous_sales = metric_totals(db, [SALES], previous_start, previous_end)[SALES]["valor"]
         
         sales_trend = ((total_sales - previous_sales) / previous_sales * 100) if previous_sales > 0 else 0
         
@@ -198,7 +247,7 @@ async def get_quick_stats(
         raise HTTPException(status_code=500, detail=f"Erro ao obter estatísticas: {str(e)}")
 
 @router.get("/export-templates")
-async def get_export_templates(
+def get_export_templates(
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """
@@ -226,7 +275,7 @@ async def get_export_templates(
     }
 
 @router.post("/custom-export")
-async def create_custom_export(
+def create_custom_export(
     report_config: dict,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
@@ -1,17 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from database import get_db
-from schemas import Service, ServiceCreate, ServiceUpdate
+from schemas import ImportResult, Service, ServiceCreate, ServiceUpdate
 from crud import get_services, get_service, create_service, update_service
+from utils.bulk_import import detect_format, import_file
 from auth import get_current_active_user, require_role
 from models import User, UserRole
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Service])
-async def read_services(
+def read_services(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
@@ -22,7 +23,7 @@ async def read_services(
     return get_services(db, skip=skip, limit=limit, active_only=active_only)
 
 @router.get("/{service_id}", response_model=Service)
-async def read_service(
+def read_service(
     service_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -34,7 +35,7 @@ async def read_service(
     return db_service
 
 @router.post("/", response_model=Service)
-async def create_new_service(
+def create_new_service(
     service: ServiceCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
@@ -42,8 +43,21 @@ async def create_new_service(
     """Criar novo serviço (apenas admin)"""
     return create_service(db, service)
 
+@router.post("/import", response_model=ImportResult)
+def import_services(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, regex="^(csv|json|ndjson)$", description="Padrão: pela extensão do arquivo"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Importar serviços em lote (CSV, JSON ou NDJSON); nomes já cadastrados são ignorados (apenas admin)"""
+    try:
+        return import_file(db, "services", file.file, format or detect_format(file.filename))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Arquivo inválido: {exc}")
+
 @router.put("/{service_id}", response_model=Service)
-async def update_existing_service(
+def update_existing_service(
     service_id: int,
     service_update: ServiceUpdate,
     db: Session = Depends(get_db),
@@ -1,27 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from database import get_db
 from schemas import User, UserCreate, UserUpdate
 from crud import get_users, get_user, create_user, update_user
 from auth import get_current_active_user, require_role
-from models import UserRole
+from models import UserRole, User as UserModel
+from utils.pagination import set_next_cursor
 
 router = APIRouter()
 
 @router.get("/", response_model=List[User])
-async def read_users(
+def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """Listar usuários (apenas admin)"""
-    return get_users(db, skip=skip, limit=limit)
+    users = get_users(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, UserModel.criado_em, limit)
+    return users
 
 @router.get("/{user_id}", response_model=User)
-async def read_user(
+def read_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
@@ -33,7 +38,7 @@ async def read_user(
     return db_user
 
 @router.post("/", response_model=User)
-async def create_new_user(
+def create_new_user(
     user: UserCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
@@ -42,7 +47,7 @@ async def create_new_user(
     return create_user(db, user)
 
 @router.put("/{user_id}", response_model=User)
-async def update_existing_user(
+def update_existing_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
@@ -55,7 +60,7 @@ async def update_existing_user(
     return db_user
 
 @router.get("/barbeiros/list", response_model=List[User])
-async def list_barbers(
+def list_barbers(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date, datetime
+from typing import Literal, Optional, List
 from models import UserRole, AppointmentStatus, PaymentMethod
 
 # Base schemas
@@ -63,6 +63,15 @@ class Client(ClientBase):
     class Config:
         from_attributes = True
 
+class ClientSuggestion(BaseModel):
+    id: int
+    nome: str
+    telefone: str
+    email: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
 # Service schemas
 class ServiceBase(BaseModel):
     nome: str
@@ -118,7 +127,8 @@ class Appointment(AppointmentBase):
 class SaleItemCreate(BaseModel):
     servico_id: int
     quantidade: int = 1
-    preco_unitario: float
+    # Preço manual: só vale para perfis autorizados (routes/pos.py); senão, o preço cadastrado
+    preco_unitario: Optional[float] = None
 
 class SaleCreate(BaseModel):
     cliente_id: Optional[int] = None
@@ -126,6 +136,11 @@ class SaleCreate(BaseModel):
     desconto: float = 0
     metodo_pagamento: PaymentMethod
     observacoes: Optional[str] = None
+    # Gerada pelo terminal; reenviar a mesma chave devolve a venda já registrada
+    chave_idempotencia: Optional[str] = Field(None, min_length=1, max_length=64)
+
+class SaleBatchCreate(BaseModel):
+    vendas: List[SaleCreate] = Field(..., min_length=1, max_length=500)
 
 class SaleItem(BaseModel):
     id: int
@@ -145,6 +160,7 @@ class Sale(BaseModel):
     desconto: float
     metodo_pagamento: PaymentMethod
     observacoes: Optional[str] = None
+    chave_idempotencia: Optional[str] = None
     criado_em: datetime
     itens: List[SaleItem]
     
@@ -204,3 +220,22 @@ class CashRegister(BaseModel):
     
     class Config:
         from_attributes = True
+
+# Report job schemas
+class ReportJobCreate(BaseModel):
+    tipo: Literal["financial", "clients", "appointments"]
+    formato: Literal["excel", "pdf"] = "excel"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+# Bulk import schemas
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportResult(BaseModel):
+    total: int
+    imported: int
+    duplicates: int
+    invalid: int
+    errors: List[ImportRowError]
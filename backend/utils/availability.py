@@ -0,0 +1,209 @@
+"""
+Availability engine for barber schedules
+
+Loads a barber's busy intervals for a day in a single query (service
+durations joined in), merges them into a sorted, disjoint interval set and
+answers "is this range free" / slot queries with binary search.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Appointment, AppointmentStatus, Client, Service, User
+from utils.date_ranges import date_range_bounds, day_bounds
+
+
+# Status que ocupam a agenda do barbeiro
+BUSY_STATUSES = [
+    AppointmentStatus.AGENDADO,
+    AppointmentStatus.CONFIRMADO,
+    AppointmentStatus.EM_ANDAMENTO,
+]
+
+# Horário de funcionamento da barbearia (exposto em /api/public/business-hours)
+BUSINESS_HOURS = {
+    "monday": {"open": "09:00", "close": "18:00", "closed": False},
+    "tuesday": {"open": "09:00", "close": "18:00", "closed": False},
+    "wednesday": {"open": "09:00", "close": "18:00", "closed": False},
+    "thursday": {"open": "09:00", "close": "18:00", "closed": False},
+    "friday": {"open": "09:00", "close": "18:00", "closed": False},
+    "saturday": {"open": "09:00", "close": "16:00", "closed": False},
+    "sunday": {"open": "09:00", "close": "14:00", "closed": False}
+}
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def business_hours_for(day: date) -> Optional[Tuple[time, time]]:
+    """Return (open, close) for the given day, or None when closed"""
+    hours = BUSINESS_HOURS[_WEEKDAYS[day.weekday()]]
+    if hours["closed"]:
+        return None
+    return (
+        datetime.strptime(hours["open"], "%H:%M").time(),
+        datetime.strptime(hours["close"], "%H:%M").time()
+    )
+
+
+class BusyInterval(NamedTuple):
+    """A single appointment occupying a barber's schedule"""
+    start: datetime
+    end: datetime
+    appointment_id: int
+    barbeiro_nome: str
+    servico_nome: str
+    cliente_nome: str
+
+
+def _busy_intervals_query(db: Session, barbeiro_ids: List[int], range_start: datetime, range_end: datetime):
+    """Busy appointments in [range_start, range_end) with service duration and names joined"""
+    return db.query(
+        Appointment.barbeiro_id,
+        Appointment.id,
+        Appointment.data_hora,
+        Service.duracao_minutos,
+        Service.nome,
+        User.nome,
+        Client.nome
+    ).join(
+        Service, Appointment.servico_id == Service.id
+    ).join(
+        User, Appointment.barbeiro_id == User.id
+    ).join(
+        Client, Appointment.cliente_id == Client.id
+    ).filter(
+        Appointment.barbeiro_id.in_(barbeiro_ids),
+        Appointment.data_hora >= range_start,
+        Appointment.data_hora < range_end,
+        Appointment.status.in_(BUSY_STATUSES)
+    )
+
+
+def _to_interval(row) -> BusyInterval:
+    """Convert a `_busy_intervals_query` row into a BusyInterval"""
+    _, appointment_id, data_hora, duracao, servico_nome, barbeiro_nome, cliente_nome = row
+    return BusyInterval(
+        start=data_hora,
+        end=data_hora + timedelta(minutes=duracao),
+        appointment_id=appointment_id,
+        barbeiro_nome=barbeiro_nome,
+        servico_nome=servico_nome,
+        cliente_nome=cliente_nome
+    )
+
+
+class DayAvailability:
+    """Busy intervals of one barber on one day, merged for O(log n) lookups"""
+
+    def __init__(self, barbeiro_id: int, day: date, intervals: List[BusyInterval]):
+        self.barbeiro_id = barbeiro_id
+        self.day = day
+        self.intervals = sorted(intervals, key=lambda interval: interval.start)
+
+        # Merged disjoint blocks: starts/ends are both sorted, members keep
+        # the original appointments for conflict reporting
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        self._members: List[List[BusyInterval]] = []
+        for interval in self.intervals:
+            if self._ends and interval.start < self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], interval.end)
+                self._members[-1].append(interval)
+            else:
+                self._starts.append(interval.start)
+                self._ends.append(interval.end)
+                self._members.append([interval])
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        barbeiro_id: int,
+        day: date,
+        exclude_id: Optional[int] = None
+    ) -> "DayAvailability":
+        """Load the barber's busy intervals for a day with a single query"""
+        query = _busy_intervals_query(db, [barbeiro_id], *day_bounds(day))
+
+        if exclude_id:
+            query = query.filter(Appointment.id != exclude_id)
+
+        return cls(barbeiro_id, day, [_to_interval(row) for row in query.all()])
+
+    @classmethod
+    def load_range(
+        cls,
+        db: Session,
+        barbeiro_ids: Iterable[int],
+        start_date: date,
+        end_date: date
+    ) -> Dict[Tuple[int, date], "DayAvailability"]:
+        """Load every (barber, day) schedule in [start_date, end_date] with a single query"""
+        barbeiro_ids = list(barbeiro_ids)
+        range_start, range_end = date_range_bounds(start_date, end_date)
+
+        grouped: Dict[Tuple[int, date], List[BusyInterval]] = {}
+        if barbeiro_ids:
+            for row in _busy_intervals_query(db, barbeiro_ids, range_start, range_end).all():
+                grouped.setdefault((row[0], row[2].date()), []).append(_to_interval(row))
+
+        schedules = {}
+        day = start_date
+        while day <= end_date:
+            for barbeiro_id in barbeiro_ids:
+                schedules[(barbeiro_id, day)] = cls(barbeiro_id, day, grouped.get((barbeiro_id, day), []))
+            day += timedelta(days=1)
+        return schedules
+
+    def find_conflict(self, start: datetime, end: datetime) -> Optional[BusyInterval]:
+        """Return the first appointment overlapping [start, end), if any"""
+        # First merged block ending after `start`; it overlaps iff it starts before `end`
+        idx = bisect_right(self._ends, start)
+        if idx >= len(self._starts) or self._starts[idx] >= end:
+            return None
+
+        for interval in self._members[idx]:
+            if interval.start < end and interval.end > start:
+                return interval
+        return None
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """Check whether [start, end) does not overlap any busy interval"""
+        return self.find_conflict(start, end) is None
+
+    def slots(
+        self,
+        open_time: time,
+        close_time: time,
+        slot_minutes: int = 30,
+        now: Optional[datetime] = None,
+        duration_minutes: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Build the day's slot grid between open and close times
+
+        Slots start every `slot_minutes`; a slot is available when the whole
+        `duration_minutes` window (defaults to the slot length) is free and
+        ends before closing time.
+        """
+        if now is None:
+            now = datetime.now()
+
+        step = timedelta(minutes=slot_minutes)
+        length = timedelta(minutes=duration_minutes or slot_minutes)
+        current = datetime.combine(self.day, open_time)
+        closing = datetime.combine(self.day, close_time)
+
+        slots = []
+        while current < closing:
+            end = current + length
+            available = current > now and end <= closing and self.is_free(current, end)
+            slots.append({
+                "datetime": current.isoformat(),
+                "formatted_time": current.strftime("%H:%M"),
+                "available": available
+            })
+            current += step
+        return slots
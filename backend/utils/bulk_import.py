@@ -0,0 +1,308 @@
+"""
+Bulk import of clients and services (CSV / JSON / NDJSON)
+
+The file is read one record at a time and handled in batches:
+
+1. every row is validated with the same schema as the single-record
+   endpoint (ClientCreate / ServiceCreate); invalid rows are reported by
+   row number and skipped
+2. one lookup per batch finds the emails/CPFs (clients) or names
+   (services) that already exist, plus the repeats inside the file
+3. the remaining rows go in with a single executemany INSERT and the
+   batch is committed, so a failure halfway keeps the batches before it
+
+The INSERTs run on the session's connection rather than through the ORM,
+so the per-commit cache version bumps (utils/cache.py) and the flush
+hooks of the search keys and daily_metrics don't fire per batch: the
+search keys are computed here, and the cache and the new-clients rollup
+are refreshed once when the import ends.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Client, Service
+from schemas import ClientCreate, ServiceCreate
+from utils.cache import invalidate_client_cache, invalidate_service_cache
+from utils.client_search import client_search_keys
+from utils.daily_metrics import rebuild_daily_metrics
+from utils.date_ranges import as_date
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Errors listed in the report; the counters still cover every row
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("csv", "json", "ndjson")
+
+
+class ImportSpec(NamedTuple):
+    model: Any
+    schema: Any
+    unique_fields: Tuple[str, ...]
+
+
+IMPORTS = {
+    "clients": ImportSpec(Client, ClientCreate, ("email", "cpf")),
+    # Serviços não têm chave única no banco: o nome identifica o serviço no import
+    "services": ImportSpec(Service, ServiceCreate, ("nome",)),
+}
+
+DUPLICATE_MESSAGES = {
+    "email": "Email já cadastrado",
+    "cpf": "CPF já cadastrado",
+    "nome": "Serviço já cadastrado",
+}
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """Format from the file extension (csv, json or ndjson/jsonl)"""
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension == "jsonl":
+        return "ndjson"
+    if extension not in FORMATS:
+        raise ValueError(f"Formato não suportado: {filename}")
+    return extension
+
+
+def iter_records(stream, format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Records of a binary file, one at a time
+
+    CSV and NDJSON are streamed; a JSON array is parsed whole (the standard
+    library has no incremental parser), so large files should be NDJSON.
+    Empty CSV cells are left out, like a missing JSON key, so the schema
+    defaults apply.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="" if format == "csv" else None)
+    try:
+        if format == "csv":
+            for record in csv.DictReader(text_stream):
+                yield {key.strip(): value.strip() for key, value in record.items()
+                       if key and isinstance(value, str) and value.strip()}
+        elif format == "ndjson":
+            for line in text_stream:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        # Reported as that row's error; the rest of the file still imports
+                        yield exc
+        else:
+            records = json.load(text_stream)
+            if not isinstance(records, list):
+                raise ValueError("O arquivo JSON deve conter uma lista de registros")
+            yield from records
+    finally:
+        # Leave the caller's file open (UploadFile closes its own)
+        text_stream.detach()
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, row: int, messages: List[str], duplicate: bool = False):
+        if duplicate:
+            self.duplicates += 1
+        else:
+            self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": messages})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            # A batch reports its invalid rows before its duplicates
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+
+def _validation_messages(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in error['loc']) or 'registro'}: {error['msg']}" for error in exc.errors()]
+
+
+def _dedup_key(field: str, value):
+    # Nomes de serviço são comparados sem diferenciar maiúsculas; email e CPF como o índice único
+    return value.lower() if field == "nome" and isinstance(value, str) else value
+
+
+def _existing_values(db: Session, spec: ImportSpec, rows: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, set]:
+    """One SELECT for every unique value of the batch that is already stored"""
+    wanted = {field: {row[field] for _, row in rows if row.get(field)} for field in spec.unique_fields}
+    conditions = []
+    for field, values in wanted.items():
+        if values:
+            column = getattr(spec.model, field)
+            if field == "nome":
+                conditions.append(func.lower(column).in_({_dedup_key(field, value) for value in values}))
+            else:
+                conditions.append(column.in_(values))
+    existing = {field: set() for field in spec.unique_fields}
+    if not conditions:
+        return existing
+    columns = [getattr(spec.model, field) for field in spec.unique_fields]
+    for stored in db.connection().execute(select(*columns).where(or_(*conditions))):
+        for field, value in zip(spec.unique_fields, stored):
+            if value is not None:
+                existing[field].add(_dedup_key(field, value))
+    return existing
+
+
+def _insert_values(entity: str, row: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    values = dict(row, ativo=True)
+    if entity == "clients":
+        # Mesmos campos que create_client e os eventos de client_search preencheriam
+        values["data_aceite_lgpd"] = now if row.get("aceite_lgpd") else None
+        values.update(client_search_keys(row["nome"], row["telefone"]))
+    return values
+
+
+def _insert_batch(db: Session, entity: str, rows: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    spec = IMPORTS[entity]
+    now = datetime.utcnow()
+    values = [_insert_values(entity, row, now) for _, row in rows]
+    try:
+        db.connection().execute(insert(spec.model.__table__), values)
+        db.commit()
+        report.imported += len(values)
+        return
+    except IntegrityError:
+        # Another writer inserted one of these values since the lookup: retry row by row to find it
+        db.rollback()
+    for (row_number, _), row_values in zip(rows, values):
+        try:
+            db.connection().execute(insert(spec.model.__table__), [row_values])
+            db.commit()
+            report.imported += 1
+        except IntegrityError:
+            db.rollback()
+            report.reject(row_number, ["Registro já cadastrado"], duplicate=True)
+
+
+def _import_batch(db: Session, entity: str, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    spec = IMPORTS[entity]
+    valid = []
+    for row_number, record in batch:
+        try:
+            if isinstance(record, ValueError):
+                raise ValueError(f"JSON inválido: {record}")
+            if not isinstance(record, dict):
+                raise ValueError("registro deve ser um objeto")
+            valid.append((row_number, spec.schema(**record).dict()))
+        except ValidationError as exc:
+            report.reject(row_number, _validation_messages(exc))
+        except ValueError as exc:
+            report.reject(row_number, [str(exc)])
+
+    seen = _existing_values(db, spec, valid)
+    rows = []
+    for row_number, row in valid:
+        duplicated = [
+            field for field in spec.unique_fields
+            if row.get(field) and _dedup_key(field, row[field]) in seen[field]
+        ]
+        if duplicated:
+            report.reject(row_number, [DUPLICATE_MESSAGES[field] for field in duplicated], duplicate=True)
+            continue
+        for field in spec.unique_fields:
+            if row.get(field):
+                seen[field].add(_dedup_key(field, row[field]))
+        rows.append((row_number, row))
+
+    if rows:
+        _insert_batch(db, entity, rows, report)
+    else:
+        db.commit()
+
+
+def _today(db: Session):
+    return as_date(db.connection().execute(select(func.date(func.now()))).scalar())
+
+
+def import_records(db: Session, entity: str, records: Iterable[Dict[str, Any]],
+                   batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Validate, deduplicate and insert records in batches of batch_size
+
+    Returns the report: total rows, imported, duplicates, invalid and the
+    per-row errors (row numbers start at 1, the first data record).
+    """
+    report = ImportReport()
+    first_day = _today(db) if entity == "clients" else None
+    batch = []
+    try:
+        for row_number, record in enumerate(records, start=1):
+            report.total += 1
+            batch.append((row_number, record))
+            if len(batch) >= batch_size:
+                _import_batch(db, entity, batch, report)
+                batch = []
+        if batch:
+            _import_batch(db, entity, batch, report)
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        # Batches already committed stay imported even if a later one failed
+        if report.imported:
+            _finish_import(db, entity, first_day)
+    return report.as_dict()
+
+
+def _finish_import(db: Session, entity: str, first_day):
+    """Refresh what the per-batch commits skipped: the new-clients rollup and the cache"""
+    if entity == "clients":
+        rebuild_daily_metrics(db.connection(), first_day, _today(db), groups=["clients"])
+        db.commit()
+        invalidate_client_cache()
+    else:
+        invalidate_service_cache()
+
+
+def import_file(db: Session, entity: str, stream, format: str,
+                batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Import a binary CSV/JSON/NDJSON stream (see iter_records)"""
+    return import_records(db, entity, iter_records(stream, format), batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em lote de clientes e serviços")
+    parser.add_argument("entity", choices=sorted(IMPORTS))
+    parser.add_argument("path", help="Arquivo .csv, .json ou .ndjson")
+    parser.add_argument("--format", choices=FORMATS, help="Padrão: pela extensão do arquivo")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    format = args.format or detect_format(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            report = import_file(db, args.entity, stream, format, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"{report['imported']} de {report['total']} registros importados "
+          f"({report['duplicates']} duplicados, {report['invalid']} inválidos)")
+    for error in report["errors"]:
+        print(f"  linha {error['row']}: {'; '.join(error['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
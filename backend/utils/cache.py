@@ -1,81 +1,370 @@
 """
 Cache utilities for improving API performance
 """
+import asyncio
+import inspect
 import json
 import hashlib
+import heapq
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Dict, Callable
+from typing import Any, Awaitable, Optional, Dict, Callable, List, Tuple
 from functools import wraps
 import time
 
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-class SimpleCache:
-    """Simple in-memory cache with TTL support"""
+
+class CacheBackend(ABC):
+    """
+    Interface implemented by cache storage backends
+
+    Keys are strings of the form "<prefix>:<name>:<hash>", so prefix
+    invalidation only needs `delete_prefix`.
+    """
+
+    name = "base"
+    # True when every worker process reads and writes the same store
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int = 300):
+        """Set value in cache with TTL in seconds"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete key from cache"""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with prefix"""
+
+    @abstractmethod
+    def clear(self):
+        """Clear all cache"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+
+
+def _estimate_size(key: str, value: Any) -> int:
+    """Approximate memory footprint of an entry, computed once when it is stored"""
+    try:
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        size = sys.getsizeof(value)
+    return size + len(key)
+
+
+def _key_prefix(key: str) -> str:
+    """Stats bucket of a key ("clients:get_clients:<hash>" -> "clients")"""
+    return key.split(":", 1)[0] or "default"
+
+
+class SimpleCache(CacheBackend):
+    """
+    In-memory LRU cache with TTL support (per process)
+
+    Bounded by entry count and approximate bytes; least recently used
+    entries are evicted first. Expiry uses a min-heap of deadlines, so
+    expired entries are dropped incrementally instead of by full sweeps.
+    """
+
+    name = "memory"
     
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.max_bytes = max_bytes or int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._memory_usage = 0
         self._last_cleanup = time.time()
-        self._cleanup_interval = 300  # 5 minutes
+        self._lock = threading.RLock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        )
     
+    def _remove(self, key: str) -> Dict[str, Any]:
+        data = self._cache.pop(key)
+        self._memory_usage -= data['size']
+        return data
+
     def _cleanup(self):
-        """Remove expired entries"""
+        """Remove expired entries (pops only deadlines that have passed)"""
         now = time.time()
-        if now - self._last_cleanup < self._cleanup_interval:
-            return
-            
-        expired_keys = []
-        for key, data in self._cache.items():
-            if data['expires'] < now:
-                expired_keys.append(key)
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires, key = heapq.heappop(heap)
+            data = self._cache.get(key)
+            # Heap entries left behind by overwritten keys are skipped
+            if data is not None and data['expires'] == expires:
+                self._remove(key)
+                self._counters[_key_prefix(key)]['expirations'] += 1
         
-        for key in expired_keys:
-            del self._cache[key]
+        # Drop stale deadlines when overwrites left the heap much larger than the cache
+        if len(heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [(data['expires'], key) for key, data in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
         
         self._last_cleanup = now
+
+    def _evict(self):
+        """Evict least recently used entries until within bounds"""
+        while self._cache and (len(self._cache) > self.max_entries or self._memory_usage > self.max_bytes):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self._counters[_key_prefix(key)]['evictions'] += 1
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        self._cleanup()
-        
-        if key not in self._cache:
-            return None
-        
-        data = self._cache[key]
-        if data['expires'] < time.time():
-            del self._cache[key]
-            return None
-        
-        return data['value']
+        with self._lock:
+            self._cleanup()
+            
+            data = self._cache.get(key)
+            if data is None:
+                self._counters[_key_prefix(key)]['misses'] += 1
+                return None
+            
+            self._cache.move_to_end(key)
+            self._counters[_key_prefix(key)]['hits'] += 1
+            return data['value']
     
     def set(self, key: str, value: Any, ttl: int = 300):
         """Set value in cache with TTL in seconds"""
-        self._cache[key] = {
+        now = time.time()
+        data = {
             'value': value,
-            'expires': time.time() + ttl,
-            'created': time.time()
+            'expires': now + ttl,
+            'created': now,
+            'size': _estimate_size(key, value)
         }
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = data
+            self._memory_usage += data['size']
+            heapq.heappush(self._expiry_heap, (data['expires'], key))
+            self._evict()
     
     def delete(self, key: str):
         """Delete key from cache"""
-        if key in self._cache:
-            del self._cache[key]
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with prefix"""
+        with self._lock:
+            for key in [key for key in self._cache if key.startswith(prefix)]:
+                self._remove(key)
     
     def clear(self):
         """Clear all cache"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap = []
+            self._memory_usage = 0
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (counters are kept incrementally, no full scan)"""
+        with self._lock:
+            self._cleanup()
+            by_prefix = {prefix: dict(counters) for prefix, counters in self._counters.items()}
+            return {
+                'backend': self.name,
+                'entries': len(self._cache),
+                'memory_usage': self._memory_usage,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': sum(c['hits'] for c in by_prefix.values()),
+                'misses': sum(c['misses'] for c in by_prefix.values()),
+                'evictions': sum(c['evictions'] for c in by_prefix.values()),
+                'by_prefix': by_prefix,
+                'last_cleanup': datetime.fromtimestamp(self._last_cleanup)
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every worker process through a local SQLite file
+
+    All uvicorn workers read and write the same store, so a write or an
+    invalidation in one worker is immediately visible to all the others.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str, purge_interval: Optional[float] = None):
+        self.path = path
+        # Expired rows are deleted by `set` at most once per interval (per process)
+        self.purge_interval = purge_interval if purge_interval is not None else float(
+            os.getenv("CACHE_SQLITE_PURGE_INTERVAL", "60")
+        )
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_purge = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open (or reopen after fork) this process' connection"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries (expires)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, expires FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time():
+            self.delete(key)
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: int = 300):
+        """Set value in cache with TTL in seconds"""
+        now = time.time()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires, created) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_expired(conn, now)
+
+    def _purge_expired(self, conn: sqlite3.Connection, now: float):
+        """Delete every expired row (range scan of the expires index); caller holds the lock"""
+        conn.execute("DELETE FROM cache_entries WHERE expires < ?", (now,))
+        self._last_purge = now
+
+    def delete(self, key: str):
+        """Delete key from cache"""
+        with self._lock:
+            self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with prefix (primary key range scan)"""
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff")
+            )
+
+    def clear(self):
+        """Clear all cache"""
+        with self._lock:
+            self._connection().execute("DELETE FROM cache_entries")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            conn = self._connection()
+            self._purge_expired(conn, time.time())
+            entries, memory_usage = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries"
+            ).fetchone()
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'entries': entries,
+            'memory_usage': memory_usage
+        }
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker through a Redis-protocol server (requires `redis`)"""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, namespace: str = "barbermanager:"):
+        import redis  # Optional dependency, only needed for this backend
+
+        self.url = url
+        self.namespace = namespace
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        payload = self._client.get(self.namespace + key)
+        return pickle.loads(payload) if payload is not None else None
+
+    def set(self, key: str, value: Any, ttl: int = 300):
+        """Set value in cache with TTL in seconds"""
+        self._client.set(self.namespace + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+
+    def delete(self, key: str):
+        """Delete key from cache"""
+        self._client.delete(self.namespace + key)
+
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with prefix"""
+        keys = list(self._client.scan_iter(match=f"{self.namespace}{prefix}*", count=500))
+        if keys:
+            self._client.delete(*keys)
+
+    def clear(self):
+        """Clear all cache"""
+        self.delete_prefix("")
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        self._cleanup()
+        info = self._client.info("memory")
         return {
-            'entries': len(self._cache),
-            'memory_usage': len(str(self._cache)),
-            'last_cleanup': datetime.fromtimestamp(self._last_cleanup)
+            'backend': self.name,
+            'entries': sum(1 for _ in self._client.scan_iter(match=f"{self.namespace}*", count=1000)),
+            'memory_usage': info.get('used_memory', 0)
         }
 
 
+def create_cache(backend: Optional[str] = None) -> CacheBackend:
+    """
+    Create the cache backend selected by CACHE_BACKEND
+
+    - memory (default): per-process dict
+    - sqlite: shared file at CACHE_SQLITE_PATH, works across uvicorn workers
+    - redis: shared server at CACHE_REDIS_URL
+    """
+    backend = (backend or os.getenv("CACHE_BACKEND", "memory")).lower()
+    if backend == "sqlite":
+        return SQLiteCache(os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "barbermanager_cache.db")))
+    if backend == "redis":
+        return RedisCache(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    return SimpleCache()
+
+
 # Global cache instance
-cache = SimpleCache()
+cache = create_cache()
 
 
 def cache_key(*args, **kwargs) -> str:
@@ -88,77 +377,376 @@ def cache_key(*args, **kwargs) -> str:
     return hashlib.md5(key_string.encode()).hexdigest()
 
 
-def cached(ttl: int = 300, key_prefix: str = ""):
+# Table versions
+#
+# Every cached function declares the tables it reads; its keys embed the
+# current version of each one. A committed write to a table replaces that
+# table's version, so all entries built from the old data stop matching at
+# once (O(1), no key scan) and simply age out of the backend.
+#
+# The versions live in the backend: with the per-process memory backend a
+# worker only sees its own bumps, and writes made through the other workers
+# are only noticed when the entry expires. Long TTLs (versioned_ttl) are
+# therefore reserved for shared backends.
+
+VERSION_KEY_PREFIX = "version:"
+VERSION_TTL = 30 * 24 * 3600
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def versioned_ttl(ttl: int, shared_ttl: Optional[int]) -> int:
+    """TTL of a version-invalidated entry: shared_ttl only when every worker sees the bumps"""
+    return shared_ttl if shared_ttl and cache.shared else ttl
+
+
+def get_table_versions(tables: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Current version of each table (stored in the backend, so shared by workers)"""
+    versions = []
+    for table in tables:
+        key = VERSION_KEY_PREFIX + table
+        version = cache.get(key)
+        if version is None:
+            # Unknown or evicted: start from a fresh version so no older entry can match
+            version = _new_version()
+            cache.set(key, version, VERSION_TTL)
+        versions.append(version)
+    return tuple(versions)
+
+
+def bump_table_versions(*tables: str):
+    """Invalidate every cached result that read any of the tables"""
+    for table in tables:
+        cache.set(VERSION_KEY_PREFIX + table, _new_version(), VERSION_TTL)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    """Remember which tables the flush wrote to (new/dirty/deleted are still pre-flush here)"""
+    tables = session.info.setdefault("written_tables", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tables.update(table.name for table in sa_inspect(instance).mapper.tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_write_tables(orm_execute_state):
+    """Bulk insert/update/delete statements bypass the flush"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault("written_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_tables(session):
+    """
+    Bump versions once the writes are committed
+
+    Bumping at flush time would let a concurrent request cache the old
+    rows under the new version before the transaction becomes visible.
+    """
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        bump_table_versions(*sorted(tables))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session):
+    session.info.pop("written_tables", None)
+
+
+# Dependency-injected parameters that never take part in cache keys
+EXCLUDED_KEY_PARAMS = frozenset({"db", "current_user"})
+
+
+def _key_arguments(signature: inspect.Signature, args: tuple, kwargs: dict, exclude: frozenset) -> Dict[str, Any]:
+    """
+    Bind a call's arguments by parameter name, dropping injected dependencies
+
+    Positional and keyword spellings of the same call map to the same key,
+    and sessions / users (whose repr contains an object address) are left out.
+    """
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        arguments = {'args': args, 'kwargs': kwargs}
+    else:
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    return {
+        name: value for name, value in arguments.items()
+        if name not in exclude and not isinstance(value, (Session, AsyncSession))
+    }
+
+
+def _to_dto(dto, value: Any) -> Any:
+    """Convert ORM results to detached schema objects before caching"""
+    if dto is None or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [dto.model_validate(item) for item in value]
+    return dto.model_validate(value)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations of the same cache key
+
+    The first caller (leader) computes the value; callers arriving while it
+    runs wait on the same future instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: Dict[Tuple[int, str], "asyncio.Future"] = {}
+
+    def in_flight(self, key: str) -> bool:
+        """Check whether a computation for key is running"""
+        return key in self._calls or any(call_key[1] == key for call_key in list(self._async_calls))
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key across threads"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the coroutine function fn once per key within the running event loop"""
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        future = self._async_calls.get(call_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._async_calls[call_key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # Mark as retrieved when no caller is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._async_calls.pop(call_key, None)
+
+
+_single_flight = SingleFlight()
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_background_tasks = set()
+
+
+def _with_fresh_sessions(args: tuple, kwargs: dict):
+    """
+    Replace request-scoped SQLAlchemy sessions by new ones for a background refresh
+
+    The request's session is closed when the response is sent, so a refresh
+    running after that must not share it.
+    """
+    from database import AsyncSessionLocal, SessionLocal
+
+    sessions = []
+
+    def swap(value):
+        if isinstance(value, (Session, AsyncSession)):
+            session = AsyncSessionLocal() if isinstance(value, AsyncSession) else SessionLocal()
+            sessions.append(session)
+            return session
+        return value
+
+    return (
+        tuple(swap(arg) for arg in args),
+        {name: swap(value) for name, value in kwargs.items()},
+        sessions
+    )
+
+
+def cached(
+    ttl: int = 300,
+    key_prefix: str = "",
+    stale_ttl: int = 0,
+    key_builder: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    exclude: Tuple[str, ...] = (),
+    dto: Optional[type] = None,
+    tables: Tuple[str, ...] = (),
+    shared_ttl: Optional[int] = None
+):
     """
-    Decorator for caching function results
+    Decorator for caching function results (sync functions and coroutines)
+    
+    Keys are built from the call's arguments by name; `db`, `current_user`
+    and any SQLAlchemy session are excluded, so repeated requests hit even
+    though each one gets its own session. Keys also embed the version of
+    each table in `tables`, so committed writes invalidate them. Concurrent misses for the same
+    key are coalesced: one caller computes, the others wait for its result.
+    With `stale_ttl`, an expired value is still served for that many seconds
+    while a single background refresh recomputes it.
     
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
         key_prefix: Optional prefix for cache key
+        stale_ttl: Seconds an expired value may be served while refreshing (0 disables)
+        key_builder: Optional callable receiving the remaining arguments by name
+            and returning the data that identifies the call
+        exclude: Extra parameter names left out of the key
+        dto: Optional Pydantic schema; ORM results are cached as detached
+            instances of it instead of session-bound objects
+        tables: Tables the function reads (entries are invalidated on writes to them)
+        shared_ttl: TTL used instead of `ttl` when the backend is shared by all
+            workers (see versioned_ttl)
     """
+    excluded = EXCLUDED_KEY_PARAMS | frozenset(exclude)
+
     def decorator(func: Callable):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generate cache key
-            func_key = f"{key_prefix}:{func.__name__}:{cache_key(*args, **kwargs)}"
-            
-            # Try to get from cache
-            result = cache.get(func_key)
-            if result is not None:
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> str:
+            arguments = _key_arguments(signature, args, kwargs, excluded)
+            identity = key_builder(arguments) if key_builder is not None else arguments
+            return f"{key_prefix}:{func.__name__}:{cache_key(identity, get_table_versions(tables))}"
+
+        def store(key: str, value: Any):
+            # Entries carry their own freshness deadline; the backend keeps them
+            # for the extra stale window
+            entry_ttl = versioned_ttl(ttl, shared_ttl)
+            cache.set(key, {'value': value, 'fresh_until': time.time() + entry_ttl}, entry_ttl + stale_ttl)
+
+        def fresh(envelope) -> bool:
+            return envelope is not None and envelope['fresh_until'] >= time.time()
+
+        if inspect.iscoroutinefunction(func):
+            async def compute_async(key, args, kwargs):
+                envelope = cache.get(key)
+                if fresh(envelope):
+                    return envelope['value']
+                result = _to_dto(dto, await func(*args, **kwargs))
+                store(key, result)
                 return result
-            
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            cache.set(func_key, result, ttl)
-            return result
+
+            async def refresh_async(key, args, kwargs):
+                args, kwargs, sessions = _with_fresh_sessions(args, kwargs)
+                try:
+                    await _single_flight.do_async(key, lambda: compute_async(key, args, kwargs))
+                except Exception as e:
+                    print(f"Erro ao atualizar cache {key}: {e}")
+                finally:
+                    for session in sessions:
+                        if isinstance(session, AsyncSession):
+                            await session.close()
+                        else:
+                            session.close()
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                envelope = cache.get(key)
+                if envelope is not None:
+                    if not fresh(envelope) and not _single_flight.in_flight(key):
+                        task = asyncio.create_task(refresh_async(key, args, kwargs))
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_tasks.discard)
+                    return envelope['value']
+
+                return await _single_flight.do_async(key, lambda: compute_async(key, args, kwargs))
+        else:
+            def compute(key, args, kwargs):
+                envelope = cache.get(key)
+                if fresh(envelope):
+                    return envelope['value']
+                result = _to_dto(dto, func(*args, **kwargs))
+                store(key, result)
+                return result
+
+            def refresh(key, args, kwargs):
+                args, kwargs, sessions = _with_fresh_sessions(args, kwargs)
+                try:
+                    _single_flight.do(key, lambda: compute(key, args, kwargs))
+                except Exception as e:
+                    print(f"Erro ao atualizar cache {key}: {e}")
+                finally:
+                    for session in sessions:
+                        session.close()
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                envelope = cache.get(key)
+                if envelope is not None:
+                    if not fresh(envelope) and not _single_flight.in_flight(key):
+                        _refresh_executor.submit(refresh, key, args, kwargs)
+                    return envelope['value']
+
+                return _single_flight.do(key, lambda: compute(key, args, kwargs))
         
         # Add cache management methods to function
         wrapper.cache_clear = lambda: cache.clear()
-        wrapper.cache_delete = lambda *args, **kwargs: cache.delete(
-            f"{key_prefix}:{func.__name__}:{cache_key(*args, **kwargs)}"
-        )
+        wrapper.cache_delete = lambda *args, **kwargs: cache.delete(make_key(args, kwargs))
         
         return wrapper
     return decorator
 
 
-def cache_dashboard_stats(ttl: int = 60):
+def cache_dashboard_stats(ttl: int = 60, stale_ttl: int = 0, tables: Tuple[str, ...] = ("appointments", "sales"), **options):
     """Special cache decorator for dashboard statistics"""
-    return cached(ttl=ttl, key_prefix="dashboard")
+    return cached(ttl=ttl, key_prefix="dashboard", stale_ttl=stale_ttl, tables=tables, **options)
 
 
-def cache_client_data(ttl: int = 300):
-    """Special cache decorator for client data"""
-    return cached(ttl=ttl, key_prefix="clients")
+def cache_client_data(ttl: int = 300, stale_ttl: int = 0, tables: Tuple[str, ...] = ("clients",),
+                      shared_ttl: Optional[int] = 6 * 3600, **options):
+    """Special cache decorator for client data (invalidated by writes to clients; 6h on a shared backend)"""
+    return cached(ttl=ttl, key_prefix="clients", stale_ttl=stale_ttl, tables=tables, shared_ttl=shared_ttl, **options)
 
 
-def cache_service_data(ttl: int = 600):
-    """Special cache decorator for service data (longer TTL as it changes less)"""
-    return cached(ttl=ttl, key_prefix="services")
+def cache_service_data(ttl: int = 600, stale_ttl: int = 0, tables: Tuple[str, ...] = ("services",),
+                       shared_ttl: Optional[int] = 12 * 3600, **options):
+    """Special cache decorator for service data (invalidated by writes to services; 12h on a shared backend)"""
+    return cached(ttl=ttl, key_prefix="services", stale_ttl=stale_ttl, tables=tables, shared_ttl=shared_ttl, **options)
 
 
 def invalidate_cache_pattern(pattern: str):
-    """Invalidate cache entries matching a pattern"""
-    keys_to_delete = []
-    for key in cache._cache.keys():
-        if pattern in key:
-            keys_to_delete.append(key)
-    
-    for key in keys_to_delete:
-        cache.delete(key)
+    """Invalidate cache entries whose key starts with pattern (e.g. "clients:")"""
+    cache.delete_prefix(pattern)
 
 
 # Cache invalidation helpers
+# Committed ORM writes already bump table versions; these are for writes made
+# outside the ORM session (raw SQL, other processes)
 def invalidate_dashboard_cache():
     """Invalidate all dashboard-related cache"""
-    invalidate_cache_pattern("dashboard:")
+    bump_table_versions("appointments", "sales")
 
 
 def invalidate_client_cache():
     """Invalidate all client-related cache"""
-    invalidate_cache_pattern("clients:")
+    bump_table_versions("clients")
 
 
 def invalidate_service_cache():
     """Invalidate all service-related cache"""
-    invalidate_cache_pattern("services:")
\ No newline at end of file
+    bump_table_versions("services")
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""
+Client search index
+
+Clients carry two search keys next to the data they are derived from:
+`nome_normalizado` (lowercase, accents folded: "José Antônio" -> "jose
+antonio") and `telefone_digitos` ("(11) 99988-7766" -> "11999887766").
+Mapper events fill them on every ORM insert and update, so creating,
+editing and anonymizing a client keep them in sync.
+
+On top of the keys:
+- SQLite: an external-content FTS5 table `clients_fts` over the name,
+  email and phone keys, maintained by triggers; search is a prefix MATCH
+  ranked by bm25 (name weighted above email and phone).
+- PostgreSQL: pg_trgm GIN indexes on the keys; search is ILIKE per token
+  ranked by trigram similarity to the name.
+- B-tree indexes on both keys serve autocomplete as an index range scan
+  (name or phone starting with what was typed).
+Without the FTS table / extension search falls back to LIKE over the keys.
+
+Writes that bypass the ORM (bulk UPDATE statements, imports straight into
+the database) need the keys rebuilt:
+    python -m utils.client_search rebuild
+"""
+import argparse
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, event, func, or_, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import Client
+
+# Engines (by URL) with the FTS5 table or trigram indexes in place -> "fts5" / "trigram"
+_indexed: Dict[str, str] = {}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_NON_DIGITS = re.compile(r"\D+")
+
+FTS_TABLE = "clients_fts"
+# Matches ranked per FTS search (the rest of a very broad match is left out)
+RANK_CANDIDATES = 2000
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nome_normalizado, email, telefone_digitos,
+        content='clients', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nome_normalizado, email, telefone_digitos)
+        VALUES (new.id, new.nome_normalizado, new.email, new.telefone_digitos);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nome_normalizado, email, telefone_digitos)
+        VALUES ('delete', old.id, old.nome_normalizado, old.email, old.telefone_digitos);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_update
+    AFTER UPDATE OF nome_normalizado, email, telefone_digitos ON clients BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nome_normalizado, email, telefone_digitos)
+        VALUES ('delete', old.id, old.nome_normalizado, old.email, old.telefone_digitos);
+        INSERT INTO {FTS_TABLE}(rowid, nome_normalizado, email, telefone_digitos)
+        VALUES (new.id, new.nome_normalizado, new.email, new.telefone_digitos);
+    END""",
+]
+
+_TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_clients_nome_normalizado_trgm ON clients USING gin (nome_normalizado gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_email_trgm ON clients USING gin (lower(email) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_telefone_digitos_trgm ON clients USING gin (telefone_digitos gin_trgm_ops)",
+]
+
+
+# Search keys
+
+def fold_text(value: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace ("  José  Antônio" -> "jose antonio")"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def phone_digits(value: Optional[str]) -> Optional[str]:
+    """Digits of a phone number, None when there are none"""
+    digits = _NON_DIGITS.sub("", value or "")
+    return digits or None
+
+
+def client_search_keys(nome: Optional[str], telefone: Optional[str]) -> Dict[str, Optional[str]]:
+    """Column values of the search keys for a client's name and phone"""
+    return {"nome_normalizado": fold_text(nome) or None, "telefone_digitos": phone_digits(telefone)}
+
+
+@event.listens_for(Client, "before_insert")
+@event.listens_for(Client, "before_update")
+def _fill_search_keys(mapper, connection, target):
+    for column, value in client_search_keys(target.nome, target.telefone).items():
+        setattr(target, column, value)
+
+
+def _search_terms(term: str):
+    """(name/email tokens, phone digits) of a search string; phone-only input has no tokens"""
+    folded = fold_text(term)
+    if not re.search(r"[a-z]", folded) and phone_digits(folded):
+        return [], phone_digits(folded)
+    return _TOKEN.findall(folded), None
+
+
+# Index maintenance
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def _url(bind) -> str:
+    engine = bind if isinstance(bind, Engine) else bind.engine
+    return engine.url.render_as_string(hide_password=True)
+
+
+def rebuild_search_keys(connection, batch_size: int = 1000, only_missing: bool = False) -> int:
+    """Recompute the keys of every client (or of those without keys); returns rows updated"""
+    updated = 0
+    last_id = 0
+    while True:
+        query = select(Client.id, Client.nome, Client.telefone).where(Client.id > last_id)
+        if only_missing:
+            query = query.where(Client.nome_normalizado.is_(None))
+        rows = connection.execute(query.order_by(Client.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+        for row in rows:
+            connection.execute(
+                update(Client).where(Client.id == row.id).values(**client_search_keys(row.nome, row.telefone))
+            )
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def _ensure(connection) -> Optional[str]:
+    rebuild_search_keys(connection, only_missing=True)
+    if _dialect(connection) == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in _FTS_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        return "fts5"
+    if _dialect(connection) == "postgresql":
+        for statement in _TRIGRAM_DDL:
+            connection.execute(text(statement))
+        return "trigram"
+    return None
+
+
+def ensure_client_search(bind) -> Optional[str]:
+    """Create the search index if missing and fill missing keys; returns the index kind"""
+    try:
+        if isinstance(bind, Engine):
+            with bind.begin() as connection:
+                kind = _ensure(connection)
+        else:
+            kind = _ensure(bind)
+    except Exception as e:
+        # e.g. SQLite built without FTS5, or no permission to create pg_trgm
+        print(f"Índice de busca de clientes indisponível, usando LIKE: {e}")
+        return None
+    if kind:
+        _indexed[_url(bind)] = kind
+    return kind
+
+
+def index_kind(db: Session) -> Optional[str]:
+    return _indexed.get(_url(db.get_bind()))
+
+
+# Queries
+
+def _like_filters(tokens: List[str], digits: Optional[str]):
+    if digits:
+        return [Client.telefone_digitos.like(f"%{digits}%")]
+    return [
+        or_(
+            Client.nome_normalizado.like(f"%{token}%"),
+            func.lower(Client.email).like(f"%{token}%"),
+            Client.telefone_digitos.like(f"%{token}%"),
+        )
+        for token in tokens
+    ]
+
+
+def _fts_query(tokens: List[str], digits: Optional[str]) -> str:
+    if digits:
+        return f'telefone_digitos : "{digits}"*'
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_clients(db: Session, term: str, skip: int = 0, limit: int = 100) -> List[Client]:
+    """
+    Clients matching every word of term, best first
+
+    With FTS5 a word matches the start of a name/email word or of the phone
+    digits; the trigram and LIKE paths match it anywhere in the keys.
+    """
+    tokens, digits = _search_terms(term)
+    if not tokens and not digits:
+        return []
+    kind = index_kind(db)
+
+    if kind == "fts5":
+        # bm25 costs per match: a two-letter prefix can match a fifth of the
+        # table, so only the first RANK_CANDIDATES matches are ranked
+        ranked = db.execute(
+            text(
+                f"SELECT rowid FROM ("
+                f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 2.0, 1.0) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH :query LIMIT :candidates"
+                f") ORDER BY score LIMIT :limit OFFSET :skip"
+            ),
+            {
+                "query": _fts_query(tokens, digits), "candidates": max(RANK_CANDIDATES, skip + limit),
+                "limit": limit, "skip": skip
+            }
+        ).scalars().all()
+        clients = {client.id: client for client in db.query(Client).filter(Client.id.in_(ranked))} if ranked else {}
+        return [clients[client_id] for client_id in ranked if client_id in clients]
+
+    query = db.query(Client).filter(*_like_filters(tokens, digits))
+    folded = " ".join(tokens)
+    if kind == "trigram" and folded:
+        order = [func.similarity(Client.nome_normalizado, folded).desc()]
+    else:
+        # Names starting with the search first
+        order = [case((Client.nome_normalizado.like(f"{folded}%"), 0), else_=1)] if folded else []
+    return query.order_by(*order, Client.nome_normalizado, Client.id).offset(skip).limit(limit).all()
+
+
+def _prefix_range(column, prefix: str):
+    """column starts with prefix, as a range an ordinary B-tree index can scan"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return [column >= prefix, column < upper]
+
+
+def autocomplete_clients(db: Session, prefix: str, limit: int = 10) -> List[Client]:
+    """Clients whose name (or phone, for digits) starts with prefix, in alphabetical order"""
+    tokens, digits = _search_terms(prefix)
+    if digits:
+        column, value = Client.telefone_digitos, digits
+    elif tokens:
+        column, value = Client.nome_normalizado, " ".join(tokens)
+    else:
+        return []
+    return (
+        db.query(Client)
+        .filter(*_prefix_range(column, value))
+        .order_by(column, Client.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do índice de busca de clientes")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import engine
+    with engine.begin() as connection:
+        updated = rebuild_search_keys(connection)
+        if _ensure(connection) == "fts5":
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    print(f"{updated} clientes reindexados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Daily metrics rollup
+
+`daily_metrics` keeps one row per (day, metric, key) with precomputed sums
+for sales, appointments and new clients. Whenever a flush writes sales,
+sale items, appointments or clients, the rows of the affected days are
+rebuilt in the same transaction, so dashboard and quick-stats read a few
+rollup rows instead of scanning the fact tables: a year of quick-stats
+costs the same as a week.
+
+A service's price change shifts the appointment values of the days it was
+booked by (new - old) per appointment, with one upsert per metric: no
+rebuild and no day locks, so it never waits on (or stalls) checkouts.
+
+A rebuild deletes and re-inserts the rows of its days, so concurrent
+rebuilds of the same day (two checkouts at once) are serialized with a
+transaction-scoped lock on PostgreSQL: the second waits for the first to
+commit and, under READ COMMITTED, then reads its rows. SQLite already
+allows a single writer at a time.
+
+Writes that bypass the ORM flush (raw SQL, bulk statements, imports into
+the database) need a rebuild:
+    python -m utils.daily_metrics backfill [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import and_, delete, event, func, insert, literal, select, text, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from models import Appointment, Client, DailyMetric, Sale, SaleItem, Service
+from utils.date_ranges import as_date, date_range_bounds
+
+# Metrics (chave = key of the breakdown)
+SALES = "vendas"                                  # chave: payment method
+SALES_BY_BARBER = "vendas_barbeiro"               # chave: vendedor_id
+SALES_BY_SERVICE = "vendas_servico"               # chave: servico_id (valor = subtotal)
+APPOINTMENTS = "agendamentos"                     # chave: status (valor = service prices)
+APPOINTMENTS_BY_BARBER = "agendamentos_barbeiro"  # chave: barbeiro_id
+NEW_CLIENTS = "novos_clientes"
+
+METRIC_GROUPS = {
+    "sales": (SALES, SALES_BY_BARBER, SALES_BY_SERVICE),
+    "appointments": (APPOINTMENTS, APPOINTMENTS_BY_BARBER),
+    "clients": (NEW_CLIENTS,),
+}
+
+# First key of the advisory locks of a day's rollup (second key: the day's ordinal)
+LOCK_NAMESPACE = 0x444D
+# Longer ranges lock the whole table instead of one advisory lock per day
+MAX_DAY_LOCKS = 64
+
+
+def _as_key(value) -> str:
+    if value is None:
+        return ""
+    return str(getattr(value, "value", value))
+
+
+def _in_range(column, start: Optional[datetime], end: Optional[datetime]):
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return and_(true(), *conditions)
+
+
+def _metric_queries(group: str, start: Optional[datetime], end: Optional[datetime]):
+    """Grouped (day, key, valor, quantidade) queries for the metrics of a group"""
+    if group == "sales":
+        day = func.date(Sale.criado_em)
+        window = _in_range(Sale.criado_em, start, end)
+        return [
+            (SALES, select(day, Sale.metodo_pagamento, func.sum(Sale.total), func.count(Sale.id))
+                .where(window).group_by(day, Sale.metodo_pagamento)),
+            (SALES_BY_BARBER, select(day, Sale.vendedor_id, func.sum(Sale.total), func.count(Sale.id))
+                .where(window).group_by(day, Sale.vendedor_id)),
+            (SALES_BY_SERVICE, select(day, SaleItem.servico_id, func.sum(SaleItem.subtotal), func.sum(SaleItem.quantidade))
+                .select_from(SaleItem).join(Sale, SaleItem.venda_id == Sale.id)
+                .where(window).group_by(day, SaleItem.servico_id)),
+        ]
+    if group == "appointments":
+        day = func.date(Appointment.data_hora)
+        window = _in_range(Appointment.data_hora, start, end)
+        return [
+            (APPOINTMENTS, select(day, Appointment.status, func.sum(Service.preco), func.count(Appointment.id))
+                .select_from(Appointment).join(Service, Appointment.servico_id == Service.id)
+                .where(window).group_by(day, Appointment.status)),
+            (APPOINTMENTS_BY_BARBER, select(day, Appointment.barbeiro_id, func.sum(Service.preco), func.count(Appointment.id))
+                .select_from(Appointment).join(Service, Appointment.servico_id == Service.id)
+                .where(window).group_by(day, Appointment.barbeiro_id)),
+        ]
+    day = func.date(Client.criado_em)
+    return [
+        (NEW_CLIENTS, select(day, literal(""), literal(0.0), func.count(Client.id))
+            .where(_in_range(Client.criado_em, start, end)).group_by(day)),
+    ]
+
+
+def lock_metric_days(connection, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Wait for other transactions rebuilding any day of start_date..end_date
+
+    Held until the caller's transaction ends. Days are locked in order, so two
+    rebuilds of overlapping ranges can't deadlock on each other.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    if start_date is None or end_date is None or (end_date - start_date).days >= MAX_DAY_LOCKS:
+        # Conflicts with itself and with the row locks of writers, not with readers
+        connection.execute(text("LOCK TABLE daily_metrics IN SHARE ROW EXCLUSIVE MODE"))
+        return
+    for ordinal in range(start_date.toordinal(), end_date.toordinal() + 1):
+        connection.execute(select(func.pg_advisory_xact_lock(LOCK_NAMESPACE, ordinal)))
+
+
+def rebuild_daily_metrics(connection, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                          groups: Iterable[str] = tuple(METRIC_GROUPS)):
+    """
+    Recompute the rollup rows of start_date..end_date (inclusive; None = unbounded)
+
+    Runs on the given connection, so it joins the caller's transaction, and
+    holds the days' locks (lock_metric_days) until it ends.
+    """
+    lock_metric_days(connection, start_date, end_date)
+    start = date_range_bounds(start_date, start_date)[0] if start_date else None
+    end = date_range_bounds(end_date, end_date)[1] if end_date else None
+
+    for group in groups:
+        metricas = METRIC_GROUPS[group]
+        stale = delete(DailyMetric.__table__).where(DailyMetric.metrica.in_(metricas))
+        if start_date:
+            stale = stale.where(DailyMetric.dia >= start_date)
+        if end_date:
+            stale = stale.where(DailyMetric.dia <= end_date)
+        connection.execute(stale)
+
+        rows = []
+        for metrica, query in _metric_queries(group, start, end):
+            for dia, chave, valor, quantidade in connection.execute(query):
+                if dia is None:
+                    continue
+                rows.append({
+                    "dia": as_date(dia),
+                    "metrica": metrica,
+                    "chave": _as_key(chave),
+                    "valor": float(valor or 0),
+                    "quantidade": int(quantidade or 0),
+                })
+        if rows:
+            connection.execute(insert(DailyMetric.__table__), rows)
+
+
+def shift_appointment_values(connection, servico_id: int, old_price: float, new_price: float):
+    """
+    Add (new_price - old_price) per appointment of one service to its days' values
+
+    One grouped SELECT and one upsert per appointment metric. The upsert
+    (rather than an UPDATE) also lands on rows a concurrent rebuild of the
+    same day re-inserted after reading the old price.
+    """
+    delta = (new_price or 0.0) - (old_price or 0.0)
+    if not delta:
+        return
+    table = DailyMetric.__table__
+    day = func.date(Appointment.data_hora)
+    for metrica, key_column in ((APPOINTMENTS, Appointment.status), (APPOINTMENTS_BY_BARBER, Appointment.barbeiro_id)):
+        rows = [
+            {"dia": as_date(dia), "metrica": metrica, "chave": _as_key(chave), "valor": delta * count, "quantidade": 0}
+            for dia, chave, count in connection.execute(
+                select(day, key_column, func.count(Appointment.id))
+                .where(Appointment.servico_id == servico_id).group_by(day, key_column)
+            )
+            if dia is not None
+        ]
+        if not rows:
+            continue
+        upsert = (postgresql if connection.dialect.name == "postgresql" else sqlite).insert(table)
+        connection.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[table.c.dia, table.c.metrica, table.c.chave],
+                set_={"valor": table.c.valor + upsert.excluded.valor}
+            ),
+            rows
+        )
+
+
+def ensure_daily_metrics(bind):
+    """Populate the rollup when the table is new and still empty"""
+    with bind.begin() as connection:
+        if connection.execute(select(DailyMetric.dia).limit(1)).first() is None:
+            rebuild_daily_metrics(connection)
+
+
+# Incremental maintenance
+
+def _days_of(instance, attribute: str) -> Set[date]:
+    """Current and previous days of a timestamp attribute"""
+    history = get_history(instance, attribute)
+    values = [*history.added, *history.unchanged, *history.deleted]
+    if not values and attribute in instance.__dict__:
+        values = [instance.__dict__[attribute]]
+    if not values:
+        values = [getattr(instance, attribute)]
+    days = {as_date(value) for value in values if value is not None}
+    if not days:
+        # Filled by the database's now() on insert, which may be UTC
+        days = {date.today(), datetime.utcnow().date()}
+    return days
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_metric_days(session, flush_context, instances):
+    """Record the days (and metric groups) touched by this flush"""
+    pending: Dict[date, Set[str]] = session.info.setdefault("metric_days", defaultdict(set))
+    with session.no_autoflush:
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(instance, Sale):
+                days, group = _days_of(instance, "criado_em"), "sales"
+            elif isinstance(instance, SaleItem):
+                sale = instance.venda
+                if sale is None and instance.venda_id is not None:
+                    sale = session.get(Sale, instance.venda_id)
+                days, group = (_days_of(sale, "criado_em") if sale is not None else set()), "sales"
+            elif isinstance(instance, Appointment):
+                days, group = _days_of(instance, "data_hora"), "appointments"
+            elif isinstance(instance, Client):
+                days, group = _days_of(instance, "criado_em"), "clients"
+            elif isinstance(instance, Service):
+                # Appointment values are the service's current price, on every day it was booked
+                history = get_history(instance, "preco")
+                if instance in session.dirty and history.has_changes():
+                    old_price = history.deleted[0] if history.deleted else None
+                    if old_price is None:
+                        # Not loaded before being set: the stored value is still the old one
+                        old_price = session.connection().execute(
+                            select(Service.preco).where(Service.id == instance.id)
+                        ).scalar()
+                    session.info.setdefault("metric_prices", {})[instance.id] = (old_price, history.added[0])
+                continue
+            else:
+                continue
+            for day in days:
+                pending[day].add(group)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_metric_days(session, flush_context):
+    """Rebuild the touched days inside the flush's transaction"""
+    pending = session.info.pop("metric_days", None)
+    prices = session.info.pop("metric_prices", None)
+    if not pending and not prices:
+        return
+    connection = session.connection()
+    # Price shifts first: a day rebuilt below already reads the new price
+    for servico_id, (old_price, new_price) in sorted((prices or {}).items()):
+        shift_appointment_values(connection, servico_id, old_price, new_price)
+    for day in sorted(pending or ()):
+        rebuild_daily_metrics(connection, day, day, groups=sorted(pending[day]))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_metric_days(session):
+    session.info.pop("metric_days", None)
+    session.info.pop("metric_prices", None)
+
+
+# Reading
+
+def metric_totals(db: Session, metricas: Iterable[str], start_date: Optional[date] = None,
+                  end_date: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+    """Sum of valor / quantidade per metric over start_date..end_date (inclusive)"""
+    metricas = list(metricas)
+    query = db.query(
+        DailyMetric.metrica, func.sum(DailyMetric.valor), func.sum(DailyMetric.quantidade)
+    ).filter(DailyMetric.metrica.in_(metricas))
+    if start_date:
+        query = query.filter(DailyMetric.dia >= start_date)
+    if end_date:
+        query = query.filter(DailyMetric.dia <= end_date)
+
+    totals = {metrica: {"valor": 0.0, "quantidade": 0} for metrica in metricas}
+    for metrica, valor, quantidade in query.group_by(DailyMetric.metrica):
+        totals[metrica] = {"valor": float(valor or 0), "quantidade": int(quantidade or 0)}
+    return totals
+
+
+def metric_breakdown(db: Session, metrica: str, start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+    """Sum of valor / quantidade per key of one metric over start_date..end_date"""
+    query = db.query(
+        DailyMetric.chave, func.sum(DailyMetric.valor), func.sum(DailyMetric.quantidade)
+    ).filter(DailyMetric.metrica == metrica)
+    if start_date:
+        query = query.filter(DailyMetric.dia >= start_date)
+    if end_date:
+        query = query.filter(DailyMetric.dia <= end_date)
+
+    return {
+        chave: {"valor": float(valor or 0), "quantidade": int(quantidade or 0)}
+        for chave, valor, quantidade in query.group_by(DailyMetric.chave)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily_metrics rollup")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD), default: all")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD), default: all")
+    args = parser.parse_args()
+
+    from database import Base, engine
+
+    Base.metadata.create_all(bind=engine, tables=[DailyMetric.__table__])
+    with engine.begin() as connection:
+        rebuild_daily_metrics(connection, args.start, args.end)
+        rows = connection.execute(select(func.count()).select_from(DailyMetric)).scalar()
+    print(f"daily_metrics reconstruída: {rows} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Date filter helpers that keep timestamp columns sargable
+
+Every day / date-range filter is expressed as a half-open `[start, end)`
+timestamp range on the raw column, so the database can use the indexes
+declared in `models.py` instead of evaluating `date(column)` per row.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the half-open [start, end) timestamp range covering a day"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def date_range_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Return the half-open [start, end) range covering start_date..end_date inclusive"""
+    return datetime.combine(start_date, time.min), datetime.combine(end_date, time.min) + timedelta(days=1)
+
+
+def filter_day(query, column, day: date):
+    """Restrict `column` to a single day"""
+    start, end = day_bounds(day)
+    return query.filter(column >= start, column < end)
+
+
+def filter_date_range(query, column, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Restrict `column` to start_date..end_date (both inclusive, either optional)
+    """
+    if start_date:
+        query = query.filter(column >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.filter(column < datetime.combine(end_date, time.min) + timedelta(days=1))
+    return query
+
+
+def as_date(value) -> date:
+    """Normalize a `date(column)` result (a string on SQLite, a date elsewhere)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
@@ -0,0 +1,164 @@
+"""
+Streaming bulk exports (NDJSON / CSV)
+
+Each export is a single Core SELECT of flat columns, iterated with
+`yield_per` (a server-side cursor on PostgreSQL) and written out one
+batch of rows at a time, so memory stays constant however many rows the
+export has and the first bytes leave before the query finishes.
+
+Filters:
+- start_date / end_date on the entity's date column (inclusive days)
+- updated_since: rows created or changed at or after a timestamp. The
+  response's X-Export-Watermark is the value to pass on the next run; it
+  overlaps the previous run slightly, so a sync may see a row twice and
+  should upsert by id.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from models import Appointment, Client, Sale, Service, User
+from utils.date_ranges import filter_date_range
+
+EXPORT_BATCH_SIZE = 1000
+# Subtracted from the watermark: rows written during the export's first second are sent again next time
+WATERMARK_OVERLAP = timedelta(seconds=1)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+class ExportSpec(NamedTuple):
+    columns: List[Tuple[str, object]]
+    joins: List[Tuple[object, object]]
+    id_column: object
+    date_column: object
+    updated_columns: List[object]
+
+
+def _specs() -> Dict[str, ExportSpec]:
+    barbeiro = aliased(User)
+    vendedor = aliased(User)
+    return {
+        # Sem CPF, endereço e data de nascimento: dados pessoais ficam fora da exportação
+        "clients": ExportSpec(
+            columns=[
+                ("id", Client.id), ("nome", Client.nome), ("email", Client.email),
+                ("telefone", Client.telefone), ("ativo", Client.ativo), ("aceite_lgpd", Client.aceite_lgpd),
+                ("criado_em", Client.criado_em), ("atualizado_em", Client.atualizado_em),
+            ],
+            joins=[],
+            id_column=Client.id,
+            date_column=Client.criado_em,
+            updated_columns=[Client.criado_em, Client.atualizado_em],
+        ),
+        "appointments": ExportSpec(
+            columns=[
+                ("id", Appointment.id), ("data_hora", Appointment.data_hora), ("status", Appointment.status),
+                ("cliente_id", Appointment.cliente_id), ("cliente_nome", Client.nome),
+                ("barbeiro_id", Appointment.barbeiro_id), ("barbeiro_nome", barbeiro.nome),
+                ("servico_id", Appointment.servico_id), ("servico_nome", Service.nome), ("preco", Service.preco),
+                ("criado_em", Appointment.criado_em), ("atualizado_em", Appointment.atualizado_em),
+            ],
+            joins=[
+                (Client, Client.id == Appointment.cliente_id),
+                (barbeiro, barbeiro.id == Appointment.barbeiro_id),
+                (Service, Service.id == Appointment.servico_id),
+            ],
+            id_column=Appointment.id,
+            date_column=Appointment.data_hora,
+            updated_columns=[Appointment.criado_em, Appointment.atualizado_em],
+        ),
+        # Vendas não são editadas: criado_em basta para o incremental
+        "sales": ExportSpec(
+            columns=[
+                ("id", Sale.id), ("criado_em", Sale.criado_em), ("vendedor_id", Sale.vendedor_id),
+                ("vendedor_nome", vendedor.nome), ("cliente_id", Sale.cliente_id), ("total", Sale.total),
+                ("desconto", Sale.desconto), ("metodo_pagamento", Sale.metodo_pagamento),
+                ("observacoes", Sale.observacoes),
+            ],
+            joins=[(vendedor, vendedor.id == Sale.vendedor_id)],
+            id_column=Sale.id,
+            date_column=Sale.criado_em,
+            updated_columns=[Sale.criado_em],
+        ),
+    }
+
+
+EXPORTS = tuple(_specs())
+
+
+def export_query(entity: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                 updated_since: Optional[datetime] = None):
+    """
+    SELECT of an export's rows
+
+    With a date range the rows come in (date, id) order, which the date index
+    already yields; sorting a range scan by id alone would make the database
+    buffer the whole result before the first row. Otherwise in id order.
+    """
+    spec = _specs()[entity]
+    query = select(*[column.label(name) for name, column in spec.columns]).select_from(spec.id_column.class_)
+    for target, onclause in spec.joins:
+        query = query.outerjoin(target, onclause)
+    query = filter_date_range(query, spec.date_column, start_date, end_date)
+    if updated_since:
+        query = query.where(or_(*[column >= updated_since for column in spec.updated_columns]))
+    if start_date or end_date:
+        return query.order_by(spec.date_column, spec.id_column)
+    return query.order_by(spec.id_column)
+
+
+def export_watermark(db: Session) -> datetime:
+    """updated_since for the next incremental run (database clock)"""
+    return db.execute(select(func.now())).scalar() - WATERMARK_OVERLAP
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def iter_export(bind, query, format: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Yield the rows of query as NDJSON or CSV, one chunk per batch of rows
+
+    Runs on its own session over bind (the request session's engine or
+    connection): a StreamingResponse body is sent after the request's
+    dependencies have exited, so the get_db session may already be closed.
+    """
+    db = Session(bind=bind)
+    try:
+        yield from _export_chunks(db, query, format, batch_size)
+    finally:
+        db.close()
+
+
+def _export_chunks(db: Session, query, format: str, batch_size: int) -> Iterator[bytes]:
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    names = list(result.keys())
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        for rows in result.partitions():
+            writer.writerows([[_plain(value) for value in row] for row in rows])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    else:
+        for rows in result.partitions():
+            yield "".join(
+                json.dumps({name: _plain(value) for name, value in zip(names, row)}, ensure_ascii=False) + "\n"
+                for row in rows
+            ).encode("utf-8")
@@ -1,12 +1,13 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from models import Client
+from crud import get_client
 
 def get_client_data_export(db: Session, client_id: int):
     """
     Exportar todos os dados do cliente para conformidade com LGPD
     """
-    client = db.query(Client).filter(Client.id == client_id).first()
+    client = get_client(db, client_id, load="export")
     if not client:
         return None
     
@@ -14,6 +14,36 @@ except ImportError as e:
     async_send_email = None
     ADVANCED_EMAIL_AVAILABLE = False
 
+_background_tasks = set()
+
+def _run_in_background(coro):
+    """
+    Start an email coroutine without waiting for it
+
+    Route handlers run in worker threads, which have no event loop: there the
+    coroutine is handed to the server's loop. Outside the server (scripts) it
+    is simply run to completion.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        try:
+            from anyio import from_thread
+            task = from_thread.run_sync(asyncio.ensure_future, coro)
+        except RuntimeError:
+            # Not in a worker thread of a running server
+            asyncio.run(coro)
+            return
+    else:
+        task = loop.create_task(coro)
+
+    # Keep a reference until done so the task is not garbage collected
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 def send_email_notification(to_email: str, subject: str, body: str):
     """
     Send email notification (with fallback to simulation)
@@ -21,21 +51,11 @@ def send_email_notification(to_email: str, subject: str, body: str):
     if ADVANCED_EMAIL_AVAILABLE and email_service:
         try:
             # Try to send real email if configured
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If already in async context, create a task
-                asyncio.create_task(email_service.send_email(
-                    to_email=to_email,
-                    subject=subject,
-                    message=body
-                ))
-            else:
-                # If not in async context, run in new loop
-                asyncio.run(email_service.send_email(
-                    to_email=to_email,
-                    subject=subject,
-                    message=body
-                ))
+            _run_in_background(email_service.send_email(
+                to_email=to_email,
+                subject=subject,
+                message=body
+            ))
             return
         except Exception as e:
             print(f"⚠️ Erro ao enviar email real: {e}")
@@ -81,19 +101,11 @@ def send_appointment_notification(appointment: Appointment, action: str):
             }
             
             try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    asyncio.create_task(
-                        email_service.send_appointment_notification(
-                            appointment_data, action
-                        )
-                    )
-                else:
-                    asyncio.run(
-                        email_service.send_appointment_notification(
-                            appointment_data, action
-                        )
+                _run_in_background(
+                    email_service.send_appointment_notification(
+                        appointment_data, action
                     )
+                )
             except Exception as e:
                 print(f"⚠️ Erro ao enviar email avançado: {e}")
                 # Fallback to legacy notification
@@ -167,23 +179,13 @@ def send_daily_schedule_reminder(barbeiro_email: str, appointments_count: int):
             # Try to send with async email service
             barbeiro_nome = barbeiro_email.split('@')[0].title()  # Extract name from email
             
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(
-                    email_service.send_daily_schedule_reminder(
-                        barbeiro_email=barbeiro_email,
-                        barbeiro_nome=barbeiro_nome,
-                        appointments_count=appointments_count
-                    )
-                )
-            else:
-                asyncio.run(
-                    email_service.send_daily_schedule_reminder(
-                        barbeiro_email=barbeiro_email,
-                        barbeiro_nome=barbeiro_nome,
-                        appointments_count=appointments_count
-                    )
+            _run_in_background(
+                email_service.send_daily_schedule_reminder(
+                    barbeiro_email=barbeiro_email,
+                    barbeiro_nome=barbeiro_nome,
+                    appointments_count=appointments_count
                 )
+            )
         else:
             # Fallback to legacy notification
             subject = "📅 Sua agenda de hoje"
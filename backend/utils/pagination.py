@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination
+
+List queries are ordered by a timestamp column plus the primary key, so
+pages are deterministic. A page can start after an opaque cursor instead
+of an offset: the database seeks to `(column, id) > (cursor row)` through
+the index instead of reading and discarding `skip` rows, so page 1000
+costs the same as page 1.
+
+The cursor encodes the last row's id and sort value. The seek re-reads
+that row's stored value by primary key, so stored timestamps compare
+exactly (on SQLite the stored text may not match a bound datetime's
+format); the encoded value is only used when the row has been deleted.
+List endpoints return the next page's cursor in the X-Next-Cursor header.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, func, literal, select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, column) -> tuple:
+    """(sort value, id) of a cursor; 400 when it was not made by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def paginate(query, column, id_column, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """Order query by (column, id) and take a page after cursor, or after skip rows without one"""
+    query = query.order_by(column, id_column)
+    if cursor:
+        value, row_id = decode_cursor(cursor, column)
+        stored = select(column).where(id_column == row_id).scalar_subquery()
+        query = query.filter(
+            tuple_(column, id_column) > tuple_(func.coalesce(stored, literal(value, type_=column.type)), row_id)
+        )
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence, column, limit: int) -> Optional[str]:
+    """Cursor for the page after items, None when items is the last (short) page"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, column.key), last.id)
+
+
+def set_next_cursor(response: Response, items: Sequence, column, limit: int):
+    cursor = next_cursor(items, column, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,134 @@
+"""
+Password hashing on a dedicated, bounded bcrypt pool
+
+bcrypt costs a few hundred milliseconds of CPU per call by design. Running
+it on the request threads lets a burst of logins take every core (and
+every threadpool slot) away from the rest of the API. Here hashes and
+checks run on PASSWORD_HASH_WORKERS threads (bcrypt releases the GIL, so
+threads use separate cores) and at most PASSWORD_HASH_MAX_PENDING calls
+may wait for them; beyond that callers get 503 instead of queueing
+indefinitely.
+
+The work factor comes from BCRYPT_ROUNDS. Hashes made with another cost
+are upgraded on the next successful login (see `needs_rehash`).
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+from fastapi import HTTPException, status
+
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def get_bcrypt_rounds() -> int:
+    """bcrypt work factor for new hashes, from BCRYPT_ROUNDS"""
+    return int(os.getenv("BCRYPT_ROUNDS", str(DEFAULT_BCRYPT_ROUNDS)))
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Work factor stored in a bcrypt hash ("$2b$12$..." -> 12), None if unreadable"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether the hash was made with a different work factor than the configured one"""
+    return hash_cost(hashed_password) != get_bcrypt_rounds()
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        # Malformed hash stored for the user
+        return False
+
+
+class PasswordHasher:
+    """Bounded bcrypt executor with queue-depth and latency counters"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+        self.max_pending = max_pending or int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(16 * self.workers)))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted and not finished (running + queued)
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    def _submit(self, fn: Callable[..., Any], *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servidor ocupado, tente novamente em instantes",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._busy_seconds += time.perf_counter() - started
+
+        return self._executor.submit(run)
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured work factor (blocks the caller, not a CPU)"""
+        return self._submit(_hash, password, get_bcrypt_rounds()).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(_check, password, hashed_password).result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_hash_ms": round(1000 * self._busy_seconds / self._completed, 1) if self._completed else 0.0,
+                "avg_wait_ms": round(1000 * self._wait_seconds / self._completed, 1) if self._completed else 0.0,
+                "bcrypt_rounds": get_bcrypt_rounds(),
+            }
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return password_hasher.verify(password, hashed_password)
+
+
+def get_password_hashing_stats() -> Dict[str, Any]:
+    return password_hasher.get_stats()
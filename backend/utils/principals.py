@@ -0,0 +1,100 @@
+"""
+Per-process cache of authenticated user principals
+
+Every authenticated request needs the caller's id, role and active flag.
+Instead of loading the user row each time, the principal is kept here for
+AUTH_PRINCIPAL_TTL seconds, keyed by the JWT `sub`, in a bounded LRU.
+
+Tokens carry the user's `token_version` (claim "ver"). `crud.update_user`
+bumps it when the password, role, email or active flag changes and drops
+the local entry, so this process re-reads the user at once; other worker
+processes do so when their entry expires or when a token with a newer
+version shows up. Tokens with an older version are rejected.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from models import UserRole
+
+
+class Principal(NamedTuple):
+    """What the request handlers need to know about the authenticated user"""
+    id: int
+    email: str
+    nome: str
+    role: UserRole
+    ativo: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            nome=user.nome,
+            role=user.role,
+            ativo=user.ativo,
+            token_version=user.token_version or 0
+        )
+
+
+class PrincipalCache:
+    """Thread-safe LRU of principals with a fixed time-to-live"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.maxsize = maxsize or int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "1024"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("AUTH_PRINCIPAL_TTL", "30"))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, sub: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[sub]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(sub)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, sub: str, principal: Principal):
+        with self._lock:
+            self._entries[sub] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sub: str):
+        with self._lock:
+            self._entries.pop(sub, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(*subs: str):
+    """Drop cached principals (after a change to the user's access)"""
+    for sub in subs:
+        if sub:
+            principal_cache.invalidate(sub)
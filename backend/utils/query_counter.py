@@ -0,0 +1,73 @@
+"""
+SQL statement counting and per-request query budget
+
+Used by the test suite to catch N+1 regressions: when `SQL_QUERY_BUDGET`
+is set, any request that issues more statements than the budget fails.
+"""
+import os
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_current_counter: ContextVar[Optional["QueryCounter"]] = ContextVar("sql_query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    """Record the statement on the active counter, if any"""
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+class QueryCounter:
+    """Context manager counting SQL statements executed in the current context"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._token = None
+
+    def __enter__(self) -> "QueryCounter":
+        self._token = _current_counter.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_counter.reset(self._token)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+def get_query_budget() -> Optional[int]:
+    """Maximum statements per request, from SQL_QUERY_BUDGET (disabled when unset)"""
+    budget = os.getenv("SQL_QUERY_BUDGET")
+    return int(budget) if budget else None
+
+
+async def query_budget_middleware(request: Request, call_next):
+    """Fail requests that issue more SQL statements than the configured budget"""
+    budget = get_query_budget()
+    if budget is None:
+        return await call_next(request)
+
+    with QueryCounter() as counter:
+        response = await call_next(request)
+
+    if counter.count > budget:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "detail": "SQL query budget exceeded",
+                "queries": counter.count,
+                "budget": budget
+            }
+        )
+
+    response.headers["X-SQL-Queries"] = str(counter.count)
+    return response
@@ -1,93 +1,176 @@
 """
 Rate limiting middleware for API protection
+
+Each (client, rule) pair has its own sliding-window counter: the request
+counts of the current and previous fixed windows, with the previous one
+weighted by how much of it still overlaps the sliding window. That is
+three numbers per bucket no matter how many requests a client makes, so
+login attempts, public booking and the general API limit are tracked
+separately without keeping any timestamps.
+
+Buckets live in RATE_LIMIT_SHARDS shards, each with its own lock. Buckets
+idle for two windows hold no information and are dropped as new buckets
+are created in their shard; RATE_LIMIT_MAX_BUCKETS caps the total by
+dropping the buckets whose window is oldest.
 """
+import math
+import os
+import re
+import threading
 import time
-from typing import Dict, Tuple
+from typing import Dict, Hashable, Optional, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
-import hashlib
-from collections import defaultdict, deque
+
+
+# Rate limit rules: {path_prefix: (requests, window_seconds)}
+DEFAULT_RULES = {
+    'default': (100, 60),  # 100 requests per minute by default
+    '/api/auth/login': (5, 300),  # 5 login attempts per 5 minutes
+    '/api/public/': (20, 60),  # 20 requests per minute for public endpoints
+    '/api/pos/': (50, 60),  # 50 POS requests per minute
+    '/api/appointments': (30, 60),  # 30 appointment requests per minute
+}
+
+# Expired buckets checked per new bucket; keeps eviction cost constant
+_EVICT_PER_CALL = 2
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self, rules: int):
+        self.lock = threading.Lock()
+        # One dict per rule: client_id -> [window_index, previous_count, current_count].
+        # A bucket is re-inserted when its window rolls, so each dict is ordered
+        # by window and the stale ones are at the front.
+        self.buckets = [{} for _ in range(rules)]
 
 
 class RateLimiter:
-    """Simple rate limiter with sliding window"""
-    
-    def __init__(self):
-        # Store request timestamps for each client
-        self._clients: Dict[str, deque] = defaultdict(deque)
-        # Rate limit rules: {endpoint_pattern: (requests, window_seconds)}
-        self._rules = {
-            'default': (100, 60),  # 100 requests per minute by default
-            '/api/auth/login': (5, 300),  # 5 login attempts per 5 minutes
-            '/api/public/': (20, 60),  # 20 requests per minute for public endpoints
-            '/api/pos/': (50, 60),  # 50 POS requests per minute
-            '/api/appointments': (30, 60),  # 30 appointment requests per minute
-        }
-    
-    def _get_client_id(self, request: Request) -> str:
-        """Generate client identifier from IP and User-Agent"""
+    """Sharded sliding-window-counter rate limiter keyed by (client, rule)"""
+
+    def __init__(self, rules: Optional[Dict[str, Tuple[int, int]]] = None,
+                 shards: Optional[int] = None, max_buckets: Optional[int] = None):
+        self._rules = dict(rules or DEFAULT_RULES)
+        self._compile_rules()
+        self._shard_count = shards or int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+        self.max_buckets = max_buckets or int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+        self._shards = [_Shard(len(self._rule_list)) for _ in range(self._shard_count)]
+        self._shard_capacity = max(1, self.max_buckets // self._shard_count)
+        # Plain counters: increments under different shard locks may race,
+        # which only makes the stats approximate
+        self._allowed = 0
+        self._rejected = 0
+        self._evicted = 0
+
+    def _compile_rules(self):
+        """One anchored regex over all prefixes, longest first, so a match is a single C call"""
+        patterns = sorted((p for p in self._rules if p != 'default'), key=len, reverse=True)
+        self._rule_list = [self._rules['default']] + [self._rules[p] for p in patterns]
+        self._matcher = re.compile("|".join(f"({re.escape(p)})" for p in patterns)).match if patterns else None
+
+    def _get_client_id(self, request: Request) -> int:
+        """Client identifier from IP and User-Agent (a salted in-process hash, never stored raw)"""
         client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "")
-        
-        # Create hash of IP + User-Agent for privacy
-        client_data = f"{client_ip}:{user_agent}"
-        return hashlib.md5(client_data.encode()).hexdigest()[:16]
-    
+        return hash((client_ip, request.headers.get("user-agent", "")))
+
+    def _get_rule_index(self, path: str) -> int:
+        match = self._matcher(path) if self._matcher else None
+        return match.lastindex if match else 0
+
     def _get_rule_for_path(self, path: str) -> Tuple[int, int]:
         """Get rate limit rule for given path"""
-        for pattern, rule in self._rules.items():
-            if pattern != 'default' and pattern in path:
-                return rule
-        return self._rules['default']
-    
-    def _cleanup_old_requests(self, client_requests: deque, window_seconds: int):
-        """Remove requests older than window"""
-        current_time = time.time()
-        while client_requests and client_requests[0] < current_time - window_seconds:
-            client_requests.popleft()
-    
-    def is_allowed(self, request: Request) -> Tuple[bool, Dict[str, any]]:
-        """Check if request is allowed under rate limits"""
-        client_id = self._get_client_id(request)
-        path = request.url.path
-        max_requests, window_seconds = self._get_rule_for_path(path)
-        
-        current_time = time.time()
-        client_requests = self._clients[client_id]
-        
-        # Clean up old requests
-        self._cleanup_old_requests(client_requests, window_seconds)
-        
-        # Check if limit exceeded
-        if len(client_requests) >= max_requests:
-            # Calculate retry after time
-            oldest_request = client_requests[0]
-            retry_after = int(oldest_request + window_seconds - current_time)
-            
+        return self._rule_list[self._get_rule_index(path)]
+
+    def _evict(self, shard: _Shard, buckets: dict, window: int):
+        """Drop buckets idle for two windows, and the oldest ones beyond capacity"""
+        over = sum(map(len, shard.buckets)) - self._shard_capacity
+        for _ in range(_EVICT_PER_CALL):
+            if not buckets:
+                return
+            key = next(iter(buckets))
+            if buckets[key][0] >= window - 1 and over <= 0:
+                return
+            del buckets[key]
+            over -= 1
+            self._evicted += 1
+
+    def check(self, client_id: Hashable, path: str, now: Optional[float] = None) -> Tuple[bool, Dict[str, any]]:
+        """Count a request from client_id to path; (allowed, limit info)"""
+        if now is None:
+            now = time.time()
+        match = self._matcher(path) if self._matcher else None
+        rule_index = match.lastindex if match else 0
+        max_requests, window_seconds = self._rule_list[rule_index]
+        window = int(now // window_seconds)
+        shard = self._shards[hash(client_id) % self._shard_count]
+
+        with shard.lock:
+            buckets = shard.buckets[rule_index]
+            bucket = buckets.get(client_id)
+            if bucket is None or bucket[0] != window:
+                # New window: the current count becomes the previous one
+                # (more than one window idle clears both)
+                previous = bucket[2] if bucket is not None and bucket[0] == window - 1 else 0
+                if bucket is not None:
+                    del buckets[client_id]
+                bucket = buckets[client_id] = [window, previous, 0]
+                self._evict(shard, buckets, window)
+
+            if bucket[1]:
+                estimated = bucket[1] * (1 - (now - window * window_seconds) / window_seconds) + bucket[2]
+            else:
+                estimated = bucket[2]
+
+            if estimated + 1 > max_requests:
+                self._rejected += 1
+                retry_after = self._retry_after(bucket, max_requests, window_seconds, now)
+            else:
+                bucket[2] += 1
+                self._allowed += 1
+                retry_after = None
+
+        if retry_after is not None:
             return False, {
-                'retry_after': max(retry_after, 1),
+                'retry_after': retry_after,
                 'limit': max_requests,
                 'window': window_seconds,
                 'remaining': 0
             }
-        
-        # Add current request
-        client_requests.append(current_time)
-        
         return True, {
             'limit': max_requests,
             'window': window_seconds,
-            'remaining': max_requests - len(client_requests)
+            'remaining': max(int(max_requests - estimated - 1), 0)
         }
-    
+
+    @staticmethod
+    def _retry_after(bucket: list, max_requests: int, window_seconds: int, now: float) -> int:
+        """Seconds until the weighted count leaves room for one more request"""
+        window_end = (bucket[0] + 1) * window_seconds
+        previous, current = bucket[1], bucket[2]
+        if current + 1 > max_requests or previous == 0:
+            # Only the next window has room
+            wait = window_end - now
+        else:
+            # previous * (1 - elapsed / window) + current <= max_requests - 1
+            elapsed_needed = window_seconds * (1 - (max_requests - 1 - current) / previous)
+            wait = bucket[0] * window_seconds + elapsed_needed - now
+        return max(math.ceil(wait), 1)
+
+    def is_allowed(self, request: Request) -> Tuple[bool, Dict[str, any]]:
+        """Check if request is allowed under rate limits"""
+        return self.check(self._get_client_id(request), request.url.path)
+
     def get_stats(self) -> Dict[str, any]:
         """Get rate limiter statistics"""
-        active_clients = len(self._clients)
-        total_requests = sum(len(requests) for requests in self._clients.values())
-        
         return {
-            'active_clients': active_clients,
-            'total_tracked_requests': total_requests,
+            'tracked_buckets': sum(len(buckets) for shard in self._shards for buckets in shard.buckets),
+            'max_buckets': self.max_buckets,
+            'shards': self._shard_count,
+            'allowed': self._allowed,
+            'rejected': self._rejected,
+            'evicted': self._evicted,
             'rules': self._rules
         }
 
@@ -99,17 +182,16 @@ rate_limiter = RateLimiter()
 async def rate_limit_middleware(request: Request, call_next):
     """Rate limiting middleware"""
     # Skip rate limiting for test environment
-    import os
     if os.getenv("TESTING") == "true":
         return await call_next(request)
-        
+
     # Skip rate limiting for health check
     if request.url.path == "/api/health":
         return await call_next(request)
-    
+
     # Check rate limits
     allowed, info = rate_limiter.is_allowed(request)
-    
+
     if not allowed:
         return JSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -126,18 +208,18 @@ async def rate_limit_middleware(request: Request, call_next):
                 "X-RateLimit-Reset": str(int(time.time() + info['retry_after']))
             }
         )
-    
+
     # Process request
     response = await call_next(request)
-    
+
     # Add rate limit headers to response
     response.headers["X-RateLimit-Limit"] = str(info['limit'])
     response.headers["X-RateLimit-Remaining"] = str(info['remaining'])
     response.headers["X-RateLimit-Window"] = str(info['window'])
-    
+
     return response
 
 
 def get_rate_limit_stats():
     """Get current rate limiting statistics"""
-    return rate_limiter.get_stats()
\ No newline at end of file
+    return rate_limiter.get_stats()
@@ -0,0 +1,117 @@
+"""
+Report data layer: the numbers behind each report sheet, computed in SQL
+
+Every function runs `GROUP BY` queries over the period (day, payment
+method, service, barber), so the cost of building a report depends on the
+number of groups rather than on the number of sales and appointments.
+"""
+from datetime import date
+from typing import Dict
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from models import Appointment, AppointmentStatus, Sale, SaleItem, Service, User
+from utils.date_ranges import as_date, filter_date_range
+
+
+def sales_summary(db: Session, start_date: date, end_date: date) -> Dict:
+    """Revenue and number of sales in the period"""
+    total, count = filter_date_range(
+        db.query(func.coalesce(func.sum(Sale.total), 0.0), func.count(Sale.id)),
+        Sale.criado_em, start_date, end_date
+    ).one()
+    return {"total_revenue": float(total), "sales_count": count}
+
+
+def appointments_count(db: Session, start_date: date, end_date: date) -> int:
+    return filter_date_range(
+        db.query(func.count(Appointment.id)), Appointment.data_hora, start_date, end_date
+    ).scalar()
+
+
+def daily_sales(db: Session, start_date: date, end_date: date) -> Dict[date, float]:
+    """Revenue per day (days without sales are absent)"""
+    day = func.date(Sale.criado_em)
+    rows = filter_date_range(
+        db.query(day, func.sum(Sale.total)), Sale.criado_em, start_date, end_date
+    ).group_by(day)
+    return {as_date(sale_day): total for sale_day, total in rows}
+
+
+def payment_methods(db: Session, start_date: date, end_date: date) -> Dict[str, Dict]:
+    """Number of sales and revenue per payment method, highest revenue first"""
+    total = func.sum(Sale.total)
+    rows = filter_date_range(
+        db.query(Sale.metodo_pagamento, func.count(Sale.id), total), Sale.criado_em, start_date, end_date
+    ).group_by(Sale.metodo_pagamento).order_by(total.desc())
+    return {method.value: {"count": count, "total": method_total} for method, count, method_total in rows}
+
+
+def services_performance(db: Session, start_date: date, end_date: date) -> Dict[str, Dict]:
+    """Quantity sold, sales revenue and appointments per service name"""
+    services: Dict[str, Dict] = {}
+
+    def entry(name):
+        return services.setdefault(name, {"sales_count": 0, "sales_total": 0, "appointments": 0})
+
+    sold = filter_date_range(
+        db.query(Service.nome, func.sum(SaleItem.quantidade), func.sum(SaleItem.subtotal))
+        .select_from(SaleItem)
+        .join(Sale, SaleItem.venda_id == Sale.id)
+        .join(Service, SaleItem.servico_id == Service.id),
+        Sale.criado_em, start_date, end_date
+    ).group_by(Service.id, Service.nome)
+    for name, quantidade, subtotal in sold:
+        entry(name)["sales_count"] += quantidade or 0
+        entry(name)["sales_total"] += subtotal or 0
+
+    booked = filter_date_range(
+        db.query(Service.nome, func.count(Appointment.id))
+        .select_from(Appointment)
+        .join(Service, Appointment.servico_id == Service.id),
+        Appointment.data_hora, start_date, end_date
+    ).group_by(Service.id, Service.nome)
+    for name, count in booked:
+        entry(name)["appointments"] += count
+
+    return services
+
+
+def barber_performance(db: Session, start_date: date, end_date: date) -> Dict[str, Dict]:
+    """Appointments, completed / cancelled counts and completed revenue per barber"""
+    completed = Appointment.status == AppointmentStatus.CONCLUIDO
+    rows = filter_date_range(
+        db.query(
+            User.nome,
+            func.count(Appointment.id),
+            func.sum(case((completed, 1), else_=0)),
+            func.sum(case((Appointment.status == AppointmentStatus.CANCELADO, 1), else_=0)),
+            func.sum(case((completed, Service.preco), else_=0))
+        )
+        .select_from(Appointment)
+        .join(User, Appointment.barbeiro_id == User.id)
+        .join(Service, Appointment.servico_id == Service.id),
+        Appointment.data_hora, start_date, end_date
+    ).group_by(User.id, User.nome)
+
+    barbers: Dict[str, Dict] = {}
+    for name, total, done, cancelled, revenue in rows:
+        barber = barbers.setdefault(name, {"appointments": 0, "completed": 0, "cancelled": 0, "revenue": 0})
+        barber["appointments"] += total
+        barber["completed"] += done or 0
+        barber["cancelled"] += cancelled or 0
+        barber["revenue"] += revenue or 0
+    return barbers
+
+
+def financial_report_data(db: Session, start_date: date, end_date: date) -> Dict:
+    """Everything the financial report sheets need (seven grouped queries)"""
+    return {
+        **sales_summary(db, start_date, end_date),
+        "appointments_count": appointments_count(db, start_date, end_date),
+        "daily": daily_sales(db, start_date, end_date),
+        "payment_methods": payment_methods(db, start_date, end_date),
+        "services": services_performance(db, start_date, end_date),
+        "barbers": barber_performance(db, start_date, end_date),
+    }
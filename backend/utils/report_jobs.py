@@ -0,0 +1,238 @@
+"""
+Background report jobs
+
+Reports are rendered in a process pool instead of inside request handlers,
+so openpyxl / reportlab work never blocks the event loop. Each job is a
+JSON file in REPORT_JOBS_DIR, written by the worker as it progresses, so
+any web worker process can answer status requests. Finished artifacts are
+kept for REPORT_ARTIFACT_TTL seconds and downloaded with a per-job token.
+
+Identical requests (same user, type, range and format) made while the
+data they read is unchanged reuse the existing job: the artifact cache key includes
+the table versions bumped on every committed write (see utils/cache.py).
+With the per-process memory cache a worker misses the other workers'
+bumps, so jobs are only reused for REPORT_REUSE_TTL seconds there.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import secrets
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, Optional
+
+from utils.cache import cache, get_table_versions, versioned_ttl
+
+REPORT_TABLES = {
+    "financial": ("sales", "sale_items", "appointments", "services", "users"),
+    "clients": ("clients", "appointments"),
+    "appointments": ("appointments", "clients", "users", "services"),
+}
+
+MEDIA_TYPES = {
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+EXTENSIONS = {"excel": "xlsx", "pdf": "pdf"}
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    """Atomically replace a job file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _update_job(path: str, **changes):
+    """Apply changes to a job file; a no-op once cleanup_expired has deleted it"""
+    job = _read_json(path)
+    if job is None:
+        return
+    job.update(changes)
+    _write_json(path, job)
+
+
+def run_report_job(job_path: str, artifact_ttl: int):
+    """
+    Render one report (runs in a pool worker with its own database engine)
+
+    The engine is built from the worker's own DATABASE_URL setting, so the
+    credentials never travel through the pool's call queue.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import database
+    from utils.reports import ReportGenerator
+
+    job = _read_json(job_path)
+    engine = create_engine(database.DATABASE_URL)
+    session = sessionmaker(bind=engine)()
+
+    def progress(percent: int):
+        _update_job(job_path, status="running", progress=percent)
+
+    try:
+        progress(5)
+        generator = ReportGenerator(session, progress=progress)
+        start_date = date.fromisoformat(job["start_date"]) if job.get("start_date") else None
+        end_date = date.fromisoformat(job["end_date"]) if job.get("end_date") else None
+
+        if job["tipo"] == "financial":
+            report_file = generator.generate_financial_report(start_date, end_date, job["formato"])
+        elif job["tipo"] == "appointments":
+            report_file = generator.generate_appointment_report(start_date, end_date, job["formato"])
+        else:
+            report_file = generator.generate_client_report(job["formato"])
+
+        tmp_path = f"{job['artifact_path']}.tmp"
+        with report_file, open(tmp_path, "wb") as output:
+            shutil.copyfileobj(report_file, output)
+        os.replace(tmp_path, job["artifact_path"])
+
+        now = time.time()
+        _update_job(job_path, status="done", progress=100, finished_at=now, expires_at=now + artifact_ttl)
+    except Exception as e:
+        _update_job(job_path, status="failed", error=str(e))
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _record_crash(future, job_path: str):
+    """Mark the job failed when its worker died (run_report_job reports its own errors)"""
+    if not future.cancelled() and future.exception() is not None:
+        _update_job(job_path, status="failed", error=str(future.exception()))
+
+
+class ReportJobManager:
+    """Submit report jobs to a bounded pool and track them on disk"""
+
+    def __init__(
+        self,
+        jobs_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        artifact_ttl: Optional[int] = None,
+        executor: Optional[Executor] = None
+    ):
+        self.jobs_dir = jobs_dir or os.getenv(
+            "REPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "barbermanager_reports")
+        )
+        self.max_workers = max_workers or int(os.getenv("REPORT_JOB_WORKERS", "2"))
+        self.artifact_ttl = artifact_ttl or int(os.getenv("REPORT_ARTIFACT_TTL", "3600"))
+        self.reuse_ttl = min(self.artifact_ttl, int(os.getenv("REPORT_REUSE_TTL", "300")))
+        self._executor = executor
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use; "spawn" keeps workers clear of the server's threads and sockets
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _cache_key(self, owner_id: int, tipo: str, formato: str, start_date, end_date) -> str:
+        identity = [owner_id, tipo, formato, str(start_date), str(end_date), get_table_versions(REPORT_TABLES[tipo])]
+        return "report_jobs:" + hashlib.md5(json.dumps(identity).encode()).hexdigest()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job metadata, or None when unknown or expired"""
+        if not job_id.isalnum():
+            return None
+        job = _read_json(self._job_path(job_id))
+        if job is None or job.get("expires_at", 0) < time.time():
+            return None
+        return job
+
+    def submit(self, tipo: str, formato: str, owner_id: int,
+               start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        """Queue a report, or return the owner's live job already producing the same artifact"""
+        self.cleanup_expired()
+
+        cache_key = self._cache_key(owner_id, tipo, formato, start_date, end_date)
+        cached_job_id = cache.get(cache_key)
+        if cached_job_id:
+            job = self.get(cached_job_id)
+            if job is not None and job["status"] != "failed" and job["owner_id"] == owner_id:
+                return job
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "tipo": tipo,
+            "formato": formato,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "owner_id": owner_id,
+            "status": "pending",
+            "progress": 0,
+            "error": None,
+            "created_at": now,
+            "finished_at": None,
+            # Pending jobs expire too, in case the worker dies without reporting
+            "expires_at": now + self.artifact_ttl,
+            "token": secrets.token_urlsafe(32),
+            "artifact_path": os.path.join(self.jobs_dir, f"{job_id}.{EXTENSIONS[formato]}"),
+            "filename": "_".join(
+                ["relatorio", tipo] + ([str(start_date), str(end_date)] if start_date else [])
+            ) + f".{EXTENSIONS[formato]}",
+            "media_type": MEDIA_TYPES[formato],
+        }
+        job_path = self._job_path(job_id)
+        _write_json(job_path, job)
+
+        future = self.executor.submit(run_report_job, job_path, self.artifact_ttl)
+        future.add_done_callback(lambda f: _record_crash(f, job_path))
+        cache.set(cache_key, job_id, versioned_ttl(self.reuse_ttl, self.artifact_ttl))
+        return job
+
+    def artifact(self, job_id: str, token: str) -> Optional[Dict[str, Any]]:
+        """Finished job whose download token matches, or None"""
+        job = self.get(job_id)
+        if job is None or job["status"] != "done" or not secrets.compare_digest(job["token"], token):
+            return None
+        return job
+
+    def cleanup_expired(self):
+        """Delete expired job files and their artifacts"""
+        now = time.time()
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            job = _read_json(os.path.join(self.jobs_dir, name))
+            if job is None or job.get("expires_at", 0) >= now:
+                continue
+            for path in (job.get("artifact_path"), os.path.join(self.jobs_dir, name)):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+
+_manager: Optional[ReportJobManager] = None
+
+
+def get_report_job_manager() -> ReportJobManager:
+    """Process-wide job manager"""
+    global _manager
+    if _manager is None:
+        _manager = ReportJobManager()
+    return _manager
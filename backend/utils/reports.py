@@ -1,12 +1,15 @@
 import io
+import tempfile
 import pandas as pd
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.chart import BarChart, Reference
+from openpyxl.utils import get_column_letter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
@@ -21,303 +24,262 @@ from io import BytesIO
 import base64
 
 from models import Appointment, Client, Service, Sale, User, AppointmentStatus, PaymentMethod
-from crud import get_appointments, get_clients, get_services, get_sales
+from utils.date_ranges import filter_date_range
+from utils.report_data import financial_report_data
+
+# Rows fetched per round trip while streaming (server-side cursor where supported)
+STREAM_BATCH_SIZE = 1000
+# Finished workbooks stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Size of each HTTP response body chunk
+REPORT_CHUNK_SIZE = 64 * 1024
+
+HEADER_FONT = Font(bold=True)
+HEADER_FILL = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+TITLE_FONT = Font(size=16, bold=True)
+
+WEEKDAYS_PT = {
+    "Monday": "Segunda", "Tuesday": "Terça", "Wednesday": "Quarta",
+    "Thursday": "Quinta", "Friday": "Sexta", "Saturday": "Sábado", "Sunday": "Domingo"
+}
+
+
+def iter_report_chunks(report_file: BinaryIO, chunk_size: int = REPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a finished report in chunks and close it afterwards"""
+    try:
+        while True:
+            chunk = report_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        report_file.close()
+
+
+def _cell(ws, value, font: Font = None, fill: PatternFill = None) -> WriteOnlyCell:
+    """Styled cell for write-only worksheets"""
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    return cell
+
+
+def _append_header(ws, headers: List[str]):
+    ws.append([_cell(ws, header, HEADER_FONT, HEADER_FILL) for header in headers])
+
+
+def _set_column_widths(ws, widths: List[int]):
+    """Write-only sheets can't be measured afterwards, so widths are set up front"""
+    for index, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+
+def _save_workbook(wb) -> BinaryIO:
+    """Serialize a workbook into a spooled temp file (in memory while small)"""
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    wb.save(output)
+    output.seek(0)
+    return output
+
 
 class ReportGenerator:
-    """Advanced report generator with Excel and PDF support"""
-    
-    def __init__(self, db: Session):
+    """
+    Advanced report generator with Excel and PDF support
+
+    Excel reports are produced with write-only worksheets fed by streamed
+    queries (`yield_per`), so memory stays bounded regardless of the period;
+    financial sheets are built from grouped queries (utils/report_data.py).
+    Reports are returned as binary file objects positioned at the start.
+    """
+
+    def __init__(self, db: Session, progress: Optional[Callable[[int], None]] = None):
         self.db = db
         self.styles = getSampleStyleSheet()
-        
+        self.progress = progress
+
+    def _report_progress(self, percent: int):
+        """Notify the optional progress callback (used by background report jobs)"""
+        if self.progress:
+            self.progress(percent)
+
     def generate_financial_report(
-        self, 
-        start_date: date, 
+        self,
+        start_date: date,
         end_date: date,
         format_type: str = "excel"
-    ) -> bytes:
+    ) -> BinaryIO:
         """Generate comprehensive financial report"""
-        
-        # Get sales data
-        sales = self.db.query(Sale).filter(
-            func.date(Sale.criado_em) >= start_date,
-            func.date(Sale.criado_em) <= end_date
-        ).all()
-        
-        # Get appointments data
-        appointments = self.db.query(Appointment).filter(
-            func.date(Appointment.data_hora) >= start_date,
-            func.date(Appointment.data_hora) <= end_date
-        ).all()
-        
+
+        data = financial_report_data(self.db, start_date, end_date)
+        self._report_progress(50)
+
         if format_type == "excel":
-            return self._generate_financial_excel(sales, appointments, start_date, end_date)
+            return self._generate_financial_excel(data, start_date, end_date)
         else:
-            return self._generate_financial_pdf(sales, appointments, start_date, end_date)
-    
-    def _generate_financial_excel(self, sales, appointments, start_date, end_date) -> bytes:
+            return self._generate_financial_pdf(data, start_date, end_date)
+
+    def _generate_financial_excel(self, data, start_date, end_date) -> BinaryIO:
         """Generate financial report in Excel format"""
-        
-        # Create workbook
-        wb = openpyxl.Workbook()
-        
-        # Remove default sheet
-        wb.remove(wb.active)
-        
+
+        wb = openpyxl.Workbook(write_only=True)
+
         # 1. Summary Sheet
         ws_summary = wb.create_sheet("Resumo Financeiro")
-        self._create_financial_summary_sheet(ws_summary, sales, appointments, start_date, end_date)
-        
+        self._create_financial_summary_sheet(ws_summary, data, start_date, end_date)
+
         # 2. Sales by Day
         ws_daily = wb.create_sheet("Vendas Diárias")
-        self._create_daily_sales_sheet(ws_daily, sales, start_date, end_date)
-        
+        self._create_daily_sales_sheet(ws_daily, data, start_date, end_date)
+
         # 3. Payment Methods
         ws_payment = wb.create_sheet("Métodos de Pagamento")
-        self._create_payment_methods_sheet(ws_payment, sales)
-        
+        self._create_payment_methods_sheet(ws_payment, data)
+
         # 4. Services Performance
         ws_services = wb.create_sheet("Performance Serviços")
-        self._create_services_performance_sheet(ws_services, sales, appointments)
-        
+        self._create_services_performance_sheet(ws_services, data)
+
         # 5. Barber Performance
         ws_barbers = wb.create_sheet("Performance Barbeiros")
-        self._create_barber_performance_sheet(ws_barbers, appointments)
-        
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
-    
-    def _create_financial_summary_sheet(self, ws, sales, appointments, start_date, end_date):
+        self._create_barber_performance_sheet(ws_barbers, data)
+        self._report_progress(80)
+
+        return _save_workbook(wb)
+
+    def _create_financial_summary_sheet(self, ws, data, start_date, end_date):
         """Create financial summary sheet"""
-        
-        # Title
-        ws['A1'] = "RELATÓRIO FINANCEIRO"
-        ws['A1'].font = Font(size=16, bold=True)
-        ws['A2'] = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        
-        # Total revenue
-        total_revenue = sum(sale.total for sale in sales)
-        total_appointments = len(appointments)
-        
-        # Revenue by payment method
-        revenue_cash = sum(sale.total for sale in sales if sale.metodo_pagamento == PaymentMethod.DINHEIRO)
-        revenue_card = sum(sale.total for sale in sales if sale.metodo_pagamento in [PaymentMethod.CARTAO_CREDITO, PaymentMethod.CARTAO_DEBITO])
-        revenue_pix = sum(sale.total for sale in sales if sale.metodo_pagamento == PaymentMethod.PIX)
-        
+
+        total_revenue = data["total_revenue"]
+        sales_count = data["sales_count"]
+        payment = data["payment_methods"]
+
+        def method_total(*methods):
+            return sum(payment.get(method.value, {}).get("total", 0) for method in methods)
+
         # Summary data
         summary_data = [
-            ["Métrica", "Valor"],
             ["Total de Vendas", f"R$ {total_revenue:.2f}"],
-            ["Total de Agendamentos", total_appointments],
-            ["Ticket Médio", f"R$ {total_revenue/len(sales) if sales else 0:.2f}"],
+            ["Total de Agendamentos", data["appointments_count"]],
+            ["Ticket Médio", f"R$ {total_revenue/sales_count if sales_count else 0:.2f}"],
             ["", ""],
             ["Vendas por Método de Pagamento", ""],
-            ["Dinheiro", f"R$ {revenue_cash:.2f}"],
-            ["Cartão", f"R$ {revenue_card:.2f}"],
-            ["PIX", f"R$ {revenue_pix:.2f}"],
+            ["Dinheiro", f"R$ {method_total(PaymentMethod.DINHEIRO):.2f}"],
+            ["Cartão", f"R$ {method_total(PaymentMethod.CARTAO_CREDITO, PaymentMethod.CARTAO_DEBITO):.2f}"],
+            ["PIX", f"R$ {method_total(PaymentMethod.PIX):.2f}"],
         ]
-        
+
+        _set_column_widths(ws, [32, 20])
+
+        # Title
+        ws.append([_cell(ws, "RELATÓRIO FINANCEIRO", TITLE_FONT)])
+        ws.append([f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"])
+        ws.append([])
+
         # Write data
-        for row_idx, row_data in enumerate(summary_data, start=4):
-            for col_idx, value in enumerate(row_data, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                if row_idx == 4:  # Header
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    def _create_daily_sales_sheet(self, ws, sales, start_date, end_date):
+        _append_header(ws, ["Métrica", "Valor"])
+        for row_data in summary_data:
+            ws.append(row_data)
+
+    def _create_daily_sales_sheet(self, ws, data, start_date, end_date):
         """Create daily sales analysis sheet"""
-        
-        # Group sales by date
-        daily_sales = {}
-        for sale in sales:
-            sale_date = sale.criado_em.date()
-            if sale_date not in daily_sales:
-                daily_sales[sale_date] = 0
-            daily_sales[sale_date] += sale.total
-        
-        # Create date range
-        current_date = start_date
-        headers = ["Data", "Vendas (R$)", "Dia da Semana"]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+
+        daily_sales = data["daily"]
+
+        _set_column_widths(ws, [12, 14, 14])
+        _append_header(ws, ["Data", "Vendas (R$)", "Dia da Semana"])
+
         # Add daily data
+        current_date = start_date
         while current_date <= end_date:
             day_sales = daily_sales.get(current_date, 0)
             weekday = current_date.strftime("%A")
-            weekday_pt = {
-                "Monday": "Segunda", "Tuesday": "Terça", "Wednesday": "Quarta",
-                "Thursday": "Quinta", "Friday": "Sexta", "Saturday": "Sábado", "Sunday": "Domingo"
-            }.get(weekday, weekday)
-            
+
             ws.append([
                 current_date.strftime("%d/%m/%Y"),
                 f"{day_sales:.2f}",
-                weekday_pt
+                WEEKDAYS_PT.get(weekday, weekday)
             ])
             current_date += timedelta(days=1)
-        
+
         # Add chart
+        last_row = (end_date - start_date).days + 2
         chart = BarChart()
         chart.title = "Vendas Diárias"
         chart.y_axis.title = "Valor (R$)"
         chart.x_axis.title = "Data"
-        
-        data = Reference(ws, min_col=2, min_row=1, max_row=ws.max_row, max_col=2)
-        categories = Reference(ws, min_col=1, min_row=2, max_row=ws.max_row)
-        chart.add_data(data, titles_from_data=True)
+
+        chart_data = Reference(ws, min_col=2, min_row=1, max_row=last_row, max_col=2)
+        categories = Reference(ws, min_col=1, min_row=2, max_row=last_row)
+        chart.add_data(chart_data, titles_from_data=True)
         chart.set_categories(categories)
-        
+
         ws.add_chart(chart, "E2")
-    
-    def _create_payment_methods_sheet(self, ws, sales):
+
+    def _create_payment_methods_sheet(self, ws, data):
         """Create payment methods analysis sheet"""
-        
-        # Group by payment method
-        payment_data = {}
-        for sale in sales:
-            method = sale.metodo_pagamento.value
-            if method not in payment_data:
-                payment_data[method] = {"count": 0, "total": 0}
-            payment_data[method]["count"] += 1
-            payment_data[method]["total"] += sale.total
-        
-        # Headers
-        headers = ["Método de Pagamento", "Quantidade", "Total (R$)", "Percentual"]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+
+        payment_data = data["payment_methods"]
+
+        _set_column_widths(ws, [22, 12, 14, 12])
+        _append_header(ws, ["Método de Pagamento", "Quantidade", "Total (R$)", "Percentual"])
+
         # Calculate total for percentage
-        total_sales = sum(data["total"] for data in payment_data.values())
-        
+        total_sales = sum(method["total"] for method in payment_data.values())
+
         # Add data
-        for method, data in payment_data.items():
-            percentage = (data["total"] / total_sales * 100) if total_sales > 0 else 0
+        for method, method_data in payment_data.items():
+            percentage = (method_data["total"] / total_sales * 100) if total_sales > 0 else 0
             ws.append([
                 method,
-                data["count"],
-                f"{data['total']:.2f}",
+                method_data["count"],
+                f"{method_data['total']:.2f}",
                 f"{percentage:.1f}%"
             ])
-    
-    def _create_services_performance_sheet(self, ws, sales, appointments):
+
+    def _create_services_performance_sheet(self, ws, data):
         """Create services performance analysis sheet"""
-        
-        # Group by service
-        service_data = {}
-        
-        # From sales
-        for sale in sales:
-            for item in sale.itens:
-                service_name = item.servico.nome if hasattr(item, 'servico') else f"Serviço ID {item.servico_id}"
-                if service_name not in service_data:
-                    service_data[service_name] = {"sales_count": 0, "sales_total": 0, "appointments": 0}
-                service_data[service_name]["sales_count"] += item.quantidade
-                service_data[service_name]["sales_total"] += item.subtotal
-        
-        # From appointments
-        for appointment in appointments:
-            service_name = appointment.servico.nome
-            if service_name not in service_data:
-                service_data[service_name] = {"sales_count": 0, "sales_total": 0, "appointments": 0}
-            service_data[service_name]["appointments"] += 1
-        
-        # Headers
-        headers = ["Serviço", "Vendas Qtd", "Vendas Total (R$)", "Agendamentos", "Ticket Médio"]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+
+        _set_column_widths(ws, [30, 12, 18, 14, 14])
+        _append_header(ws, ["Serviço", "Vendas Qtd", "Vendas Total (R$)", "Agendamentos", "Ticket Médio"])
+
         # Add data
-        for service, data in sorted(service_data.items(), key=lambda x: x[1]["sales_total"], reverse=True):
-            avg_ticket = data["sales_total"] / data["sales_count"] if data["sales_count"] > 0 else 0
+        for service, service_data in sorted(data["services"].items(), key=lambda x: x[1]["sales_total"], reverse=True):
+            avg_ticket = service_data["sales_total"] / service_data["sales_count"] if service_data["sales_count"] > 0 else 0
             ws.append([
                 service,
-                data["sales_count"],
-                f"{data['sales_total']:.2f}",
-                data["appointments"],
+                service_data["sales_count"],
+                f"{service_data['sales_total']:.2f}",
+                service_data["appointments"],
                 f"{avg_ticket:.2f}"
             ])
-    
-    def _create_barber_performance_sheet(self, ws, appointments):
+
+    def _create_barber_performance_sheet(self, ws, data):
         """Create barber performance analysis sheet"""
-        
-        # Group by barber
-        barber_data = {}
-        for appointment in appointments:
-            barber_name = appointment.barbeiro.nome
-            if barber_name not in barber_data:
-                barber_data[barber_name] = {
-                    "appointments": 0,
-                    "completed": 0,
-                    "cancelled": 0,
-                    "revenue": 0
-                }
-            
-            barber_data[barber_name]["appointments"] += 1
-            
-            if appointment.status == AppointmentStatus.CONCLUIDO:
-                barber_data[barber_name]["completed"] += 1
-                barber_data[barber_name]["revenue"] += appointment.servico.preco
-            elif appointment.status == AppointmentStatus.CANCELADO:
-                barber_data[barber_name]["cancelled"] += 1
-        
-        # Headers
-        headers = ["Barbeiro", "Total Agendamentos", "Concluídos", "Cancelados", "Taxa Sucesso", "Receita (R$)"]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+
+        _set_column_widths(ws, [30, 18, 12, 12, 14, 14])
+        _append_header(ws, ["Barbeiro", "Total Agendamentos", "Concluídos", "Cancelados", "Taxa Sucesso", "Receita (R$)"])
+
         # Add data
-        for barber, data in sorted(barber_data.items(), key=lambda x: x[1]["revenue"], reverse=True):
-            success_rate = (data["completed"] / data["appointments"] * 100) if data["appointments"] > 0 else 0
+        for barber, barber_data in sorted(data["barbers"].items(), key=lambda x: x[1]["revenue"], reverse=True):
+            success_rate = (barber_data["completed"] / barber_data["appointments"] * 100) if barber_data["appointments"] > 0 else 0
             ws.append([
                 barber,
-                data["appointments"],
-                data["completed"],
-                data["cancelled"],
+                barber_data["appointments"],
+                barber_data["completed"],
+                barber_data["cancelled"],
                 f"{success_rate:.1f}%",
-                f"{data['revenue']:.2f}"
+                f"{barber_data['revenue']:.2f}"
             ])
-    
-    def _generate_financial_pdf(self, sales, appointments, start_date, end_date) -> bytes:
+
+    def _generate_financial_pdf(self, data, start_date, end_date) -> BinaryIO:
         """Generate financial report in PDF format"""
-        
+
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
-        
+
         # Title
         title_style = ParagraphStyle(
             'CustomTitle',
@@ -326,23 +288,22 @@ class ReportGenerator:
             spaceAfter=30,
             alignment=1  # Center
         )
-        
+
         story.append(Paragraph("RELATÓRIO FINANCEIRO", title_style))
         story.append(Paragraph(f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}", self.styles['Normal']))
         story.append(Spacer(1, 20))
-        
+
         # Financial Summary
-        total_revenue = sum(sale.total for sale in sales)
-        total_appointments = len(appointments)
-        avg_ticket = total_revenue / len(sales) if sales else 0
-        
+        total_revenue = data["total_revenue"]
+        avg_ticket = total_revenue / data["sales_count"] if data["sales_count"] else 0
+
         summary_data = [
             ['Métrica', 'Valor'],
             ['Total de Vendas', f'R$ {total_revenue:.2f}'],
-            ['Total de Agendamentos', str(total_appointments)],
+            ['Total de Agendamentos', str(data["appointments_count"])],
             ['Ticket Médio', f'R$ {avg_ticket:.2f}'],
         ]
-        
+
         summary_table = Table(summary_data)
         summary_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -354,33 +315,26 @@ class ReportGenerator:
             ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        
+
         story.append(summary_table)
         story.append(Spacer(1, 20))
-        
+
         # Payment Methods Analysis
         story.append(Paragraph("Análise por Método de Pagamento", self.styles['Heading2']))
-        
-        payment_data = {}
-        for sale in sales:
-            method = sale.metodo_pagamento.value
-            if method not in payment_data:
-                payment_data[method] = {"count": 0, "total": 0}
-            payment_data[method]["count"] += 1
-            payment_data[method]["total"] += sale.total
-        
+
+        payment_data = data["payment_methods"]
         payment_table_data = [['Método', 'Quantidade', 'Total (R$)', 'Percentual']]
-        total_sales = sum(data["total"] for data in payment_data.values())
-        
-        for method, data in payment_data.items():
-            percentage = (data["total"] / total_sales * 100) if total_sales > 0 else 0
+        total_sales = sum(method["total"] for method in payment_data.values())
+
+        for method, method_data in payment_data.items():
+            percentage = (method_data["total"] / total_sales * 100) if total_sales > 0 else 0
             payment_table_data.append([
                 method,
-                str(data["count"]),
-                f'R$ {data["total"]:.2f}',
+                str(method_data["count"]),
+                f'R$ {method_data["total"]:.2f}',
                 f'{percentage:.1f}%'
             ])
-        
+
         payment_table = Table(payment_table_data)
         payment_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -389,84 +343,73 @@ class ReportGenerator:
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        
+
         story.append(payment_table)
-        
+
         # Build PDF
         doc.build(story)
         buffer.seek(0)
-        return buffer.getvalue()
-    
-    def generate_client_report(self, format_type: str = "excel") -> bytes:
+        return buffer
+
+    def generate_client_report(self, format_type: str = "excel") -> BinaryIO:
         """Generate client analysis report"""
-        
-        clients = self.db.query(Client).filter(Client.ativo == True).all()
-        
+
         if format_type == "excel":
-            return self._generate_client_excel(clients)
+            return self._generate_client_excel()
         else:
-            return self._generate_client_pdf(clients)
-    
-    def _generate_client_excel(self, clients) -> bytes:
+            return self._generate_client_pdf()
+
+    def _active_clients(self):
+        return self.db.query(Client).filter(Client.ativo == True)
+
+    def _generate_client_excel(self) -> BinaryIO:
         """Generate client report in Excel format"""
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Relatório de Clientes"
-        
-        # Headers
-        headers = [
-            "Nome", "Email", "Telefone", "Data Cadastro", 
+
+        # Appointment count / last appointment per client, joined in SQL
+        appointment_stats = self.db.query(
+            Appointment.cliente_id,
+            func.count(Appointment.id).label("total"),
+            func.max(Appointment.data_hora).label("ultimo")
+        ).group_by(Appointment.cliente_id).subquery()
+
+        rows = self._active_clients().outerjoin(
+            appointment_stats, appointment_stats.c.cliente_id == Client.id
+        ).with_entities(
+            Client.nome, Client.email, Client.telefone, Client.criado_em, Client.aceite_lgpd,
+            appointment_stats.c.total, appointment_stats.c.ultimo
+        ).order_by(Client.id)
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Relatório de Clientes")
+
+        _set_column_widths(ws, [30, 32, 16, 14, 12, 20, 20])
+        _append_header(ws, [
+            "Nome", "Email", "Telefone", "Data Cadastro",
             "LGPD Aceito", "Total Agendamentos", "Último Agendamento"
-        ]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+        ])
+
         # Add client data
-        for client in clients:
-            appointments_count = len(client.agendamentos)
-            last_appointment = max(client.agendamentos, key=lambda x: x.data_hora).data_hora if client.agendamentos else None
-            
+        for nome, email, telefone, criado_em, aceite_lgpd, total, ultimo in rows.yield_per(STREAM_BATCH_SIZE):
             ws.append([
-                client.nome,
-                client.email or "",
-                client.telefone,
-                client.criado_em.strftime("%d/%m/%Y"),
-                "Sim" if client.aceite_lgpd else "Não",
-                appointments_count,
-                last_appointment.strftime("%d/%m/%Y") if last_appointment else ""
+                nome,
+                email or "",
+                telefone,
+                criado_em.strftime("%d/%m/%Y"),
+                "Sim" if aceite_lgpd else "Não",
+                total or 0,
+                ultimo.strftime("%d/%m/%Y") if ultimo else ""
             ])
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
-    
-    def _generate_client_pdf(self, clients) -> bytes:
+        self._report_progress(80)
+
+        return _save_workbook(wb)
+
+    def _generate_client_pdf(self) -> BinaryIO:
         """Generate client report in PDF format"""
-        
+
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
-        
+
         # Title
         title_style = ParagraphStyle(
             'CustomTitle',
@@ -475,21 +418,21 @@ class ReportGenerator:
             spaceAfter=30,
             alignment=1
         )
-        
+
         story.append(Paragraph("RELATÓRIO DE CLIENTES", title_style))
         story.append(Spacer(1, 20))
-        
+
         # Summary
-        total_clients = len(clients)
-        lgpd_compliant = sum(1 for client in clients if client.aceite_lgpd)
-        
+        total_clients = self._active_clients().count()
+        lgpd_compliant = self._active_clients().filter(Client.aceite_lgpd == True).count()
+
         summary_data = [
             ['Métrica', 'Valor'],
             ['Total de Clientes Ativos', str(total_clients)],
             ['Clientes com LGPD', str(lgpd_compliant)],
             ['Taxa de Conformidade LGPD', f'{(lgpd_compliant/total_clients*100):.1f}%' if total_clients > 0 else '0%'],
         ]
-        
+
         summary_table = Table(summary_data)
         summary_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -498,22 +441,22 @@ class ReportGenerator:
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        
+
         story.append(summary_table)
         story.append(Spacer(1, 20))
-        
+
         # Client list (first 50)
         story.append(Paragraph("Lista de Clientes (Primeiros 50)", self.styles['Heading2']))
-        
+
         client_data = [['Nome', 'Email', 'Telefone', 'LGPD']]
-        for client in clients[:50]:
+        for client in self._active_clients().order_by(Client.id).limit(50):
             client_data.append([
                 client.nome,
                 client.email or "N/A",
                 client.telefone,
                 "✓" if client.aceite_lgpd else "✗"
             ])
-        
+
         client_table = Table(client_data)
         client_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -523,95 +466,78 @@ class ReportGenerator:
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
             ('FONTSIZE', (0, 0), (-1, -1), 8)
         ]))
-        
+
         story.append(client_table)
-        
+
         doc.build(story)
         buffer.seek(0)
-        return buffer.getvalue()
-    
+        return buffer
+
     def generate_appointment_report(
-        self, 
-        start_date: date, 
-        end_date: date, 
+        self,
+        start_date: date,
+        end_date: date,
         format_type: str = "excel"
-    ) -> bytes:
+    ) -> BinaryIO:
         """Generate appointment analysis report"""
-        
-        appointments = self.db.query(Appointment).filter(
-            func.date(Appointment.data_hora) >= start_date,
-            func.date(Appointment.data_hora) <= end_date
-        ).all()
-        
+
         if format_type == "excel":
-            return self._generate_appointment_excel(appointments, start_date, end_date)
+            return self._generate_appointment_excel(start_date, end_date)
         else:
-            return self._generate_appointment_pdf(appointments, start_date, end_date)
-    
-    def _generate_appointment_excel(self, appointments, start_date, end_date) -> bytes:
+            return self._generate_appointment_pdf(start_date, end_date)
+
+    def _generate_appointment_excel(self, start_date, end_date) -> BinaryIO:
         """Generate appointment report in Excel format"""
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Relatório de Agendamentos"
-        
+
+        Barber = User
+        rows = filter_date_range(
+            self.db.query(
+                Appointment.data_hora, Client.nome, Barber.nome, Service.nome,
+                Appointment.status, Service.preco, Appointment.observacoes
+            )
+            .join(Client, Appointment.cliente_id == Client.id)
+            .join(Barber, Appointment.barbeiro_id == Barber.id)
+            .join(Service, Appointment.servico_id == Service.id),
+            Appointment.data_hora, start_date, end_date
+        ).order_by(Appointment.data_hora, Appointment.id)
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Relatório de Agendamentos")
+
+        _set_column_widths(ws, [18, 30, 30, 30, 14, 12, 40])
+
         # Title
-        ws['A1'] = "RELATÓRIO DE AGENDAMENTOS"
-        ws['A1'].font = Font(size=16, bold=True)
-        ws['A2'] = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        
-        # Headers
-        headers = [
-            "Data/Hora", "Cliente", "Barbeiro", "Serviço", 
+        ws.append([_cell(ws, "RELATÓRIO DE AGENDAMENTOS", TITLE_FONT)])
+        ws.append([f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"])
+        ws.append([])
+
+        _append_header(ws, [
+            "Data/Hora", "Cliente", "Barbeiro", "Serviço",
             "Status", "Valor", "Observações"
-        ]
-        ws.append([""] * len(headers))  # Empty row
-        ws.append(headers)
-        
-        # Style header
-        header_row = ws.max_row
-        for cell in ws[header_row]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
+        ])
+
         # Add appointment data
-        for appointment in appointments:
+        for data_hora, cliente, barbeiro, servico, status, preco, observacoes in rows.yield_per(STREAM_BATCH_SIZE):
             ws.append([
-                appointment.data_hora.strftime("%d/%m/%Y %H:%M"),
-                appointment.cliente.nome,
-                appointment.barbeiro.nome,
-                appointment.servico.nome,
-                appointment.status.value,
-                f"R$ {appointment.servico.preco:.2f}",
-                appointment.observacoes or ""
+                data_hora.strftime("%d/%m/%Y %H:%M"),
+                cliente,
+                barbeiro,
+                servico,
+                status.value,
+                f"R$ {preco:.2f}",
+                observacoes or ""
             ])
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
-    
-    def _generate_appointment_pdf(self, appointments, start_date, end_date) -> bytes:
+        self._report_progress(80)
+
+        return _save_workbook(wb)
+
+    def _generate_appointment_pdf(self, start_date, end_date) -> BinaryIO:
         """Generate appointment report in PDF format"""
-        
+
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
-        
+
         # Title
         title_style = ParagraphStyle(
             'CustomTitle',
@@ -620,21 +546,21 @@ class ReportGenerator:
             spaceAfter=30,
             alignment=1
         )
-        
+
         story.append(Paragraph("RELATÓRIO DE AGENDAMENTOS", title_style))
         story.append(Paragraph(f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}", self.styles['Normal']))
         story.append(Spacer(1, 20))
-        
+
         # Summary by status
-        status_count = {}
-        for appointment in appointments:
-            status = appointment.status.value
-            status_count[status] = status_count.get(status, 0) + 1
-        
+        status_count = filter_date_range(
+            self.db.query(Appointment.status, func.count(Appointment.id)),
+            Appointment.data_hora, start_date, end_date
+        ).group_by(Appointment.status).all()
+
         summary_data = [['Status', 'Quantidade']]
-        for status, count in status_count.items():
-            summary_data.append([status, str(count)])
-        
+        for status, count in status_count:
+            summary_data.append([status.value, str(count)])
+
         summary_table = Table(summary_data)
         summary_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -643,14 +569,14 @@ class ReportGenerator:
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        
+
         story.append(summary_table)
-        
+
         doc.build(story)
         buffer.seek(0)
-        return buffer.getvalue()
+        return buffer
 
 # Utility function to create report generator
 def create_report_generator(db: Session) -> ReportGenerator:
     """Create a new report generator instance"""
-    return ReportGenerator(db)
\ No newline at end of file
+    return ReportGenerator(db)
@@ -0,0 +1,39 @@
+"""
+Threadpool used to run synchronous route handlers and dependencies
+
+Route handlers are plain `def` functions: they call synchronous SQLAlchemy,
+bcrypt and report code, so FastAPI runs them in AnyIO's worker threadpool
+instead of on the event loop. The pool size caps how many requests do
+blocking work at once; keep the database pool (`DB_POOL_SIZE`) at least as
+large, or threads will queue for connections instead of for the pool.
+"""
+import os
+from typing import Any, Dict, Optional
+
+from anyio import to_thread
+
+DEFAULT_THREADPOOL_SIZE = 20
+
+
+def get_threadpool_size() -> int:
+    """Worker threads for sync handlers, from THREADPOOL_SIZE"""
+    return int(os.getenv("THREADPOOL_SIZE", str(DEFAULT_THREADPOOL_SIZE)))
+
+
+def configure_threadpool(size: Optional[int] = None) -> int:
+    """Resize the default threadpool limiter (must run inside the event loop)"""
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = size or get_threadpool_size()
+    return limiter.total_tokens
+
+
+def get_threadpool_stats() -> Dict[str, Any]:
+    """Pool size, busy threads and requests waiting for a thread"""
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return {
+        "size": limiter.total_tokens,
+        "busy": statistics.borrowed_tokens,
+        "available": limiter.available_tokens,
+        "waiting": statistics.tasks_waiting,
+    }
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk client import vs one POST per client
+
+Writes a CSV of N clients (a few percent repeat an email or CPF) and
+imports it into a scratch database twice: row by row through
+crud.create_client, as the onboarding script did, and with
+utils/bulk_import.py. Reports wall time and the number of cache
+invalidations (table version bumps) each path caused.
+
+Usage:
+    python benchmarks/bench_bulk_import.py --rows 50000
+    DATABASE_URL=postgresql://... python benchmarks/bench_bulk_import.py
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+import utils.cache
+from crud import create_client
+from database import Base
+from schemas import ClientCreate
+from utils.bulk_import import import_file
+from utils.client_search import ensure_client_search
+
+FIRST = ["José", "João", "Maria", "Ana", "Luís", "Márcia", "Paulo", "Lúcia", "Fábio", "Júlia"]
+LAST = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Araújo", "Ribeiro", "Brandão", "Falcão"]
+
+
+def make_csv(rows: int) -> bytes:
+    random.seed(11)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["nome", "email", "telefone", "cpf", "aceite_lgpd"])
+    for i in range(rows):
+        # ~3% repeat an earlier client's email or CPF
+        n = random.randrange(i) if i and random.random() < 0.03 else i
+        writer.writerow([
+            f"{random.choice(FIRST)} {random.choice(LAST)}",
+            f"cliente{n}@example.com",
+            f"(11) 9{i:08d}"[:15],
+            f"{n:011d}",
+            random.choice(["true", "false"]),
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def fresh_session(database_url: str):
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_client_search(engine)
+    return sessionmaker(bind=engine)()
+
+
+def one_by_one(session, data: bytes) -> int:
+    imported = 0
+    for record in csv.DictReader(io.StringIO(data.decode("utf-8"))):
+        try:
+            create_client(session, ClientCreate(**record))
+            imported += 1
+        except (ValidationError, IntegrityError):
+            session.rollback()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_bulk_import.db"
+
+    data = make_csv(args.rows)
+    bumps = []
+    original_bump = utils.cache.bump_table_versions
+
+    def counting_bump(*tables):
+        bumps.append(tables)
+        original_bump(*tables)
+
+    utils.cache.bump_table_versions = counting_bump
+
+    print(f"{'path':>12} {'rows':>9} {'imported':>9} {'time (s)':>9} {'invalidations':>14}")
+    for name, run in (
+        ("one-by-one", lambda session: one_by_one(session, data)),
+        ("bulk", lambda session: import_file(session, "clients", io.BytesIO(data), "csv")["imported"]),
+    ):
+        session = fresh_session(database_url)
+        bumps.clear()
+        start = time.perf_counter()
+        imported = run(session)
+        elapsed = time.perf_counter() - start
+        session.close()
+        print(f"{name:>12} {args.rows:>9,} {imported:>9,} {elapsed:>9.2f} {len(bumps):>14,}")
+
+
+if __name__ == "__main__":
+    main()
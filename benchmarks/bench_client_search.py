@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: client search index vs triple ILIKE scan
+
+Populates a scratch database with N clients (accented Brazilian names,
+formatted phones), builds the search index from utils/client_search.py
+and compares the old `nome ILIKE '%x%' OR email ILIKE OR telefone ILIKE`
+filter with ranked search and prefix autocomplete.
+
+Usage:
+    python benchmarks/bench_client_search.py --rows 1000000
+    DATABASE_URL=postgresql://... python benchmarks/bench_client_search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import create_engine, insert, or_
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Client
+from utils.client_search import autocomplete_clients, client_search_keys, ensure_client_search, search_clients
+
+FIRST = ["José", "João", "Antônio", "Maria", "Ana", "Márcia", "Luís", "Sebastião", "Conceição", "Paulo",
+         "Lúcia", "Fábio", "Júlia", "Gabriel", "Letícia", "André", "Cláudio", "Renata", "Tiago", "Vitória"]
+LAST = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Gonçalves", "Araújo", "Fernandes", "Ribeiro",
+        "Conceição", "Magalhães", "Brandão", "Assunção", "Nóbrega", "Falcão", "Peixoto", "Romão", "Sá", "Tavares"]
+
+
+def populate(session, rows: int):
+    random.seed(7)
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        values = []
+        for i in range(offset, min(offset + batch, rows)):
+            nome = f"{random.choice(FIRST)} {random.choice(LAST)} {random.choice(LAST)}"
+            telefone = f"({random.randint(11, 99)}) 9{random.randint(1000, 9999)}-{random.randint(1000, 9999)}"
+            values.append({
+                "nome": nome, "telefone": telefone, "email": f"cliente{i}@bench.local",
+                **client_search_keys(nome, telefone),
+            })
+        session.execute(insert(Client), values)
+        session.commit()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def ilike_scan(session, term: str, limit: int):
+    """The filter get_clients used before the index"""
+    return session.query(Client).filter(
+        or_(
+            Client.nome.ilike(f"%{term}%"),
+            Client.email.ilike(f"%{term}%"),
+            Client.telefone.ilike(f"%{term}%")
+        )
+    ).limit(limit).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_client_search.db"
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    print(f"Populating {args.rows:,} clients on {engine.dialect.name}...")
+    populate(session, args.rows)
+    started = time.perf_counter()
+    print(f"Search index: {ensure_client_search(engine)} ({time.perf_counter() - started:.1f}s to build)")
+
+    print(f"{'query':>28} {'ILIKE scan (ms)':>16} {'search (ms)':>12} {'autocomplete (ms)':>18}")
+    for term in ["jo", "mar", "sebastiao", "conceição falcão", "magalh", "(11) 98", "cliente4242"]:
+        print(
+            f"{term!r:>28} "
+            f"{timed(lambda: ilike_scan(session, term, args.limit)):>16.2f} "
+            f"{timed(lambda: search_clients(session, term, limit=args.limit)):>12.2f} "
+            f"{timed(lambda: autocomplete_clients(session, term, limit=10)):>18.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent request throughput of a running API server
+
+Starts uvicorn on a scratch database (see bench_date_filters), then sends
+requests from --concurrency clients at once: authenticated list endpoints,
+public services and logins (bcrypt). It reports throughput and latency per
+endpoint, including /api/health, whose latency shows how long the event loop
+is blocked by other requests' work.
+
+Compare execution models by pointing --backend at another checkout, or by
+serving the public and dashboard routers on AsyncSession:
+    git worktree add /tmp/before <commit>
+    python benchmarks/bench_concurrency.py --backend /tmp/before/backend
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --async-routers public,dashboard --concurrency 300
+
+Usage:
+    python benchmarks/bench_concurrency.py --rows 20000 --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.append(BACKEND)
+
+import bcrypt
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+EMAIL, PASSWORD = "admin@example.com", "bench123"
+
+
+def prepare_database(rows: int) -> str:
+    from bench_date_filters import populate
+    from database import Base
+    from models import User, UserRole
+
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_concurrency.db"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    populate(session, rows)
+    session.add(User(
+        nome="Admin Bench", email=EMAIL, role=UserRole.ADMIN,
+        senha_hash=bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+    ))
+    session.commit()
+    session.close()
+    return database_url
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(backend: str, database_url: str, port: int, threads: int, async_routers: str) -> subprocess.Popen:
+    env = dict(
+        os.environ, DATABASE_URL=database_url, THREADPOOL_SIZE=str(threads), DB_POOL_SIZE=str(threads),
+        ASYNC_DB_ROUTERS=async_routers,
+        TESTING="true"  # disables rate limiting so the benchmark measures the handlers
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def run_load(base_url: str, concurrency: int, total: int, logins: bool = True):
+    """Send `total` requests from `concurrency` clients; returns (seconds, latencies per endpoint, errors)"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        token = (await client.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        requests = [
+            ("GET /api/clients/", lambda: client.get("/api/clients/?limit=50", headers=headers)),
+            ("GET /api/appointments/", lambda: client.get("/api/appointments/?limit=50", headers=headers)),
+            ("GET /api/public/services", lambda: client.get("/api/public/services")),
+            ("GET /api/public/availability", lambda: client.get(
+                "/api/public/availability", params={"start_date": "2024-03-04", "end_date": "2024-03-10"}
+            )),
+            ("GET /api/dashboard/stats", lambda: client.get("/api/dashboard/stats", headers=headers)),
+            ("POST /api/auth/login", lambda: client.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD})),
+            ("GET /api/health", lambda: client.get("/api/health")),
+        ]
+        if not logins:
+            requests = [request for request in requests if request[0] != "POST /api/auth/login"]
+        latencies = defaultdict(list)
+        errors = 0
+        remaining = total
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                name, send = random.choice(requests)
+                started = time.perf_counter()
+                response = await send()
+                latencies[name].append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, errors
+
+
+def percentile(values, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", default=BACKEND, help="backend directory to serve (default: this tree)")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--threads", type=int, default=20, help="THREADPOOL_SIZE and DB_POOL_SIZE for the server")
+    parser.add_argument("--no-logins", action="store_true", help="leave bcrypt logins out of the request mix")
+    parser.add_argument("--async-routers", default="", help="ASYNC_DB_ROUTERS for the server, e.g. public,dashboard")
+    args = parser.parse_args()
+
+    database_url = prepare_database(args.rows)
+    port = free_port()
+    server = start_server(os.path.abspath(args.backend), database_url, port, args.threads, args.async_routers)
+    try:
+        seconds, latencies, errors = asyncio.run(
+            run_load(f"http://127.0.0.1:{port}", args.concurrency, args.requests, not args.no_logins)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, async routers: {args.async_routers or '-'}: "
+          f"{args.requests / seconds:.0f} req/s ({seconds:.1f}s, {errors} errors)")
+    print(f"{'endpoint':>26} {'n':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'mean (ms)':>10}")
+    for name, values in sorted(latencies.items()):
+        print(f"{name:>26} {len(values):>6} {percentile(values, 0.5) * 1000:>9.1f} "
+              f"{percentile(values, 0.95) * 1000:>9.1f} {statistics.mean(values) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: date() filters vs half-open timestamp ranges
+
+Populates a scratch database with N appointments and sales, then compares
+the query plan and latency of the old `func.date(column)` filters with the
+`[start, end)` range predicates used by `utils/date_ranges.py`.
+
+Usage:
+    python benchmarks/bench_date_filters.py --rows 1000000
+    DATABASE_URL=postgresql://... python benchmarks/bench_date_filters.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Appointment, AppointmentStatus, Client, PaymentMethod, Sale, Service, User, UserRole
+from utils.date_ranges import filter_date_range, filter_day
+
+
+def populate(session, rows: int, barbers: int = 8):
+    """Insert `rows` appointments and sales spread over two years"""
+    session.execute(insert(User), [
+        {"nome": f"Barbeiro {i}", "email": f"barbeiro{i}@bench.local", "senha_hash": "x", "role": UserRole.BARBEIRO}
+        for i in range(barbers)
+    ])
+    session.execute(insert(Client), [{"nome": "Cliente Bench", "telefone": "11999999999"}])
+    session.execute(insert(Service), [{"nome": "Corte", "preco": 30.0, "duracao_minutos": 30}])
+    session.commit()
+
+    barber_ids = [user_id for (user_id,) in session.query(User.id).all()]
+    client_id = session.query(Client.id).scalar()
+    service_id = session.query(Service.id).scalar()
+
+    origin = datetime(2023, 1, 1, 9)
+    statuses = list(AppointmentStatus)
+    methods = list(PaymentMethod)
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        size = min(batch, rows - offset)
+        session.execute(insert(Appointment), [
+            {
+                "cliente_id": client_id,
+                "barbeiro_id": random.choice(barber_ids),
+                "servico_id": service_id,
+                "data_hora": origin + timedelta(minutes=30 * random.randrange(0, 2 * 365 * 48)),
+                "status": random.choice(statuses),
+            }
+            for _ in range(size)
+        ])
+        session.execute(insert(Sale), [
+            {
+                "vendedor_id": random.choice(barber_ids),
+                "total": 30.0,
+                "metodo_pagamento": random.choice(methods),
+                "criado_em": origin + timedelta(minutes=random.randrange(0, 2 * 365 * 24 * 60)),
+            }
+            for _ in range(size)
+        ])
+        session.commit()
+    return barber_ids
+
+
+def explain(session, query) -> str:
+    """Return the database query plan for a SQLAlchemy query"""
+    statement = query.statement.compile(session.bind, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if session.bind.dialect.name == "sqlite" else "EXPLAIN"
+    rows = session.execute(text(f"{prefix} {statement}")).fetchall()
+    return " | ".join(str(row[-1]) for row in rows)
+
+
+def timed(query, repeat: int = 5) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query.all()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_date_filters.db"
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    print(f"Populating {args.rows:,} appointments and sales on {engine.dialect.name}...")
+    barber_ids = populate(session, args.rows)
+    session.execute(text("ANALYZE"))
+    session.commit()
+
+    day = date(2024, 3, 15)
+    month_start, month_end = date(2024, 3, 1), date(2024, 3, 31)
+    barber = barber_ids[0]
+
+    cases = [
+        (
+            "barber agenda (1 day)",
+            session.query(Appointment.id).filter(
+                Appointment.barbeiro_id == barber, func.date(Appointment.data_hora) == day
+            ),
+            filter_day(session.query(Appointment.id).filter(Appointment.barbeiro_id == barber), Appointment.data_hora, day),
+        ),
+        (
+            "pending appointments (1 month)",
+            session.query(Appointment.id).filter(
+                Appointment.status == AppointmentStatus.AGENDADO,
+                func.date(Appointment.data_hora) >= month_start,
+                func.date(Appointment.data_hora) <= month_end
+            ),
+            filter_date_range(
+                session.query(Appointment.id).filter(Appointment.status == AppointmentStatus.AGENDADO),
+                Appointment.data_hora, month_start, month_end
+            ),
+        ),
+        (
+            "revenue (1 month)",
+            session.query(func.sum(Sale.total)).filter(
+                func.date(Sale.criado_em) >= month_start,
+                func.date(Sale.criado_em) <= month_end
+            ),
+            filter_date_range(session.query(func.sum(Sale.total)), Sale.criado_em, month_start, month_end),
+        ),
+    ]
+
+    for name, legacy, ranged in cases:
+        print(f"\n== {name}")
+        print(f"  date():  {timed(legacy):9.2f} ms  plan: {explain(session, legacy)}")
+        print(f"  range:   {timed(ranged):9.2f} ms  plan: {explain(session, ranged)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offset vs keyset (cursor) pagination
+
+Populates a scratch database with N appointments and sales (see
+bench_date_filters.populate) and times fetching page P of the
+appointment and sale listings with skip/limit and with the cursor of the
+previous page (utils/pagination.py).
+
+Usage:
+    python benchmarks/bench_pagination.py --rows 1000000 --pages 1 100 1000
+    DATABASE_URL=postgresql://... python benchmarks/bench_pagination.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from bench_date_filters import populate
+from crud import get_appointments, get_sales
+from database import Base
+from models import Appointment, Sale
+from utils.pagination import encode_cursor
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_pagination.db"
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    print(f"Populating {args.rows:,} appointments and sales on {engine.dialect.name}...")
+    populate(session, args.rows)
+    session.execute(text("ANALYZE"))
+    session.commit()
+
+    listings = [
+        ("appointments", get_appointments, Appointment, Appointment.data_hora),
+        ("sales", get_sales, Sale, Sale.criado_em),
+    ]
+    print(f"{'listing':>12} {'page':>6} {'offset (ms)':>12} {'cursor (ms)':>12}")
+    for name, fetch, model, column in listings:
+        for page in args.pages:
+            skip = (page - 1) * args.limit
+            cursor = None
+            if skip:
+                # Last row of the previous page, as the previous response's X-Next-Cursor
+                last = session.query(model).order_by(column, model.id).offset(skip - 1).first()
+                cursor = encode_cursor(getattr(last, column.key), last.id)
+            by_offset = fetch(session, skip=skip, limit=args.limit)
+            by_cursor = fetch(session, limit=args.limit, cursor=cursor)
+            assert [row.id for row in by_offset] == [row.id for row in by_cursor]
+            print(
+                f"{name:>12} {page:>6} "
+                f"{timed(lambda: fetch(session, skip=skip, limit=args.limit)):>12.2f} "
+                f"{timed(lambda: fetch(session, limit=args.limit, cursor=cursor)):>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
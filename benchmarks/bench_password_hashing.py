@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login (bcrypt verify) throughput per core
+
+Runs --logins password checks through utils/passwords.PasswordHasher from
+--callers concurrent request threads, for each work factor and pool size,
+and reports checks per second, per core and the average queue wait.
+Pool sizes above the number of cores add queueing but no throughput.
+
+Usage:
+    python benchmarks/bench_password_hashing.py --rounds 10 11 12 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import bcrypt
+
+from utils.passwords import PasswordHasher
+
+
+def run(rounds: int, workers: int, logins: int, callers: int):
+    hashed = bcrypt.hashpw(b"senha123", bcrypt.gensalt(rounds)).decode()
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as request_threads:
+        results = list(request_threads.map(lambda _: hasher.verify("senha123", hashed), range(logins)))
+    seconds = time.perf_counter() - started
+    assert all(results)
+    return seconds, hasher.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cores = os.cpu_count() or 1
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, cores}))
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--callers", type=int, default=32, help="concurrent request threads")
+    args = parser.parse_args()
+
+    print(f"{cores} cores, {args.logins} logins from {args.callers} request threads")
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>9} {'per core':>9} {'verify (ms)':>12} {'wait (ms)':>10}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            seconds, stats = run(rounds, workers, args.logins, args.callers)
+            rate = args.logins / seconds
+            print(f"{rounds:>6} {workers:>7} {rate:>9.1f} {rate / min(workers, cores):>9.1f} "
+                  f"{stats['avg_hash_ms']:>12.1f} {stats['avg_wait_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rate limiter overhead and memory with many distinct clients
+
+Sends --requests checks from --clients distinct (IP, User-Agent) pairs
+across the rule paths through utils/rate_limiter.RateLimiter and through
+the previous deque-per-client limiter, and reports the cost per request
+in microseconds, the memory held afterwards and what get_stats costs.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py --clients 100000 --requests 500000
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from utils.rate_limiter import DEFAULT_RULES, RateLimiter
+
+PATHS = [
+    "/api/clients/", "/api/dashboard/stats", "/api/public/services",
+    "/api/pos/sales", "/api/appointments/", "/api/auth/login",
+]
+
+
+class PreviousRateLimiter:
+    """The limiter this module replaced: md5 client id, one timestamp deque per client"""
+
+    def __init__(self):
+        self._clients = defaultdict(deque)
+        self._rules = dict(DEFAULT_RULES)
+
+    def is_allowed(self, request):
+        client_data = f"{request.client.host}:{request.headers.get('user-agent', '')}"
+        client_id = hashlib.md5(client_data.encode()).hexdigest()[:16]
+        path = request.url.path
+        max_requests, window_seconds = self._rules['default']
+        for pattern, rule in self._rules.items():
+            if pattern != 'default' and pattern in path:
+                max_requests, window_seconds = rule
+                break
+        now = time.time()
+        client_requests = self._clients[client_id]
+        while client_requests and client_requests[0] < now - window_seconds:
+            client_requests.popleft()
+        if len(client_requests) >= max_requests:
+            return False, {}
+        client_requests.append(now)
+        return True, {}
+
+    def get_stats(self):
+        return {'total_tracked_requests': sum(len(r) for r in self._clients.values())}
+
+
+def make_requests(clients: int, count: int):
+    random.seed(42)
+    pool = [
+        SimpleNamespace(
+            client=SimpleNamespace(host=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"),
+            headers={"user-agent": f"Mozilla/5.0 bench/{i % 50}"},
+            url=SimpleNamespace(path=PATHS[i % len(PATHS)]),
+        )
+        for i in range(clients)
+    ]
+    # Every client appears at least once, then random repeats
+    return pool + [random.choice(pool) for _ in range(max(count - clients, 0))]
+
+
+def run(name: str, make_limiter, requests):
+    limiter = make_limiter()
+    started = time.perf_counter()
+    allowed = sum(1 for request in requests if limiter.is_allowed(request)[0])
+    seconds = time.perf_counter() - started
+
+    stats_started = time.perf_counter()
+    limiter.get_stats()
+    stats_ms = 1000 * (time.perf_counter() - stats_started)
+
+    # Memory on a second pass: tracing allocations would distort the timing
+    tracemalloc.start()
+    limiter = make_limiter()
+    for request in requests:
+        limiter.is_allowed(request)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>10} {1e6 * seconds / len(requests):>10.2f} {memory / 2**20:>12.1f} "
+          f"{stats_ms:>11.3f} {allowed:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    requests = make_requests(args.clients, args.requests)
+    print(f"{len(requests)} requests from {args.clients} clients")
+    print(f"{'limiter':>10} {'us/request':>10} {'memory (MB)':>12} {'stats (ms)':>11} {'allowed':>9}")
+    run("previous", PreviousRateLimiter, requests)
+    run("sharded", lambda: RateLimiter(shards=args.shards, max_buckets=2 * args.clients), requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak RSS of Excel report generation against row count
+
+For each row count a scratch database is populated (see bench_date_filters)
+and every report is generated in a fresh child process, which reports its
+peak RSS. `legacy` reproduces the previous pipeline (all ORM rows loaded,
+regular in-memory workbook copied to BytesIO) for comparison; the
+`export-*` modes stream the appointments through utils/exports.py.
+
+Usage:
+    python benchmarks/bench_report_memory.py --rows 10000 100000 500000
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+START, END = date(2023, 1, 1), date(2024, 12, 31)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def legacy_appointments(session):
+    """Previous pipeline: every Appointment as an ORM object, full workbook in memory"""
+    import openpyxl
+    from crud import with_load_profile
+    from models import Appointment
+    from utils.date_ranges import filter_date_range
+
+    appointments = filter_date_range(
+        with_load_profile(session.query(Appointment), Appointment, "report"), Appointment.data_hora, START, END
+    ).all()
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for appointment in appointments:
+        ws.append([
+            appointment.data_hora.strftime("%d/%m/%Y %H:%M"), appointment.cliente.nome, appointment.barbeiro.nome,
+            appointment.servico.nome, appointment.status.value, f"R$ {appointment.servico.preco:.2f}",
+            appointment.observacoes or ""
+        ])
+    output = io.BytesIO()
+    wb.save(output)
+    return len(output.getvalue())
+
+
+def child(database_url: str, mode: str):
+    """Generate one report and print: size_bytes seconds baseline_mb peak_mb"""
+    from utils.reports import ReportGenerator
+
+    session = sessionmaker(bind=create_engine(database_url))()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+
+    if mode == "legacy-appointments":
+        size = legacy_appointments(session)
+    elif mode.startswith("export-"):
+        from utils.exports import export_query, iter_export
+        query = export_query("appointments", start_date=START, end_date=END)
+        size = sum(len(chunk) for chunk in iter_export(session.get_bind(), query, mode.split("-", 1)[1]))
+    else:
+        generator = ReportGenerator(session)
+        if mode == "appointments":
+            report_file = generator.generate_appointment_report(START, END)
+        else:
+            report_file = generator.generate_financial_report(START, END)
+        size = len(report_file.read())
+        report_file.close()
+
+    print(size, time.perf_counter() - started, baseline, peak_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--child", nargs=2, metavar=("DATABASE_URL", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from bench_date_filters import populate
+    from database import Base
+
+    modes = ["legacy-appointments", "appointments", "financial", "export-ndjson", "export-csv"]
+    print(f"{'rows':>9} {'report':>20} {'size (KB)':>10} {'time (s)':>9} {'RSS growth (MB)':>16}")
+    for rows in args.rows:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench_reports.db"
+        engine = create_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        populate(session, rows)
+        session.close()
+
+        for mode in modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", database_url, mode],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            size, seconds, baseline, peak = int(output[0]), *map(float, output[1:])
+            print(f"{rows:>9,} {mode:>20} {size / 1024:>10.0f} {seconds:>9.2f} {peak - baseline:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
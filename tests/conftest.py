@@ -8,6 +8,8 @@ from fastapi.testclient import TestClient
 
 # Set testing environment
 os.environ["TESTING"] = "true"
+# Fail any request issuing more SQL statements than this (catches N+1 regressions)
+os.environ.setdefault("SQL_QUERY_BUDGET", "25")
 
 # Add backend to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
@@ -15,7 +17,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 from main import app
 from database import Base, get_db
 from models import User, Client, Service, Appointment, Sale, AppointmentStatus, UserRole, PaymentMethod
-from auth import create_access_token
+from auth import create_access_token, get_current_active_user
+from utils.query_counter import QueryCounter
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -55,11 +58,41 @@ def db_session(db_engine):
     transaction.rollback()
     connection.close()
 
+@pytest.fixture
+def query_counter():
+    """Count SQL statements executed inside a `with query_counter:` block"""
+    return QueryCounter()
+
 @pytest.fixture(scope="function")
 def client():
     """Create test client"""
     return TestClient(app)
 
+@pytest.fixture
+def api_client(db_session):
+    """
+    Factory of test clients logged in as a user, on db_session (or another session)
+
+    Calling it again switches the user; the previous overrides are restored at teardown.
+    """
+    overridden = (get_db, get_current_active_user)
+    previous = {dependency: app.dependency_overrides[dependency]
+                for dependency in overridden if dependency in app.dependency_overrides}
+
+    def make_client(user, db=None):
+        session = db_session if db is None else db
+        app.dependency_overrides[get_db] = lambda: session
+        app.dependency_overrides[get_current_active_user] = lambda: user
+        return TestClient(app, base_url="http://localhost")
+
+    yield make_client
+
+    for dependency in overridden:
+        if dependency in previous:
+            app.dependency_overrides[dependency] = previous[dependency]
+        else:
+            app.dependency_overrides.pop(dependency, None)
+
 @pytest.fixture
 def admin_user(db_session):
     """Create admin user for testing"""
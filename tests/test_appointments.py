@@ -147,4 +147,66 @@ def test_calendar_view(client: TestClient, auth_headers):
     )
     assert response.status_code == 200
     data = response.json()
-    assert isinstance(data, list)
\ No newline at end of file
+    assert isinstance(data, list)
+
+
+def test_calendar_events_month_window(db_session, test_client, barber_user, admin_user, test_service, query_counter):
+    """Test calendar events are filtered to the month in SQL with one query"""
+    from models import Appointment
+    from crud import get_calendar_events
+
+    for data_hora, barbeiro in [
+        (datetime(2031, 3, 31, 23, 30), barber_user),
+        (datetime(2031, 4, 1, 0, 0), barber_user),
+        (datetime(2031, 4, 30, 18, 0), barber_user),
+        (datetime(2031, 4, 15, 10, 0), admin_user),
+        (datetime(2031, 5, 1, 0, 0), barber_user),
+    ]:
+        db_session.add(Appointment(
+            cliente_id=test_client.id,
+            barbeiro_id=barbeiro.id,
+            servico_id=test_service.id,
+            data_hora=data_hora
+        ))
+    db_session.commit()
+    barbeiro_id = barber_user.id
+
+    with query_counter:
+        events = get_calendar_events(db_session, 2031, 4, barbeiro_id=barbeiro_id)
+
+    assert [event.data_hora for event in events] == [datetime(2031, 4, 1, 0, 0), datetime(2031, 4, 30, 18, 0)]
+    assert events[0].servico == test_service.nome
+    assert events[0].duracao_minutos == test_service.duracao_minutos
+    assert query_counter.count == 1
+
+    assert len(get_calendar_events(db_session, 2031, 4)) == 3
+
+
+def test_calendar_etag_not_modified(admin_user):
+    """Test the calendar answers 304 when the ETag still matches"""
+    from main import app
+    from auth import get_current_active_user
+
+    app.dependency_overrides[get_current_active_user] = lambda: admin_user
+    try:
+        client = TestClient(app, base_url="http://localhost")
+        response = client.get("/api/appointments/calendar/2031/4")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = client.get("/api/appointments/calendar/2031/4", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        # Weak comparison, lists of tags and "*" (RFC 9110)
+        strong = etag.removeprefix("W/")
+        for header in (strong, f'"outra", {etag}', f'"outra",{strong}', "*"):
+            response = client.get("/api/appointments/calendar/2031/4", headers={"If-None-Match": header})
+            assert response.status_code == 304, header
+        response = client.get("/api/appointments/calendar/2031/4", headers={"If-None-Match": 'W/"outra"'})
+        assert response.status_code == 200
+
+        for path in ("2031/13", "2031/0", "0/1", "9999/12", "-1/6"):
+            response = client.get(f"/api/appointments/calendar/{path}")
+            assert response.status_code == 400, path
+    finally:
+        del app.dependency_overrides[get_current_active_user]
@@ -0,0 +1,131 @@
+import inspect
+from datetime import datetime, timedelta
+
+import bcrypt
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from auth import create_access_token
+from crud import get_dashboard_stats
+from database import Base, async_database_url, get_async_db
+from models import Appointment, AppointmentStatus, Client, PaymentMethod, Sale, Service, User, UserRole
+from routes import dashboard_async, public_async
+
+
+@pytest.fixture
+def async_api(tmp_path):
+    """Async routers on their own SQLite file, reached through aiosqlite"""
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine)
+
+    with SyncSession() as db:
+        admin = User(
+            nome="Admin Async", email="admin@example.com", role=UserRole.ADMIN,
+            senha_hash=bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode()
+        )
+        barber = User(nome="Barbeiro Async", email="barbeiro@example.com", role=UserRole.BARBEIRO, senha_hash="x")
+        service = Service(nome="Corte", preco=40.0, duracao_minutos=30)
+        db.add_all([admin, barber, service])
+        db.commit()
+        db.add(Sale(vendedor_id=admin.id, total=40.0, metodo_pagamento=PaymentMethod.PIX))
+        db.commit()
+        ids = {"barber": barber.id, "service": service.id}
+
+    # NullPool: each TestClient runs its own event loop, connections must not outlive it
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncTestSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(public_async.router, prefix="/api/public")
+    app.include_router(dashboard_async.router, prefix="/api/dashboard")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    yield TestClient(app), SyncSession, ids
+    sync_engine.dispose()
+
+
+def _next_weekday_at(hour: int) -> datetime:
+    day = datetime.now() + timedelta(days=1)
+    while day.weekday() == 6:
+        day += timedelta(days=1)
+    return day.replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+def test_database_url_maps_to_async_drivers():
+    """Test sync URLs map to their asyncio drivers"""
+    assert async_database_url("sqlite:///./barbearia.db") == "sqlite+aiosqlite:///./barbearia.db"
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+
+def test_async_routers_only_have_coroutine_handlers():
+    """Test nothing in the async routers falls back to the threadpool"""
+    for router in (public_async.router, dashboard_async.router):
+        for route in router.routes:
+            assert isinstance(route, APIRoute) and inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_public_booking_flow(async_api):
+    """Test listing, availability, booking, conflicts and confirmation on AsyncSession"""
+    client, SyncSession, ids = async_api
+    slot = _next_weekday_at(10)
+
+    assert [service["nome"] for service in client.get("/api/public/services").json()] == ["Corte"]
+    assert [barber["id"] for barber in client.get("/api/public/barbers").json()] == [ids["barber"]]
+
+    booking = {
+        "cliente": {"nome": "Cliente Async", "email": "cliente@example.com", "telefone": "11988887777"},
+        "barbeiro_id": ids["barber"],
+        "servico_id": ids["service"],
+        "data_hora": slot.isoformat(),
+    }
+    response = client.post("/api/public/book-appointment", json=booking)
+    assert response.status_code == 200, response.text
+    created = response.json()
+    assert created["barbeiro_nome"] == "Barbeiro Async"
+    assert created["valor"] == "R$ 40.00"
+
+    assert client.post("/api/public/book-appointment", json=booking).status_code == 409
+
+    matrix = client.get("/api/public/availability", params={
+        "start_date": slot.date().isoformat(), "end_date": slot.date().isoformat(), "servico_id": ids["service"]
+    }).json()
+    day = matrix["barbeiros"][0]["dias"][slot.date().isoformat()]
+    taken = [entry for entry in day if entry["datetime"].startswith(slot.strftime("%Y-%m-%dT%H:%M"))]
+    assert taken and not taken[0]["available"]
+
+    confirmed = client.get(f"/api/public/appointment/{created['appointment_id']}/confirm").json()
+    assert confirmed["appointment"]["status"] == AppointmentStatus.CONFIRMADO.value
+    assert confirmed["appointment"]["cliente_nome"] == "Cliente Async"
+
+    with SyncSession() as db:
+        assert db.query(Client).filter(Client.email == "cliente@example.com").count() == 1
+        assert db.get(Appointment, created["appointment_id"]).status == AppointmentStatus.CONFIRMADO
+
+
+def test_dashboard_matches_sync_crud(async_api):
+    """Test the async dashboard authenticates with AsyncSession and returns the sync figures"""
+    client, SyncSession, _ = async_api
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin@example.com'})}"}
+
+    assert client.get("/api/dashboard/stats").status_code in (401, 403)
+
+    stats = client.get("/api/dashboard/stats", headers=headers)
+    assert stats.status_code == 200, stats.text
+    with SyncSession() as db:
+        assert stats.json() == get_dashboard_stats(db)
+
+    activities = client.get("/api/dashboard/recent-activities", headers=headers).json()
+    assert [sale["vendedor_nome"] for sale in activities["vendas"]] == ["Admin Async"]
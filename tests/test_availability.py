@@ -0,0 +1,174 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+from models import Appointment, AppointmentStatus, Service
+from schemas import AppointmentCreate
+from crud import check_appointment_conflict
+from utils.availability import DayAvailability
+
+
+@pytest.fixture
+def tomorrow():
+    """Tomorrow at midnight, so every slot of the day is in the future"""
+    return datetime.combine((datetime.now() + timedelta(days=1)).date(), time.min)
+
+
+def _add_appointment(db_session, client, barber, service, start, status=AppointmentStatus.AGENDADO):
+    appointment = Appointment(
+        cliente_id=client.id,
+        barbeiro_id=barber.id,
+        servico_id=service.id,
+        data_hora=start,
+        status=status
+    )
+    db_session.add(appointment)
+    db_session.commit()
+    return appointment
+
+
+def test_overlapping_appointments_are_merged(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test that overlapping busy intervals collapse into one block"""
+    long_service = Service(nome="Corte + Barba", preco=50.0, duracao_minutos=60, ativo=True)
+    db_session.add(long_service)
+    db_session.commit()
+
+    _add_appointment(db_session, test_client, barber_user, long_service, tomorrow.replace(hour=10))
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=10, minute=30))
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=14))
+
+    availability = DayAvailability.load(db_session, barber_user.id, tomorrow.date())
+
+    assert len(availability.intervals) == 3
+    assert availability._starts == [tomorrow.replace(hour=10), tomorrow.replace(hour=14)]
+    assert availability._ends == [tomorrow.replace(hour=11), tomorrow.replace(hour=14, minute=30)]
+
+
+def test_find_conflict(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test range checks against the merged interval set"""
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=10))
+
+    availability = DayAvailability.load(db_session, barber_user.id, tomorrow.date())
+
+    conflict = availability.find_conflict(tomorrow.replace(hour=10, minute=15), tomorrow.replace(hour=10, minute=45))
+    assert conflict is not None
+    assert conflict.servico_nome == test_service.nome
+    assert conflict.cliente_nome == test_client.nome
+    assert conflict.barbeiro_nome == barber_user.nome
+
+    # Touching intervals do not overlap
+    assert availability.is_free(tomorrow.replace(hour=9, minute=30), tomorrow.replace(hour=10))
+    assert availability.is_free(tomorrow.replace(hour=10, minute=30), tomorrow.replace(hour=11))
+
+
+def test_cancelled_appointments_do_not_block(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test that cancelled appointments free their slot"""
+    _add_appointment(
+        db_session, test_client, barber_user, test_service,
+        tomorrow.replace(hour=10), status=AppointmentStatus.CANCELADO
+    )
+
+    availability = DayAvailability.load(db_session, barber_user.id, tomorrow.date())
+    assert availability.is_free(tomorrow.replace(hour=10), tomorrow.replace(hour=10, minute=30))
+
+
+def test_slots(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test the slot grid marks busy slots as unavailable"""
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=9, minute=30))
+
+    availability = DayAvailability.load(db_session, barber_user.id, tomorrow.date())
+    slots = availability.slots(time(9), time(11), slot_minutes=30)
+
+    assert [slot["formatted_time"] for slot in slots] == ["09:00", "09:30", "10:00", "10:30"]
+    assert [slot["available"] for slot in slots] == [True, False, True, True]
+
+
+def test_check_appointment_conflict_uses_engine(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test crud conflict check and update exclusion"""
+    existing = _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=10))
+
+    new_appointment = AppointmentCreate(
+        cliente_id=test_client.id,
+        barbeiro_id=barber_user.id,
+        servico_id=test_service.id,
+        data_hora=tomorrow.replace(hour=10, minute=15)
+    )
+
+    conflict = check_appointment_conflict(db_session, new_appointment)
+    assert conflict is not None
+    assert conflict["inicio"] == "10:00"
+    assert conflict["fim"] == "10:30"
+
+    assert check_appointment_conflict(db_session, new_appointment, exclude_id=existing.id) is None
+
+    # A schedule loaded for another day is not reused
+    other_day = DayAvailability.load(db_session, barber_user.id, (tomorrow + timedelta(days=1)).date())
+    assert check_appointment_conflict(db_session, new_appointment, availability=other_day)["inicio"] == "10:00"
+
+
+def test_public_booking_loads_the_schedule_once(api_client, admin_user, barber_user, test_service, tomorrow,
+                                                 monkeypatch):
+    """Test the booking's pre-check and conflict check share one DayAvailability load"""
+    loads = []
+    original_load = DayAvailability.load.__func__
+
+    def counting_load(cls, db, barbeiro_id, day, exclude_id=None):
+        loads.append((barbeiro_id, day))
+        return original_load(cls, db, barbeiro_id, day, exclude_id=exclude_id)
+
+    monkeypatch.setattr(DayAvailability, "load", classmethod(counting_load))
+    booking = {
+        "cliente": {"nome": "Cliente Web", "email": "web@test.com", "telefone": "11977776666"},
+        "barbeiro_id": barber_user.id,
+        "servico_id": test_service.id,
+        "data_hora": tomorrow.replace(hour=11).isoformat(),
+    }
+    response = api_client(admin_user).post("/api/public/book-appointment", json=booking)
+    assert response.status_code == 200, response.text
+    assert loads == [(barber_user.id, tomorrow.date())]
+
+
+def test_load_range_groups_by_barber_and_day(db_session, test_client, barber_user, admin_user, test_service, tomorrow):
+    """Test the range loader builds one schedule per (barber, day)"""
+    day_after = tomorrow + timedelta(days=1)
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=10))
+    _add_appointment(db_session, test_client, barber_user, test_service, day_after.replace(hour=11))
+    _add_appointment(db_session, test_client, admin_user, test_service, tomorrow.replace(hour=10))
+
+    schedules = DayAvailability.load_range(
+        db_session, [barber_user.id, admin_user.id], tomorrow.date(), day_after.date()
+    )
+
+    assert len(schedules) == 4
+    assert not schedules[(barber_user.id, tomorrow.date())].is_free(
+        tomorrow.replace(hour=10), tomorrow.replace(hour=10, minute=30)
+    )
+    assert schedules[(barber_user.id, day_after.date())].is_free(
+        day_after.replace(hour=10), day_after.replace(hour=10, minute=30)
+    )
+    assert not schedules[(admin_user.id, tomorrow.date())].is_free(
+        tomorrow.replace(hour=10), tomorrow.replace(hour=10, minute=30)
+    )
+    assert schedules[(admin_user.id, day_after.date())].intervals == []
+
+
+def test_slots_follow_service_duration(db_session, test_client, barber_user, test_service, tomorrow):
+    """Test that a long service needs the whole window free and must end before closing"""
+    _add_appointment(db_session, test_client, barber_user, test_service, tomorrow.replace(hour=10))
+
+    availability = DayAvailability.load(db_session, barber_user.id, tomorrow.date())
+    slots = availability.slots(time(9), time(11), slot_minutes=30, duration_minutes=60)
+
+    assert [slot["available"] for slot in slots] == [True, False, False, False]
+
+    slots = availability.slots(time(10, 30), time(12), slot_minutes=30, duration_minutes=60)
+    assert [slot["available"] for slot in slots] == [True, True, False]
+
+
+def test_business_hours_for():
+    """Test business hours lookup by weekday"""
+    from datetime import date
+    from utils.availability import business_hours_for
+
+    assert business_hours_for(date(2024, 1, 1)) == (time(9), time(18))  # Monday
+    assert business_hours_for(date(2024, 1, 6)) == (time(9), time(16))  # Saturday
+    assert business_hours_for(date(2024, 1, 7)) == (time(9), time(14))  # Sunday
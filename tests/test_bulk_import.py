@@ -0,0 +1,96 @@
+import io
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import Session
+
+import utils.cache
+from models import Client, DailyMetric, Service
+from utils.bulk_import import import_file
+from utils.daily_metrics import NEW_CLIENTS
+
+
+@pytest.fixture
+def savepoint_session(db_session):
+    """Session whose commits and rollbacks stay inside the test transaction"""
+    session = Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+
+
+def _csv(*lines):
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def test_csv_import_validates_and_deduplicates_in_batches(savepoint_session, test_client, monkeypatch):
+    """Test invalid rows and duplicates (stored or repeated in the file) are reported by row"""
+    bumps = []
+    original_bump = utils.cache.bump_table_versions
+    monkeypatch.setattr(utils.cache, "bump_table_versions", lambda *tables: (bumps.append(tables), original_bump(*tables)))
+
+    stream = _csv(
+        "nome,email,telefone,cpf,aceite_lgpd",
+        "José da Silva,jose@import.com,(11) 98888-0001,111.111.111-11,true",
+        f"Já Existe,{test_client.email},11988880002,,false",
+        "Sem Telefone,semtel@import.com,,,",
+        "Maria Souza,maria@import.com,11988880003,222.222.222-22,",
+        "Maria Repetida,outra@import.com,11988880004,222.222.222-22,",
+        "Email Ruim,nao-e-email,11988880005,,",
+    )
+    report = import_file(savepoint_session, "clients", stream, "csv", batch_size=2)
+
+    assert (report["total"], report["imported"], report["duplicates"], report["invalid"]) == (6, 2, 2, 2)
+    assert [(error["row"], error["errors"][0].split(":")[0]) for error in report["errors"]] == [
+        (2, "Email já cadastrado"), (3, "telefone"), (5, "CPF já cadastrado"), (6, "email")
+    ]
+
+    jose = savepoint_session.query(Client).filter(Client.email == "jose@import.com").one()
+    assert jose.ativo and jose.aceite_lgpd and jose.data_aceite_lgpd is not None
+    assert (jose.nome_normalizado, jose.telefone_digitos) == ("jose da silva", "11988880001")
+    maria = savepoint_session.query(Client).filter(Client.email == "maria@import.com").one()
+    assert maria.aceite_lgpd is False and maria.data_aceite_lgpd is None
+
+    # Three committed batches, one invalidation
+    assert bumps == [("clients",)]
+    new_clients = savepoint_session.query(DailyMetric).filter(DailyMetric.metrica == NEW_CLIENTS).all()
+    assert sum(metric.quantidade for metric in new_clients) == savepoint_session.query(Client).count()
+
+
+def test_ndjson_and_json_imports(savepoint_session, test_service):
+    """Test NDJSON reports malformed lines per row and a JSON array imports services"""
+    stream = io.BytesIO(b'{"nome": "Ana", "telefone": "11911112222"}\n{"nome": \n\n{"nome": "Bia", "telefone": "1"}\n')
+    report = import_file(savepoint_session, "clients", stream, "ndjson")
+    assert (report["imported"], report["invalid"]) == (2, 1)
+    assert report["errors"][0]["row"] == 2
+    assert report["errors"][0]["errors"][0].startswith("JSON inválido")
+
+    services = [
+        {"nome": "Barba", "preco": 25.0, "duracao_minutos": 20},
+        {"nome": test_service.nome.upper(), "preco": 30.0, "duracao_minutos": 30},
+        {"nome": "Sobrancelha", "preco": "caro", "duracao_minutos": 10},
+    ]
+    report = import_file(savepoint_session, "services", io.BytesIO(json.dumps(services).encode()), "json")
+    assert (report["imported"], report["duplicates"], report["invalid"]) == (1, 1, 1)
+    assert savepoint_session.query(Service).filter(Service.nome == "Barba").one().ativo
+
+
+def test_import_endpoint(savepoint_session, admin_user, barber_user, api_client):
+    """Test the upload endpoint picks the format from the file name and checks the role"""
+    api = api_client(admin_user, db=savepoint_session)
+    response = api.post(
+        "/api/clients/import",
+        files={"file": ("clientes.csv", b"nome,telefone\nCarlos,11933334444\n", "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"total": 1, "imported": 1, "duplicates": 0, "invalid": 0, "errors": []}
+
+    response = api.post("/api/clients/import", files={"file": ("clientes.xml", b"<x/>", "text/xml")})
+    assert response.status_code == 400
+
+    api = api_client(barber_user, db=savepoint_session)
+    response = api.post(
+        "/api/services/import",
+        files={"file": ("servicos.ndjson", b'{"nome": "Corte", "preco": 30, "duracao_minutos": 30}\n')},
+    )
+    assert response.status_code == 403
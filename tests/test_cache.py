@@ -0,0 +1,416 @@
+import pytest
+import time
+
+from utils.cache import CacheBackend, SimpleCache, SQLiteCache, create_cache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Each cache backend, behind the same interface"""
+    if request.param == "memory":
+        return SimpleCache()
+    return SQLiteCache(str(tmp_path / "cache.db"))
+
+
+def test_set_get_delete(backend):
+    """Test basic cache operations"""
+    backend.set("clients:get_clients:abc", [1, 2, 3])
+    assert backend.get("clients:get_clients:abc") == [1, 2, 3]
+
+    backend.delete("clients:get_clients:abc")
+    assert backend.get("clients:get_clients:abc") is None
+
+
+def test_expiry(backend):
+    """Test entries expire after their TTL"""
+    backend.set("services:get_services:abc", "value", ttl=0)
+    time.sleep(0.01)
+    assert backend.get("services:get_services:abc") is None
+
+
+def test_delete_prefix(backend):
+    """Test prefix invalidation only removes matching keys"""
+    backend.set("clients:get_clients:1", 1)
+    backend.set("clients:get_clients:2", 2)
+    backend.set("services:get_services:1", 3)
+
+    backend.delete_prefix("clients:")
+
+    assert backend.get("clients:get_clients:1") is None
+    assert backend.get("clients:get_clients:2") is None
+    assert backend.get("services:get_services:1") == 3
+
+
+def test_stats(backend):
+    """Test stats keep the keys used by /api/system/stats"""
+    backend.set("dashboard:stats:1", {"a": 1})
+    stats = backend.get_stats()
+    assert stats["backend"] == backend.name
+    assert stats["entries"] == 1
+    assert stats["memory_usage"] > 0
+
+
+def test_sqlite_invalidation_is_shared_between_workers(tmp_path):
+    """Test two workers sharing the SQLite store see each other's writes and invalidations"""
+    path = str(tmp_path / "shared.db")
+    worker_a = SQLiteCache(path)
+    worker_b = SQLiteCache(path)
+
+    worker_a.set("clients:get_clients:1", ["Ana"])
+    assert worker_b.get("clients:get_clients:1") == ["Ana"]
+
+    worker_b.delete_prefix("clients:")
+    assert worker_a.get("clients:get_clients:1") is None
+
+
+def test_sqlite_purges_expired_rows_on_write(tmp_path):
+    """Test expired rows are deleted by later writes, not only when stats are read"""
+    store = SQLiteCache(str(tmp_path / "purge.db"), purge_interval=0)
+    for i in range(5):
+        store.set(f"clients:get_clients:{i}", i, ttl=0)
+    time.sleep(0.01)
+    store.set("clients:get_clients:live", "ok")
+
+    rows = store._connection().execute("SELECT key FROM cache_entries").fetchall()
+    assert rows == [("clients:get_clients:live",)]
+
+
+def test_backend_interface_is_abstract():
+    """Test a backend missing part of the interface can't be instantiated"""
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_create_cache_from_env(monkeypatch, tmp_path):
+    """Test backend selection through CACHE_BACKEND"""
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "env.db"))
+    assert isinstance(create_cache(), SQLiteCache)
+
+    monkeypatch.delenv("CACHE_BACKEND")
+    assert isinstance(create_cache(), SimpleCache)
+
+
+def test_lru_eviction_by_entry_count():
+    """Test least recently used entries are evicted beyond max_entries"""
+    lru = SimpleCache(max_entries=3)
+    for i in range(3):
+        lru.set(f"clients:get_clients:{i}", i)
+
+    lru.get("clients:get_clients:0")  # 0 becomes most recently used
+    lru.set("clients:get_clients:3", 3)
+
+    assert lru.get("clients:get_clients:1") is None
+    assert lru.get("clients:get_clients:0") == 0
+    assert lru.get_stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_bytes():
+    """Test the byte bound evicts old entries and memory accounting stays incremental"""
+    lru = SimpleCache(max_entries=1000, max_bytes=5000)
+    for i in range(10):
+        lru.set(f"clients:get_clients:{i}", "x" * 1000)
+
+    stats = lru.get_stats()
+    assert stats["memory_usage"] <= 5000
+    assert stats["entries"] < 10
+    assert lru.get("clients:get_clients:9") is not None
+
+    lru.clear()
+    assert lru.get_stats()["memory_usage"] == 0
+
+
+def test_expired_entries_are_dropped_without_full_scan():
+    """Test expiry through the deadline heap, including overwritten keys"""
+    lru = SimpleCache()
+    lru.set("dashboard:stats:1", "old", ttl=0)
+    lru.set("dashboard:stats:2", "kept", ttl=300)
+    lru.set("dashboard:stats:2", "new", ttl=300)
+    time.sleep(0.01)
+
+    stats = lru.get_stats()
+    assert stats["entries"] == 1
+    assert stats["by_prefix"]["dashboard"]["expirations"] == 1
+    assert lru.get("dashboard:stats:2") == "new"
+
+
+def test_counters_per_prefix():
+    """Test hit/miss counters are tracked per key prefix"""
+    lru = SimpleCache()
+    lru.set("services:get_services:1", [])
+    lru.get("services:get_services:1")
+    lru.get("services:get_services:1")
+    lru.get("clients:get_clients:missing")
+
+    by_prefix = lru.get_stats()["by_prefix"]
+    assert by_prefix["services"]["hits"] == 2
+    assert by_prefix["clients"]["misses"] == 1
+
+
+def test_concurrent_misses_are_coalesced():
+    """Test only one of many concurrent callers recomputes a missing entry"""
+    import threading
+    from utils.cache import cached
+
+    calls = []
+
+    @cached(ttl=60, key_prefix="test_singleflight")
+    def slow_query(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow_query(21))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 10
+    assert len(calls) == 1
+
+
+def test_async_functions_cache_their_result():
+    """Test coroutines are awaited, cached and coalesced"""
+    import asyncio
+    from utils.cache import cached
+
+    calls = []
+
+    @cached(ttl=60, key_prefix="test_async")
+    async def slow_handler(value):
+        calls.append(value)
+        await asyncio.sleep(0.1)
+        return {"value": value}
+
+    async def scenario():
+        first = await asyncio.gather(*(slow_handler(1) for _ in range(10)))
+        second = await slow_handler(1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == [{"value": 1}] * 10
+    assert second == {"value": 1}
+    assert len(calls) == 1
+
+
+def test_stale_while_revalidate_sync():
+    """Test an expired value is served while one background refresh runs"""
+    from utils.cache import cached
+
+    version = {"current": 1}
+
+    @cached(ttl=0, key_prefix="test_swr", stale_ttl=60)
+    def get_version():
+        return version["current"]
+
+    assert get_version() == 1
+    version["current"] = 2
+
+    # Stale value served immediately, refresh happens in the background
+    assert get_version() == 1
+    deadline = time.time() + 2
+    while get_version() != 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert get_version() == 2
+
+
+def test_stale_while_revalidate_async():
+    """Test stale-while-revalidate for coroutine functions"""
+    import asyncio
+    from utils.cache import cached
+
+    version = {"current": 1}
+
+    @cached(ttl=0, key_prefix="test_swr_async", stale_ttl=60)
+    async def get_version():
+        return version["current"]
+
+    async def scenario():
+        assert await get_version() == 1
+        version["current"] = 2
+        stale = await get_version()
+        await asyncio.sleep(0.05)
+        return stale, await get_version()
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_keys_ignore_injected_dependencies(db_session):
+    """Test `db` / `current_user` and sessions are left out of the key"""
+    from sqlalchemy.orm import Session
+    from utils.cache import cached
+
+    calls = []
+
+    @cached(ttl=60, key_prefix="test_deps")
+    def lookup(db, current_user=None, skip: int = 0, limit: int = 100):
+        calls.append((skip, limit))
+        return [skip, limit]
+
+    # Never queried: only its identity differs from db_session
+    other_session = Session()
+    try:
+        assert lookup(db_session, object(), 0) == [0, 100]
+        assert lookup(other_session, current_user=object(), skip=0, limit=100) == [0, 100]
+        assert lookup(db=other_session) == [0, 100]
+        assert lookup(db_session, skip=10) == [10, 100]
+    finally:
+        other_session.close()
+
+    assert calls == [(0, 100), (10, 100)]
+
+
+def test_explicit_key_builder():
+    """Test a key builder decides which calls share an entry"""
+    from utils.cache import cached
+
+    calls = []
+
+    @cached(ttl=60, key_prefix="test_builder", key_builder=lambda arguments: arguments["search"].lower())
+    def search(search: str, request_id: int = 0):
+        calls.append(search)
+        return search.lower()
+
+    assert search("Silva", request_id=1) == "silva"
+    assert search("SILVA", request_id=2) == "silva"
+    assert calls == ["Silva"]
+
+
+def test_orm_results_are_cached_as_detached_schemas(db_session, test_service):
+    """Test cached services are schema objects usable after the session is gone"""
+    from crud import get_services
+    from schemas import Service as ServiceSchema
+    from utils.cache import cache
+
+    cache.clear()
+    services = get_services(db_session)
+    db_session.close()
+
+    assert services and all(isinstance(service, ServiceSchema) for service in services)
+    assert test_service.nome in [service.nome for service in services]
+
+
+def test_repeated_requests_hit_the_cache():
+    """Test repeated public service listings are answered without SQL"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from utils.cache import cache
+
+    cache.clear()
+    client = TestClient(app, base_url="http://localhost")
+    before = cache.get_stats()["by_prefix"].get("services", {}).get("hits", 0)
+
+    responses = [client.get("/api/public/services") for _ in range(20)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert [response.headers["X-SQL-Queries"] for response in responses[1:]] == ["0"] * 19
+    assert cache.get_stats()["by_prefix"]["services"]["hits"] - before >= 19
+
+
+def test_repeated_dashboard_requests_hit_the_cache(admin_user, barber_user):
+    """Test the async dashboard handler is cached across users and sessions"""
+    from fastapi.testclient import TestClient
+    from auth import get_current_active_user
+    from main import app
+    from utils.cache import cache
+
+    cache.clear()
+    client = TestClient(app, base_url="http://localhost")
+    try:
+        responses = []
+        for user in (admin_user, barber_user) * 5:
+            app.dependency_overrides[get_current_active_user] = lambda user=user: user
+            responses.append(client.get("/api/dashboard/recent-activities"))
+    finally:
+        app.dependency_overrides.pop(get_current_active_user, None)
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+    assert [response.headers["X-SQL-Queries"] for response in responses[1:]] == ["0"] * 9
+
+
+def test_committed_updates_invalidate_cached_reads(db_session, test_client):
+    """Test updates through any code path invalidate cached client listings"""
+    from crud import get_clients, update_client
+    from schemas import ClientUpdate
+    from utils.cache import cache
+
+    cache.clear()
+    client_id = test_client.id
+    assert test_client.nome in [c.nome for c in get_clients(db_session)]
+
+    update_client(db_session, client_id, ClientUpdate(nome="Nome Atualizado"))
+    assert "Nome Atualizado" in [c.nome for c in get_clients(db_session)]
+
+    # Bulk statements skip the flush but still bump the version on commit
+    from models import Client
+    db_session.query(Client).filter(Client.id == client_id).update({"nome": "Nome em Lote"})
+    db_session.commit()
+    assert "Nome em Lote" in [c.nome for c in get_clients(db_session)]
+
+
+def test_rollback_keeps_table_versions(db_session):
+    """Test only committed writes bump versions"""
+    from sqlalchemy.orm import Session
+    from models import Service
+    from utils.cache import get_table_versions
+
+    before = get_table_versions(("services",))
+    # Own session on the test transaction: its rollback only undoes a savepoint
+    session = Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+    try:
+        session.add(Service(nome="Não salvo", preco=10.0, duracao_minutos=15))
+        session.flush()
+        session.rollback()
+    finally:
+        session.close()
+
+    assert get_table_versions(("services",)) == before
+
+
+def test_evicted_version_never_reuses_old_entries():
+    """Test a lost version key starts a new version instead of resurrecting old entries"""
+    from utils.cache import VERSION_KEY_PREFIX, cache, cached, get_table_versions
+
+    calls = []
+
+    @cached(ttl=60, key_prefix="test_versions", tables=("test_table",))
+    def read():
+        calls.append(1)
+        return len(calls)
+
+    assert read() == 1
+    assert read() == 1
+    version = get_table_versions(("test_table",))
+
+    cache.delete(VERSION_KEY_PREFIX + "test_table")
+    assert get_table_versions(("test_table",)) != version
+    assert read() == 2
+
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_long_ttls_only_on_shared_backends(monkeypatch, tmp_path, shared):
+    """Test per-process caches keep short TTLs: other workers' version bumps never reach them"""
+    import utils.cache
+    from utils.cache import cache_client_data
+
+    backend = SQLiteCache(str(tmp_path / "shared.db")) if shared else SimpleCache()
+    monkeypatch.setattr(utils.cache, "cache", backend)
+    ttls = {}
+    original_set = backend.set
+    monkeypatch.setattr(backend, "set", lambda key, value, ttl=300: (ttls.__setitem__(key, ttl), original_set(key, value, ttl)))
+
+    @cache_client_data()
+    def read():
+        return "clientes"
+
+    read()
+    assert [ttl for key, ttl in ttls.items() if key.startswith("clients:read:")] == [6 * 3600 if shared else 300]
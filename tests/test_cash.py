@@ -162,4 +162,104 @@ def test_barber_cash_isolation(client: TestClient, barber_headers, auth_headers)
     admin_cash_id = admin_response.json()["id"]
     
     barber_cash_ids = [cash["id"] for cash in barber_cash_list]
-    assert admin_cash_id not in barber_cash_ids
\ No newline at end of file
+    assert admin_cash_id not in barber_cash_ids
+
+def _open_register(db_session, operador_id, minutes_ago=5):
+    """Open a register a few minutes in the past, so every new sale falls in its window"""
+    from datetime import timedelta
+    from crud import open_cash_register
+    from schemas import CashRegisterOpen
+
+    register = open_cash_register(db_session, CashRegisterOpen(valor_inicial=100.0), operador_id)
+    register.data_abertura = register.data_abertura - timedelta(minutes=minutes_ago)
+    db_session.commit()
+    return register
+
+
+def _sell(db_session, vendedor_id, servico_id, valor, metodo):
+    from crud import create_sale
+    from schemas import SaleCreate, SaleItemCreate
+
+    return create_sale(db_session, SaleCreate(
+        itens=[SaleItemCreate(servico_id=servico_id, quantidade=1, preco_unitario=valor)],
+        metodo_pagamento=metodo
+    ), vendedor_id, allow_price_override=True)
+
+
+def test_running_balance_follows_sales(db_session, admin_user, test_service):
+    """Test create_sale keeps the open register's running totals"""
+    from crud import get_cash_register_balance
+    from models import PaymentMethod
+
+    register = _open_register(db_session, admin_user.id)
+    _sell(db_session, admin_user.id, test_service.id, 30.0, PaymentMethod.DINHEIRO)
+    _sell(db_session, admin_user.id, test_service.id, 45.0, PaymentMethod.CARTAO_CREDITO)
+    _sell(db_session, admin_user.id, test_service.id, 20.0, PaymentMethod.PIX)
+
+    db_session.refresh(register)
+    balance = get_cash_register_balance(register)
+    assert balance["valor_vendas_dinheiro"] == 30.0
+    assert balance["valor_vendas_cartao"] == 45.0
+    assert balance["valor_vendas_pix"] == 20.0
+    assert balance["total_vendas"] == 95.0
+    assert balance["saldo_dinheiro"] == 130.0
+
+
+def test_close_totals_scoped_to_register(db_session, admin_user, barber_user, test_service, query_counter):
+    """Test closing only counts the operator's sales since opening, in one query"""
+    from datetime import timedelta
+    from crud import close_cash_register, get_cash_register_sales_totals
+    from models import PaymentMethod, Sale
+    from schemas import CashRegisterClose
+
+    admin_register = _open_register(db_session, admin_user.id)
+    # Sale made earlier the same day, before the register was opened
+    db_session.add(Sale(
+        vendedor_id=admin_user.id, total=500.0, metodo_pagamento=PaymentMethod.DINHEIRO,
+        criado_em=admin_register.data_abertura - timedelta(minutes=25)
+    ))
+    db_session.commit()
+
+    _open_register(db_session, barber_user.id)
+    _sell(db_session, admin_user.id, test_service.id, 30.0, PaymentMethod.DINHEIRO)
+    _sell(db_session, admin_user.id, test_service.id, 25.0, PaymentMethod.CARTAO_DEBITO)
+    _sell(db_session, barber_user.id, test_service.id, 70.0, PaymentMethod.DINHEIRO)
+    db_session.refresh(admin_register)
+
+    with query_counter:
+        totals = get_cash_register_sales_totals(db_session, admin_register)
+    assert query_counter.count == 1
+    assert totals == {"valor_vendas_dinheiro": 30.0, "valor_vendas_cartao": 25.0, "valor_vendas_pix": 0.0}
+
+    closed = close_cash_register(db_session, admin_register.id, CashRegisterClose(valor_final=130.0))
+    assert (closed.valor_vendas_dinheiro, closed.valor_vendas_cartao, closed.valor_vendas_pix) == (30.0, 25.0, 0.0)
+
+
+@pytest.fixture(params=["America/Sao_Paulo", "Asia/Tokyo"])
+def local_timezone(request, monkeypatch):
+    """Run the test with the process clock behind and ahead of UTC"""
+    import time
+
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_register_window_ignores_local_timezone(db_session, admin_user, test_service, local_timezone):
+    """Test opening time and sale times come from the same (database) clock"""
+    from datetime import timedelta
+    from crud import get_cash_register_sales_totals, open_cash_register
+    from models import PaymentMethod, Sale
+    from schemas import CashRegisterOpen
+
+    earlier = _sell(db_session, admin_user.id, test_service.id, 40.0, PaymentMethod.DINHEIRO)
+    db_session.get(Sale, earlier.id).criado_em -= timedelta(hours=1)
+    db_session.commit()
+
+    register = open_cash_register(db_session, CashRegisterOpen(valor_inicial=0.0), admin_user.id)
+    _sell(db_session, admin_user.id, test_service.id, 30.0, PaymentMethod.PIX)
+
+    totals = get_cash_register_sales_totals(db_session, register)
+    assert totals == {"valor_vendas_dinheiro": 0.0, "valor_vendas_cartao": 0.0, "valor_vendas_pix": 30.0}
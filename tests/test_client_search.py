@@ -0,0 +1,89 @@
+import pytest
+
+from models import Client, User, UserRole
+from utils import client_search
+from utils.client_search import autocomplete_clients, ensure_client_search, fold_text, search_clients
+from utils.lgpd import anonymize_client_data
+
+
+def _add_clients(db_session, *rows):
+    clients = [Client(nome=nome, email=email, telefone=telefone) for nome, email, telefone in rows]
+    db_session.add_all(clients)
+    db_session.commit()
+    return clients
+
+
+@pytest.fixture
+def clients(db_session):
+    return _add_clients(
+        db_session,
+        ("José Antônio Souza", "jose.souza@test.com", "(11) 99988-7766"),
+        ("Joana Lima", "joana@test.com", "11 3333-4444"),
+        ("Antonio Jose Prado", "aprado@test.com", "21987650000"),
+        ("Márcia Josefina", "marcia@test.com", "31 90000-1111"),
+    )
+
+
+@pytest.fixture(params=[None, "fts5"])
+def index(request, db_session, monkeypatch):
+    """Run each search test with the LIKE fallback and with the SQLite FTS5 index"""
+    monkeypatch.setattr(client_search, "_indexed", {})
+    if request.param:
+        # Created inside the test transaction, so it is rolled back with it
+        assert ensure_client_search(db_session.connection()) == request.param
+    return request.param
+
+
+def test_search_keys_follow_create_update_and_anonymize(db_session, clients):
+    """Test the normalized name and phone digits are kept in sync by the ORM"""
+    jose = clients[0]
+    assert (jose.nome_normalizado, jose.telefone_digitos) == ("jose antonio souza", "11999887766")
+    assert fold_text("  ÇÃO  Ñú ") == "cao nu"
+
+    jose.nome = "Zé Ângelo"
+    db_session.commit()
+    assert jose.nome_normalizado == "ze angelo"
+
+    anonymize_client_data(db_session, jose.id)
+    db_session.refresh(jose)
+    assert jose.nome_normalizado == f"cliente_anonimizado_{jose.id}"
+    assert jose.telefone_digitos is None
+
+
+def test_search_matches_accent_folded_word_prefixes(db_session, clients, index):
+    """Test every word must match the start of a name/email word, accents ignored"""
+    names = lambda term: [c.nome for c in search_clients(db_session, term)]
+
+    assert set(names("jose")) == {"José Antônio Souza", "Antonio Jose Prado", "Márcia Josefina"}
+    assert set(names("ANTÔNIO jos")) == {"José Antônio Souza", "Antonio Jose Prado"}
+    assert names("marcia@test") == ["Márcia Josefina"]
+    assert names("(11) 99988") == ["José Antônio Souza"]
+    assert names("!!!") == []
+    if index == "fts5":
+        # bm25 with the name weighted above email: the name hit ranks first
+        assert names("souza")[0] == "José Antônio Souza"
+
+
+def test_search_follows_updates(db_session, clients, index):
+    """Test the index sees renamed and new clients"""
+    clients[1].nome = "Joana Vieira"
+    db_session.commit()
+    _add_clients(db_session, ("Vieira Neto", "neto@test.com", "11911112222"))
+
+    assert {c.nome for c in search_clients(db_session, "vieira")} == {"Joana Vieira", "Vieira Neto"}
+    assert search_clients(db_session, "lima") == []
+
+
+def test_autocomplete_endpoint(db_session, clients, api_client):
+    """Test suggestions are names (or phones) starting with the typed text, alphabetically"""
+    client = api_client(User(id=1, role=UserRole.RECEPCIONISTA, ativo=True))
+    response = client.get("/api/clients/autocomplete", params={"q": "Jo"})
+    assert response.status_code == 200
+    assert [s["nome"] for s in response.json()] == ["Joana Lima", "José Antônio Souza"]
+    assert set(response.json()[0]) == {"id", "nome", "telefone", "email"}
+
+    response = client.get("/api/clients/autocomplete", params={"q": "2198", "limit": 5})
+    assert [s["nome"] for s in response.json()] == ["Antonio Jose Prado"]
+    assert client.get("/api/clients/autocomplete", params={"q": ""}).status_code == 422
+
+    assert autocomplete_clients(db_session, "márcia jo")[0].nome == "Márcia Josefina"
@@ -0,0 +1,179 @@
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Appointment, AppointmentStatus, DailyMetric, PaymentMethod, Sale, Service, User, UserRole
+from schemas import AppointmentUpdate, SaleCreate, SaleItemCreate
+from crud import create_sale, get_dashboard_stats, update_appointment
+from utils.daily_metrics import (
+    APPOINTMENTS, APPOINTMENTS_BY_BARBER, NEW_CLIENTS, SALES, SALES_BY_SERVICE,
+    metric_breakdown, metric_totals, rebuild_daily_metrics
+)
+
+
+def _rollup(db_session):
+    return sorted(
+        (row.dia, row.metrica, row.chave, round(row.valor, 2), row.quantidade)
+        for row in db_session.query(DailyMetric).all()
+    )
+
+
+def test_sales_update_rollup_on_commit(db_session, admin_user, test_service):
+    """Test create_sale keeps today's revenue, method and service totals"""
+    today = date.today()
+    before = metric_totals(db_session, [SALES], today, today)[SALES]
+
+    for metodo in (PaymentMethod.PIX, PaymentMethod.PIX, PaymentMethod.DINHEIRO):
+        create_sale(db_session, SaleCreate(
+            itens=[SaleItemCreate(servico_id=test_service.id, quantidade=2, preco_unitario=25.0)],
+            metodo_pagamento=metodo
+        ), admin_user.id, allow_price_override=True)
+
+    after = metric_totals(db_session, [SALES], today, today)[SALES]
+    assert after["valor"] - before["valor"] == pytest.approx(150.0)
+    assert after["quantidade"] - before["quantidade"] == 3
+
+    assert metric_breakdown(db_session, SALES, today, today)["pix"]["quantidade"] >= 2
+    by_service = metric_breakdown(db_session, SALES_BY_SERVICE, today, today)[str(test_service.id)]
+    assert by_service == {"valor": 150.0, "quantidade": 6}
+
+
+def test_appointment_changes_move_counts(db_session, test_client, barber_user, test_service):
+    """Test rescheduling and status changes move counts between days and statuses"""
+    first_day = date.today() + timedelta(days=10)
+    second_day = first_day + timedelta(days=1)
+    appointment = Appointment(
+        cliente_id=test_client.id,
+        barbeiro_id=barber_user.id,
+        servico_id=test_service.id,
+        data_hora=datetime.combine(first_day, datetime.min.time()).replace(hour=10)
+    )
+    db_session.add(appointment)
+    db_session.commit()
+
+    assert metric_breakdown(db_session, APPOINTMENTS, first_day, first_day) == {
+        "agendado": {"valor": 30.0, "quantidade": 1}
+    }
+
+    update_appointment(db_session, appointment.id, AppointmentUpdate(
+        data_hora=datetime.combine(second_day, datetime.min.time()).replace(hour=11),
+        status=AppointmentStatus.CONFIRMADO
+    ))
+
+    assert metric_breakdown(db_session, APPOINTMENTS, first_day, first_day) == {}
+    assert metric_breakdown(db_session, APPOINTMENTS, second_day, second_day) == {
+        "confirmado": {"valor": 30.0, "quantidade": 1}
+    }
+    by_barber = metric_breakdown(db_session, APPOINTMENTS_BY_BARBER, second_day, second_day)
+    assert by_barber[str(barber_user.id)]["quantidade"] == 1
+
+
+def test_backfill_matches_incremental_rollup(db_session, admin_user, test_client, test_service):
+    """Test a full rebuild produces exactly the incrementally maintained rows"""
+    for days in (0, 3, 40):
+        db_session.add(Sale(
+            vendedor_id=admin_user.id, total=40.0, metodo_pagamento=PaymentMethod.CARTAO_DEBITO,
+            criado_em=datetime.now() - timedelta(days=days)
+        ))
+        db_session.add(Appointment(
+            cliente_id=test_client.id, barbeiro_id=admin_user.id, servico_id=test_service.id,
+            data_hora=datetime.now() + timedelta(days=days, hours=1)
+        ))
+    db_session.commit()
+    incremental = _rollup(db_session)
+
+    rebuild_daily_metrics(db_session.connection())
+    assert _rollup(db_session) == incremental
+
+
+def test_dashboard_and_quick_stats_read_the_rollup(db_session, admin_user, test_service, query_counter):
+    """Test the rollup agrees with the fact tables and reads are period independent"""
+    db_session.add(Sale(vendedor_id=admin_user.id, total=55.0, metodo_pagamento=PaymentMethod.PIX))
+    db_session.commit()
+
+    month_start = date.today().replace(day=1)
+    scanned = db_session.query(func.sum(Sale.total)).filter(
+        Sale.criado_em >= datetime.combine(month_start, datetime.min.time())
+    ).scalar()
+    assert get_dashboard_stats(db_session)["faturamento_mes"] == pytest.approx(scanned)
+
+    with query_counter:
+        metric_totals(db_session, [SALES, APPOINTMENTS, NEW_CLIENTS], date.today() - timedelta(days=7))
+        metric_totals(db_session, [SALES, APPOINTMENTS, NEW_CLIENTS], date.today() - timedelta(days=365))
+    assert query_counter.count == 2
+
+
+def test_service_price_change_shifts_appointment_values(db_session, test_client, barber_user, test_service,
+                                                        query_counter):
+    """Test a price change updates every booked day with a fixed number of statements"""
+    other = Service(nome="Barba", preco=20.0, duracao_minutos=15)
+    db_session.add(other)
+    db_session.commit()
+    # Two years of bookings: far more days than MAX_DAY_LOCKS
+    days = [date.today() - timedelta(days=offset) for offset in range(0, 730, 7)]
+    for day in days:
+        for servico_id in (test_service.id, other.id):
+            db_session.add(Appointment(
+                cliente_id=test_client.id, barbeiro_id=barber_user.id, servico_id=servico_id,
+                data_hora=datetime.combine(day, datetime.min.time()).replace(hour=9)
+            ))
+    db_session.commit()
+    db_session.refresh(test_service)
+
+    with query_counter:
+        test_service.preco = 45.0
+        db_session.commit()
+
+    # UPDATE services, then one grouped SELECT and one upsert per appointment metric
+    assert query_counter.count == 5
+    assert not [statement for statement in query_counter.statements if statement.lstrip().upper().startswith(("DELETE", "LOCK"))]
+    for day in days[:3]:
+        assert metric_breakdown(db_session, APPOINTMENTS, day, day) == {"agendado": {"valor": 65.0, "quantidade": 2}}
+
+    # Set while expired: the old price is read from the database
+    test_service.preco = 50.0
+    db_session.commit()
+    rollup = _rollup(db_session)
+    rebuild_daily_metrics(db_session.connection())
+    assert _rollup(db_session) == rollup
+
+
+def test_concurrent_sales_keep_every_count(tmp_path):
+    """Test sales committed at once on the same day all reach the rollup (TEST_DATABASE_URL: e.g. PostgreSQL)"""
+    engine = create_engine(
+        os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path}/concurrent.db",
+        connect_args={} if os.getenv("TEST_DATABASE_URL") else {"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Sessions = sessionmaker(bind=engine)
+    with Sessions() as setup:
+        seller = User(nome="Caixa", email="caixa@test.com", telefone="11900000000", senha_hash="x",
+                      role=UserRole.ADMIN, ativo=True)
+        service = Service(nome="Corte", preco=30.0, duracao_minutos=30)
+        setup.add_all([seller, service])
+        setup.commit()
+        seller_id, service_id = seller.id, service.id
+
+    def sell(_):
+        with Sessions() as session:
+            for _ in range(5):
+                create_sale(session, SaleCreate(
+                    itens=[SaleItemCreate(servico_id=service_id)], metodo_pagamento=PaymentMethod.PIX
+                ), seller_id)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(sell, range(8)))
+
+        with Sessions() as session:
+            assert session.query(Sale).count() == 40
+            totals = metric_totals(session, [SALES])[SALES]
+            assert totals == {"valor": pytest.approx(1200.0), "quantidade": 40}
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
@@ -0,0 +1,87 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Appointment, Sale
+from crud import get_appointments, get_sales
+from utils.date_ranges import date_range_bounds, day_bounds, filter_date_range, filter_day
+
+
+def test_day_bounds_are_half_open():
+    """Test a day maps to [midnight, next midnight)"""
+    start, end = day_bounds(date(2024, 2, 29))
+    assert start == datetime(2024, 2, 29)
+    assert end == datetime(2024, 3, 1)
+
+
+def test_date_range_bounds_include_end_date():
+    """Test the end date is fully included"""
+    start, end = date_range_bounds(date(2024, 1, 1), date(2024, 1, 31))
+    assert start == datetime(2024, 1, 1)
+    assert end == datetime(2024, 2, 1)
+
+
+def test_get_appointments_day_filter(db_session, test_client, barber_user, test_service):
+    """Test appointments at both ends of the day are included and the next midnight is not"""
+    day = date.today() + timedelta(days=3)
+    start, end = day_bounds(day)
+    for data_hora in (start, end - timedelta(minutes=1), end):
+        db_session.add(Appointment(
+            cliente_id=test_client.id,
+            barbeiro_id=barber_user.id,
+            servico_id=test_service.id,
+            data_hora=data_hora
+        ))
+    db_session.commit()
+
+    appointments = get_appointments(db_session, date_filter=day, barbeiro_id=barber_user.id)
+    assert sorted(a.data_hora for a in appointments) == [start, end - timedelta(minutes=1)]
+
+
+def test_get_sales_date_range(db_session, admin_user):
+    """Test sales date range filter on criado_em"""
+    from models import PaymentMethod
+
+    for criado_em in (datetime(2024, 1, 1, 10), datetime(2024, 1, 31, 23, 59), datetime(2024, 2, 1, 0, 0, 1)):
+        db_session.add(Sale(
+            vendedor_id=admin_user.id,
+            total=10.0,
+            metodo_pagamento=PaymentMethod.PIX,
+            criado_em=criado_em
+        ))
+    db_session.commit()
+
+    sales = get_sales(db_session, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31))
+    assert len([s for s in sales if s.vendedor_id == admin_user.id]) == 2
+
+
+@pytest.fixture
+def plan_session():
+    """Fresh in-memory database with every declared index"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _plan(session, query):
+    statement = query.statement.compile(session.bind, compile_kwargs={"literal_binds": True})
+    return " ".join(str(row[-1]) for row in session.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+
+def test_range_filters_use_indexes(plan_session):
+    """Test the range predicates are served by the composite indexes"""
+    barber_day = filter_day(
+        plan_session.query(Appointment.id).filter(Appointment.barbeiro_id == 1),
+        Appointment.data_hora, date(2024, 1, 1)
+    )
+    assert "ix_appointments_barbeiro_data_hora" in _plan(plan_session, barber_day)
+    assert "data_hora>" in _plan(plan_session, barber_day)
+
+    monthly_sales = filter_date_range(
+        plan_session.query(Sale.total), Sale.criado_em, date(2024, 1, 1), date(2024, 1, 31)
+    )
+    assert "SCAN sales" not in _plan(plan_session, monthly_sales)
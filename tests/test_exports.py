@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Appointment, AppointmentStatus, PaymentMethod, Sale
+from utils.exports import export_query, iter_export
+
+
+@pytest.fixture
+def api(api_client, admin_user):
+    return api_client(admin_user)
+
+
+@pytest.fixture
+def appointments(db_session, test_client, barber_user, test_service):
+    rows = [
+        Appointment(cliente_id=test_client.id, barbeiro_id=barber_user.id, servico_id=test_service.id,
+                    data_hora=datetime(2024, 3, day, 10), status=AppointmentStatus.CONCLUIDO)
+        for day in (1, 10, 20)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def test_ndjson_export_with_date_range(api, appointments, test_client, barber_user):
+    """Test appointments stream as one JSON object per line with joined names"""
+    response = api.get("/api/exports/appointments", params={"start_date": "2024-03-05", "end_date": "2024-03-31"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "X-Export-Watermark" in response.headers
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [appointments[1].id, appointments[2].id]
+    assert rows[0]["cliente_nome"] == test_client.nome
+    assert rows[0]["barbeiro_nome"] == barber_user.nome
+    assert rows[0]["status"] == "concluido"
+    assert rows[0]["data_hora"] == "2024-03-10T10:00:00"
+
+
+def test_csv_export_and_incremental_filter(api, db_session, barber_user):
+    """Test CSV has a header row and updated_since keeps only newer sales"""
+    db_session.add_all([
+        Sale(vendedor_id=barber_user.id, total=50.0, metodo_pagamento=PaymentMethod.PIX,
+             criado_em=datetime(2024, 1, 1, 12)),
+        Sale(vendedor_id=barber_user.id, total=80.0, metodo_pagamento=PaymentMethod.DINHEIRO,
+             criado_em=datetime(2030, 1, 1, 12)),
+    ])
+    db_session.commit()
+
+    response = api.get("/api/exports/sales", params={"format": "csv", "updated_since": "2029-12-31T00:00:00"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["total"], row["metodo_pagamento"], row["vendedor_nome"]) for row in rows] == [
+        ("80.0", "dinheiro", barber_user.nome)
+    ]
+
+    assert api.get("/api/exports/users").status_code == 404
+    assert api.get("/api/exports/sales", params={"format": "xml"}).status_code == 422
+    assert api.get("/api/exports/sales", params={"start_date": "2024-02-01", "end_date": "2024-01-01"}).status_code == 400
+
+
+def test_export_streams_in_batches(db_session, appointments):
+    """Test rows are written one yield_per batch at a time"""
+    chunks = list(iter_export(db_session.connection(), export_query("appointments"), "csv", batch_size=2))
+    assert len(chunks) >= 2
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0].startswith("id,data_hora,status")
+    assert len(lines) == 1 + db_session.query(Appointment).count()
+
+
+def test_export_runs_on_its_own_session(db_engine):
+    """Test the body streams after the request's session is closed (FastAPI < 0.118) and releases its connection"""
+    from sqlalchemy.orm import Session
+
+    checked_out = db_engine.pool.checkedout()
+    request_session = Session(bind=db_engine)
+    body = iter_export(request_session.get_bind(), export_query("clients"), "csv")
+    request_session.close()
+
+    assert b"".join(body).startswith(b"id,nome,email")
+    assert db_engine.pool.checkedout() == checked_out
+
+
+def test_export_requires_admin(api_client, barber_user):
+    """Test only admins can pull the full data set"""
+    response = api_client(barber_user).get("/api/exports/clients")
+    assert response.status_code == 403
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from crud import get_appointments, list_clients
+from models import Appointment, Client, Sale, PaymentMethod, User, UserRole
+from utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, next_cursor
+
+
+@pytest.fixture
+def clients(db_session):
+    """Seven clients sharing the same stored criado_em (one CURRENT_TIMESTAMP)"""
+    rows = [Client(nome=f"Cliente {i}", telefone="11999999999") for i in range(7)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def _walk(fetch, column, limit):
+    """All pages following next_cursor from the start"""
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        pages.append([item.id for item in page])
+        cursor = next_cursor(page, column, limit)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_ties_once(db_session, clients):
+    """Test rows with equal sort values are split across pages without gaps or repeats"""
+    expected = [c.id for c in db_session.query(Client).order_by(Client.criado_em, Client.id)]
+    pages = _walk(lambda cursor: list_clients.__wrapped__(db_session, limit=3, cursor=cursor), Client.criado_em, 3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [client_id for page in pages for client_id in page] == expected
+    # skip/limit keeps working, in the same order
+    assert [c.id for c in list_clients.__wrapped__(db_session, skip=3, limit=3)] == expected[3:6]
+
+
+def test_cursor_survives_deleted_row_and_rejects_garbage(db_session, barber_user, test_client, test_service):
+    """Test a cursor whose row is gone falls back to its encoded value; tampered cursors get 400"""
+    start = datetime(2024, 5, 1, 9)
+    appointments = [
+        Appointment(cliente_id=test_client.id, barbeiro_id=barber_user.id, servico_id=test_service.id,
+                    data_hora=start + timedelta(hours=i))
+        for i in range(4)
+    ]
+    db_session.add_all(appointments)
+    db_session.commit()
+    cursor = encode_cursor(appointments[1].data_hora, appointments[1].id)
+    db_session.delete(appointments[1])
+    db_session.commit()
+
+    page = get_appointments(db_session, barbeiro_id=barber_user.id, cursor=cursor)
+    assert [a.id for a in page] == [appointments[2].id, appointments[3].id]
+    assert decode_cursor(cursor, Appointment.data_hora) == (start + timedelta(hours=1), appointments[1].id)
+
+    with pytest.raises(HTTPException) as excinfo:
+        get_appointments(db_session, cursor="not-a-cursor")
+    assert excinfo.value.status_code == 400
+
+
+def test_sales_endpoint_returns_next_cursor(db_session, barber_user, api_client):
+    """Test list endpoints keep their list body and send the next page's cursor in a header"""
+    start = datetime(2024, 6, 1, 10)
+    db_session.add_all([
+        Sale(vendedor_id=barber_user.id, total=10.0 * (i + 1), metodo_pagamento=PaymentMethod.PIX,
+             criado_em=start + timedelta(minutes=i))
+        for i in range(5)
+    ])
+    db_session.commit()
+
+    client = api_client(User(id=barber_user.id, role=UserRole.ADMIN, ativo=True))
+    totals, params = [], {"limit": 2, "start_date": "2024-06-01", "end_date": "2024-06-01"}
+    while True:
+        response = client.get("/api/pos/sales", params=params)
+        assert response.status_code == 200
+        totals += [sale["total"] for sale in response.json()]
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+    assert totals == [10.0, 20.0, 30.0, 40.0, 50.0]
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from auth import authenticate_user
+from models import User, UserRole
+from utils.passwords import PasswordHasher, hash_cost, hash_password, needs_rehash, verify_password
+
+
+def test_hash_uses_configured_rounds(monkeypatch):
+    """Test BCRYPT_ROUNDS sets the work factor and rehash detection follows it"""
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    hashed = hash_password("segredo")
+    assert hash_cost(hashed) == 5
+    assert verify_password("segredo", hashed)
+    assert not verify_password("outro", hashed)
+    assert not verify_password("segredo", "not-a-bcrypt-hash")
+
+    assert not needs_rehash(hashed)
+    monkeypatch.setenv("BCRYPT_ROUNDS", "6")
+    assert needs_rehash(hashed)
+
+
+def test_login_rehashes_when_cost_changes(db_session, monkeypatch):
+    """Test a successful login upgrades a hash made with another work factor"""
+    user = User(
+        nome="Rehash", email="rehash@test.com", role=UserRole.RECEPCIONISTA,
+        senha_hash=bcrypt.hashpw(b"senha123", bcrypt.gensalt(4)).decode()
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    assert not authenticate_user(db_session, "rehash@test.com", "errada")
+    assert hash_cost(user.senha_hash) == 4
+
+    assert authenticate_user(db_session, "rehash@test.com", "senha123")
+    db_session.refresh(user)
+    assert hash_cost(user.senha_hash) == 5
+    assert verify_password("senha123", user.senha_hash)
+
+
+def test_pool_is_bounded_and_reports_queue_depth():
+    """Test calls beyond max_pending are rejected with 503 and stats show the queue"""
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+    running = hasher._submit(release.wait)
+    queued = hasher._submit(release.wait)
+
+    deadline = time.time() + 5
+    while hasher.get_stats()["running"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    stats = hasher.get_stats()
+    assert (stats["running"], stats["queued"]) == (1, 1)
+
+    with pytest.raises(HTTPException) as excinfo:
+        hasher._submit(release.wait)
+    assert excinfo.value.status_code == 503
+
+    release.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    stats = hasher.get_stats()
+    assert (stats["running"], stats["queued"], stats["completed"], stats["rejected"]) == (0, 0, 2, 1)
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from auth import create_access_token, get_current_principal
+from crud import update_user
+from schemas import UserUpdate
+from utils.principals import Principal, PrincipalCache, principal_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_principals():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def auth_db(db_session):
+    """Session for the dependency: its rollback must not end the test transaction"""
+    session = Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+
+
+def _selects(counter):
+    return [statement for statement in counter.statements if statement.lstrip().upper().startswith("SELECT")]
+
+
+def _credentials(user, **claims):
+    return SimpleNamespace(credentials=create_access_token(data={"sub": user.email, **claims}))
+
+
+def test_cached_principal_skips_the_database(auth_db, admin_user, query_counter):
+    """Test only the first request for a token loads the user row"""
+    token = _credentials(admin_user)
+    with query_counter:
+        first = get_current_principal(token, auth_db)
+    assert len(_selects(query_counter)) == 1
+
+    with query_counter:
+        second = get_current_principal(token, auth_db)
+    assert len(_selects(query_counter)) == 1
+    assert first == second == Principal.from_user(admin_user)
+
+
+def test_access_change_revokes_issued_tokens(db_session, auth_db, admin_user):
+    """Test changing the role bumps token_version and old tokens get 401"""
+    old_token = _credentials(admin_user, ver=0)
+    get_current_principal(old_token, auth_db)
+
+    update_user(db_session, admin_user.id, UserUpdate(nome="Renomeado"))
+    assert admin_user.token_version == 0
+
+    update_user(db_session, admin_user.id, UserUpdate(role="barbeiro"))
+    assert admin_user.token_version == 1
+    with pytest.raises(HTTPException) as excinfo:
+        get_current_principal(old_token, auth_db)
+    assert excinfo.value.detail == "Token revogado"
+
+    principal = get_current_principal(_credentials(admin_user, ver=1), auth_db)
+    assert principal.role.value == "barbeiro"
+
+
+def test_newer_token_version_reloads_stale_entry(db_session, auth_db, admin_user, query_counter):
+    """Test a token issued after a change made by another process bypasses the cache"""
+    principal_cache.set(admin_user.email, Principal.from_user(admin_user))
+    admin_user.token_version = 1
+    db_session.commit()
+    token = _credentials(admin_user, ver=1)
+
+    with query_counter:
+        principal = get_current_principal(token, auth_db)
+    assert len(_selects(query_counter)) == 1
+    assert principal.token_version == 1
+
+
+def test_cache_evicts_least_recent_and_expired(monkeypatch):
+    """Test the cache stays within maxsize and drops entries past the TTL"""
+    now = [100.0]
+    monkeypatch.setattr("utils.principals.time.monotonic", lambda: now[0])
+    cache = PrincipalCache(maxsize=2, ttl=30)
+    principal = Principal(1, "a@test.com", "A", None, True, 0)
+
+    cache.set("a", principal)
+    cache.set("b", principal)
+    assert cache.get("a") == principal
+    cache.set("c", principal)
+    assert cache.get("b") is None
+    assert cache.get("a") == principal
+
+    now[0] += 31
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 1
@@ -0,0 +1,105 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+from main import app
+from models import Appointment, Client, Sale, SaleItem, PaymentMethod
+from crud import get_appointments, get_client, get_sales, with_load_profile
+
+
+@pytest.fixture
+def appointments(db_session, barber_user, test_service):
+    """Five appointments, each for a different client"""
+    start = datetime.now() + timedelta(days=1)
+    created = []
+    for i in range(5):
+        client = Client(nome=f"Cliente {i}", email=f"perfil{i}@test.com", telefone="11900000000")
+        db_session.add(client)
+        db_session.flush()
+        appointment = Appointment(
+            cliente_id=client.id,
+            barbeiro_id=barber_user.id,
+            servico_id=test_service.id,
+            data_hora=start + timedelta(hours=i)
+        )
+        db_session.add(appointment)
+        created.append(appointment)
+    db_session.commit()
+    db_session.expire_all()
+    return created
+
+
+def test_calendar_profile_loads_relations_in_one_query(db_session, barber_user, appointments, query_counter):
+    """Test the calendar profile avoids one lazy load per appointment"""
+    barbeiro_id = barber_user.id
+
+    with query_counter:
+        rows = get_appointments(db_session, barbeiro_id=barbeiro_id, load="calendar")
+        names = [(a.servico.nome, a.cliente.nome, a.barbeiro.nome) for a in rows]
+
+    assert len(names) == 5
+    assert query_counter.count == 1
+
+
+def test_sale_listing_profile_loads_items(db_session, admin_user, test_service, query_counter):
+    """Test sale listing loads every sale's items with a single extra query"""
+    for _ in range(3):
+        sale = Sale(vendedor_id=admin_user.id, total=30.0, metodo_pagamento=PaymentMethod.PIX)
+        db_session.add(sale)
+        db_session.flush()
+        db_session.add(SaleItem(
+            venda_id=sale.id, servico_id=test_service.id,
+            quantidade=1, preco_unitario=30.0, subtotal=30.0
+        ))
+    db_session.commit()
+    db_session.expire_all()
+
+    with query_counter:
+        sales = get_sales(db_session)
+        items = [item.subtotal for sale in sales for item in sale.itens]
+
+    assert len(items) >= 3
+    assert query_counter.count == 2
+
+
+def test_export_profile(db_session, test_client, barber_user, test_service, query_counter):
+    """Test the LGPD export profile loads appointments with service and barber"""
+    from utils.lgpd import get_client_data_export
+
+    for i in range(4):
+        db_session.add(Appointment(
+            cliente_id=test_client.id,
+            barbeiro_id=barber_user.id,
+            servico_id=test_service.id,
+            data_hora=datetime.now() + timedelta(days=i + 1)
+        ))
+    db_session.commit()
+    db_session.expire_all()
+
+    client_id = test_client.id
+
+    with query_counter:
+        export = get_client_data_export(db_session, client_id)
+
+    assert len(export["agendamentos"]) == 4
+    assert query_counter.count <= 3
+
+
+def test_unknown_profile(db_session):
+    """Test unknown profiles are rejected"""
+    with pytest.raises(ValueError):
+        with_load_profile(db_session.query(Client), Client, "nonexistent")
+
+
+def test_query_budget_middleware(monkeypatch):
+    """Test requests over the SQL budget fail and others report their count"""
+    client = TestClient(app, base_url="http://localhost")
+
+    response = client.get("/api/public/services")
+    assert response.status_code == 200
+    assert "X-SQL-Queries" in response.headers
+
+    monkeypatch.setenv("SQL_QUERY_BUDGET", "0")
+    response = client.get("/api/public/barbers")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "SQL query budget exceeded"
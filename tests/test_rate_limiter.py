@@ -0,0 +1,52 @@
+from utils.rate_limiter import RateLimiter
+
+
+def test_rules_have_separate_buckets():
+    """Test login attempts do not count against the general limit and vice versa"""
+    limiter = RateLimiter(shards=4)
+    now = 1_000_200.0
+    for _ in range(5):
+        assert limiter.check("client", "/api/auth/login", now)[0]
+    allowed, info = limiter.check("client", "/api/auth/login", now)
+    assert not allowed and info['limit'] == 5 and info['retry_after'] >= 1
+
+    allowed, info = limiter.check("client", "/api/clients/", now)
+    assert allowed and info['remaining'] == 99
+    assert limiter.check("other", "/api/auth/login", now)[0]
+    assert limiter._get_rule_for_path("/api/public/services") == (20, 60)
+    assert limiter._get_rule_for_path("/api/appointments/1") == (30, 60)
+
+
+def test_sliding_window_weights_previous_window():
+    """Test the previous window's count fades out as the sliding window moves"""
+    limiter = RateLimiter(rules={'default': (10, 60)}, shards=1)
+    start = 6000.0  # start of a window
+    for _ in range(10):
+        assert limiter.check("c", "/x", start + 30)[0]
+    allowed, info = limiter.check("c", "/x", start + 59)
+    assert not allowed
+
+    # 15s into the next window 3/4 of the previous count still applies: 7.5
+    allowed, info = limiter.check("c", "/x", start + 75)
+    assert allowed and info['remaining'] == 1
+    assert limiter.check("c", "/x", start + 75)[0]
+    allowed, info = limiter.check("c", "/x", start + 75)
+    assert not allowed and info['retry_after'] == 3  # 10 * (1 - t/60) + 2 <= 9 from t = 18s
+
+    # Idle for two windows: a fresh budget
+    allowed, info = limiter.check("c", "/x", start + 200)
+    assert allowed and info['remaining'] == 9
+
+
+def test_idle_buckets_are_evicted_and_total_is_bounded():
+    """Test expired buckets are dropped as traffic passes and the LRU cap holds"""
+    limiter = RateLimiter(rules={'default': (10, 60)}, shards=1, max_buckets=50)
+    for client in range(200):
+        limiter.check(client, "/x", 60.0)
+    stats = limiter.get_stats()
+    assert stats['tracked_buckets'] == 50
+    assert stats['evicted'] == 150
+
+    for client in range(1000, 1030):
+        limiter.check(client, "/x", 1000.0)
+    assert limiter.get_stats()['tracked_buckets'] == 30
@@ -0,0 +1,143 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import app
+from auth import get_current_active_user
+from models import User, UserRole
+from utils.cache import bump_table_versions
+from utils import report_jobs
+from utils.report_jobs import ReportJobManager
+
+DATABASE_URL = "sqlite:///./test.db"
+
+
+@pytest.fixture
+def manager(db_engine, tmp_path, monkeypatch):
+    """Job manager running reports on a thread instead of a process pool"""
+    monkeypatch.setattr(database, "DATABASE_URL", DATABASE_URL)
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield ReportJobManager(jobs_dir=str(tmp_path), executor=executor)
+    executor.shutdown(wait=True)
+
+
+def _wait(manager, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("report job did not finish")
+
+
+def test_job_runs_and_is_downloadable_with_its_token(manager):
+    """Test a job reports progress to completion and only its token unlocks the file"""
+    job = manager.submit("financial", "excel", 1, date(2024, 1, 1), date(2024, 1, 31))
+    assert job["status"] == "pending"
+
+    finished = _wait(manager, job["job_id"])
+    assert finished["status"] == "done", finished["error"]
+    assert finished["progress"] == 100
+
+    artifact = manager.artifact(job["job_id"], job["token"])
+    with open(artifact["artifact_path"], "rb") as f:
+        assert f.read(2) == b"PK"
+    assert manager.artifact(job["job_id"], "wrong-token") is None
+    assert manager.get("../etc/passwd") is None
+
+
+def test_identical_requests_reuse_the_job_until_data_changes(manager):
+    """Test the artifact cache key follows the owner and the table versions"""
+    first = manager.submit("clients", "pdf", 1)
+    assert manager.submit("clients", "pdf", 1)["job_id"] == first["job_id"]
+    assert manager.submit("clients", "pdf", 2)["job_id"] != first["job_id"]
+    assert manager.submit("clients", "excel", 1)["job_id"] != first["job_id"]
+
+    bump_table_versions("clients")
+    assert manager.submit("clients", "pdf", 1)["job_id"] != first["job_id"]
+
+
+def test_expired_jobs_are_removed(manager):
+    """Test cleanup deletes job files and artifacts past their TTL"""
+    manager.artifact_ttl = -1
+    job = manager.submit("clients", "excel", 1)
+    manager.executor.shutdown(wait=True)
+    assert os.path.exists(job["artifact_path"])
+
+    assert manager.get(job["job_id"]) is None
+    manager.cleanup_expired()
+    assert os.listdir(manager.jobs_dir) == []
+
+
+def test_job_cleaned_up_while_running_stays_gone(manager):
+    """Test progress after cleanup doesn't recreate a partial job file"""
+    job_path = os.path.join(manager.jobs_dir, "a1b2c3.json")
+    report_jobs._update_job(job_path, status="running", progress=50)
+    report_jobs._record_crash(manager.executor.submit(int, "x"), job_path)
+    assert not os.path.exists(job_path)
+
+    # A file left without expires_at (written by an older version) reads as expired
+    report_jobs._write_json(job_path, {"status": "failed", "error": "boom"})
+    assert manager.get("a1b2c3") is None
+
+
+def test_job_endpoints(manager, monkeypatch):
+    """Test submit, status and download through the API"""
+    monkeypatch.setattr(report_jobs, "_manager", manager)
+    admin = User(id=1, nome="Admin", email="admin@test.com", role=UserRole.ADMIN, ativo=True)
+    app.dependency_overrides[get_current_active_user] = lambda: admin
+    try:
+        client = TestClient(app, base_url="http://localhost")
+
+        response = client.post("/api/reports/jobs", json={"tipo": "appointments", "formato": "excel"})
+        assert response.status_code == 400
+
+        response = client.post("/api/reports/jobs", json={"tipo": "clients", "formato": "excel"})
+        assert response.status_code == 202
+        job = response.json()
+        assert "token" not in job and "artifact_path" not in job
+
+        _wait(manager, job["job_id"])
+        status = client.get(f"/api/reports/jobs/{job['job_id']}").json()
+        assert status["status"] == "done"
+
+        download = client.get(status["download_url"])
+        assert download.status_code == 200
+        assert download.content[:2] == b"PK"
+
+        forged = client.get(f"/api/reports/jobs/{job['job_id']}/download", params={"token": "x"})
+        assert forged.status_code == 404
+
+        # Another (non-admin) user can neither read the job nor reuse it
+        app.dependency_overrides[get_current_active_user] = lambda: User(
+            id=2, nome="Recepção", email="recepcao@test.com", role=UserRole.RECEPCIONISTA, ativo=True
+        )
+        assert client.get(f"/api/reports/jobs/{job['job_id']}").status_code == 404
+        response = client.post("/api/reports/jobs", json={"tipo": "clients", "formato": "excel"})
+        assert response.json()["job_id"] != job["job_id"]
+        _wait(manager, response.json()["job_id"])
+
+        app.dependency_overrides[get_current_active_user] = lambda: admin
+        assert client.get(f"/api/reports/jobs/{response.json()['job_id']}").status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_current_active_user, None)
+
+
+def test_job_runs_in_a_spawned_worker(db_engine, tmp_path, monkeypatch):
+    """Test the default process pool: the worker imports the app and reads DATABASE_URL itself"""
+    monkeypatch.setenv("DATABASE_URL", DATABASE_URL)
+    manager = ReportJobManager(jobs_dir=str(tmp_path), max_workers=1)
+    try:
+        job = manager.submit("clients", "excel", 1)
+        finished = _wait(manager, job["job_id"], timeout=120)
+        assert finished["status"] == "done", finished["error"]
+        with open(finished["artifact_path"], "rb") as f:
+            assert f.read(2) == b"PK"
+    finally:
+        manager.executor.shutdown(wait=True)
@@ -0,0 +1,92 @@
+import pytest
+from datetime import date, datetime, timedelta
+import openpyxl
+
+from models import Appointment, AppointmentStatus, PaymentMethod, Sale, SaleItem
+from utils.reports import ReportGenerator, iter_report_chunks
+
+
+@pytest.fixture
+def report_data(db_session, admin_user, barber_user, test_client, test_service):
+    """Sales and appointments spread over three days of January 2024"""
+    for day in (1, 2, 2):
+        sale = Sale(
+            vendedor_id=admin_user.id, total=30.0,
+            metodo_pagamento=PaymentMethod.PIX if day == 1 else PaymentMethod.DINHEIRO,
+            criado_em=datetime(2024, 1, day, 10)
+        )
+        db_session.add(sale)
+        db_session.flush()
+        db_session.add(SaleItem(
+            venda_id=sale.id, servico_id=test_service.id, quantidade=1, preco_unitario=30.0, subtotal=30.0
+        ))
+    for hour, status in ((9, AppointmentStatus.CONCLUIDO), (10, AppointmentStatus.CANCELADO), (11, AppointmentStatus.AGENDADO)):
+        db_session.add(Appointment(
+            cliente_id=test_client.id, barbeiro_id=barber_user.id, servico_id=test_service.id,
+            data_hora=datetime(2024, 1, 3, hour), status=status
+        ))
+    db_session.commit()
+
+
+def _workbook(report_file):
+    return openpyxl.load_workbook(report_file)
+
+
+def test_financial_excel(db_session, report_data, barber_user, test_service):
+    """Test the streamed financial workbook has every sheet with the right numbers"""
+    wb = _workbook(ReportGenerator(db_session).generate_financial_report(date(2024, 1, 1), date(2024, 1, 3)))
+
+    assert wb.sheetnames == [
+        "Resumo Financeiro", "Vendas Diárias", "Métodos de Pagamento", "Performance Serviços", "Performance Barbeiros"
+    ]
+    summary = {row[0]: row[1] for row in wb["Resumo Financeiro"].iter_rows(min_row=5, values_only=True)}
+    assert summary["Total de Vendas"] == "R$ 90.00"
+    assert summary["Total de Agendamentos"] == 3
+    assert summary["PIX"] == "R$ 30.00"
+
+    daily = list(wb["Vendas Diárias"].iter_rows(min_row=2, values_only=True))
+    assert [row[1] for row in daily] == ["30.00", "60.00", "0.00"]
+
+    services = list(wb["Performance Serviços"].iter_rows(min_row=2, values_only=True))
+    assert services == [(test_service.nome, 3, "90.00", 3, "30.00")]
+
+    barbers = list(wb["Performance Barbeiros"].iter_rows(min_row=2, values_only=True))
+    assert barbers == [(barber_user.nome, 3, 1, 1, "33.3%", "30.00")]
+
+
+def test_appointment_and_client_excel(db_session, report_data, test_client):
+    """Test the listing workbooks are written row by row"""
+    generator = ReportGenerator(db_session)
+
+    appointments = _workbook(generator.generate_appointment_report(date(2024, 1, 1), date(2024, 1, 31)))
+    rows = list(appointments.active.iter_rows(min_row=5, values_only=True))
+    assert [row[0] for row in rows] == ["03/01/2024 09:00", "03/01/2024 10:00", "03/01/2024 11:00"]
+
+    clients = _workbook(generator.generate_client_report())
+    row = next(r for r in clients.active.iter_rows(min_row=2, values_only=True) if r[0] == test_client.nome)
+    assert row[5:] == (3, "03/01/2024")
+
+
+def test_report_chunks_close_the_file(db_session, report_data):
+    """Test the response iterator streams the whole file and closes it"""
+    report_file = ReportGenerator(db_session).generate_appointment_report(date(2024, 1, 1), date(2024, 1, 31), "pdf")
+    chunks = list(iter_report_chunks(report_file, chunk_size=256))
+
+    assert len(chunks) > 1
+    assert b"".join(chunks).startswith(b"%PDF")
+    assert report_file.closed
+
+
+def test_financial_data_is_grouped_in_sql(db_session, report_data, barber_user, test_service, query_counter):
+    """Test the financial numbers come from a fixed number of grouped queries"""
+    from utils.report_data import financial_report_data
+
+    with query_counter:
+        data = financial_report_data(db_session, date(2024, 1, 1), date(2024, 1, 3))
+    assert query_counter.count == 7
+
+    assert data["total_revenue"] == 90.0
+    assert data["daily"] == {date(2024, 1, 1): 30.0, date(2024, 1, 2): 60.0}
+    assert list(data["payment_methods"]) == ["dinheiro", "pix"]
+    assert data["services"][test_service.nome] == {"sales_count": 3, "sales_total": 90.0, "appointments": 3}
+    assert data["barbers"][barber_user.nome] == {"appointments": 3, "completed": 1, "cancelled": 1, "revenue": 30.0}
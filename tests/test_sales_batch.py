@@ -0,0 +1,115 @@
+import logging
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from crud import create_sale, create_sales
+from models import PaymentMethod, Sale, SaleItem, Service
+from schemas import SaleCreate, SaleItemCreate
+from utils.daily_metrics import SALES_BY_SERVICE, metric_breakdown
+
+
+def _starting(counter, prefix):
+    return [statement for statement in counter.statements if statement.lstrip().upper().startswith(prefix)]
+
+
+def test_sale_prices_in_cents_with_one_lookup(db_session, admin_user, test_service, query_counter):
+    """Test missing prices come from the catalog, in one IN query, and totals are exact"""
+    barba = Service(nome="Barba", preco=0.1, duracao_minutos=15)
+    db_session.add(barba)
+    db_session.commit()
+
+    venda = SaleCreate(
+        itens=[
+            SaleItemCreate(servico_id=barba.id, quantidade=3),
+            SaleItemCreate(servico_id=test_service.id, quantidade=1, preco_unitario=19.99),
+            SaleItemCreate(servico_id=test_service.id, quantidade=2),
+        ],
+        desconto=0.2,
+        metodo_pagamento=PaymentMethod.PIX
+    )
+    vendedor_id = admin_user.id
+    with query_counter:
+        sale = create_sale(db_session, venda, vendedor_id, allow_price_override=True)
+
+    assert [item.subtotal for item in sale.itens] == [0.3, 19.99, 60.0]
+    assert sale.total == 80.09
+    assert len(_starting(query_counter, "INSERT INTO SALE_ITEMS")) == 1
+    assert len([s for s in _starting(query_counter, "SELECT") if "FROM services" in s]) == 1
+
+    stored = db_session.get(Sale, sale.id)
+    assert stored.total == 80.09 and len(stored.itens) == 3
+    by_service = metric_breakdown(db_session, SALES_BY_SERVICE, date.today(), date.today())
+    assert by_service[str(barba.id)] == {"valor": 0.3, "quantidade": 3}
+
+    with pytest.raises(HTTPException) as error:
+        create_sale(db_session, SaleCreate(
+            itens=[SaleItemCreate(servico_id=999999)], metodo_pagamento=PaymentMethod.PIX
+        ), admin_user.id)
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException):
+        create_sale(db_session, SaleCreate(
+            itens=[SaleItemCreate(servico_id=barba.id)], desconto=1, metodo_pagamento=PaymentMethod.PIX
+        ), admin_user.id)
+
+
+def test_idempotency_keys_never_double_charge(db_session, admin_user, barber_user, test_service):
+    """Test a resent key (or one repeated in the batch) returns the recorded sale"""
+    def venda(chave, preco):
+        return SaleCreate(itens=[SaleItemCreate(servico_id=test_service.id, preco_unitario=preco)],
+                          metodo_pagamento=PaymentMethod.DINHEIRO, chave_idempotencia=chave)
+
+    first = create_sales(db_session, [venda("t1-1", 10.0), venda("t1-2", 20.0), venda("t1-1", 10.0)], admin_user.id, allow_price_override=True)
+    assert first[0].id == first[2].id != first[1].id
+
+    retried = create_sales(db_session, [venda("t1-1", 10.0), venda("t1-2", 20.0), venda("t1-3", 30.0)], admin_user.id, allow_price_override=True)
+    assert [sale.id for sale in retried[:2]] == [first[0].id, first[1].id]
+    assert retried[0].itens[0].preco_unitario == 10.0
+    assert db_session.query(Sale).filter(Sale.vendedor_id == admin_user.id).count() == 3
+
+    # Keys are scoped per seller
+    other = create_sales(db_session, [venda("t1-1", 10.0)], barber_user.id, allow_price_override=True)
+    assert other[0].id not in {sale.id for sale in retried}
+
+
+def test_batch_endpoint(db_session, admin_user, test_service, api_client):
+    """Test the batch is all-or-nothing and requires idempotency keys"""
+    api = api_client(admin_user)
+    item = {"servico_id": test_service.id}
+    vendas = [
+        {"itens": [item], "metodo_pagamento": "pix", "chave_idempotencia": "pos-1"},
+        {"itens": [item, item], "metodo_pagamento": "dinheiro", "chave_idempotencia": "pos-2"},
+    ]
+    response = api.post("/api/pos/sales/batch", json={"vendas": vendas})
+    assert response.status_code == 200
+    assert [sale["total"] for sale in response.json()] == [test_service.preco, 2 * test_service.preco]
+
+    response = api.post("/api/pos/sales/batch", json={"vendas": vendas + [
+        {"itens": [{"servico_id": 999999}], "metodo_pagamento": "pix", "chave_idempotencia": "pos-3"}
+    ]})
+    assert response.status_code == 400
+    response = api.post("/api/pos/sales/batch", json={"vendas": [{"itens": [item], "metodo_pagamento": "pix"}]})
+    assert response.status_code == 400
+    assert db_session.query(SaleItem).join(Sale).filter(Sale.vendedor_id == admin_user.id).count() == 3
+
+
+def test_only_privileged_roles_override_prices(admin_user, barber_user, test_service, api_client, caplog):
+    """Test a sent price is ignored for barbers and honoured (and logged) for admins"""
+    caplog.set_level(logging.WARNING, logger="crud")
+    api = api_client(barber_user)
+    venda = {"itens": [{"servico_id": test_service.id, "preco_unitario": 0.01}], "metodo_pagamento": "pix"}
+    response = api.post("/api/pos/sale", json=venda)
+    assert response.status_code == 200
+    assert response.json()["total"] == test_service.preco
+    assert not [record for record in caplog.records if record.name == "crud"]
+
+    api = api_client(admin_user)
+    response = api.post("/api/pos/sale", json=venda)
+    assert response.status_code == 200
+    assert response.json()["total"] == 0.01
+    [record] = [record for record in caplog.records if record.name == "crud"]
+    assert record.levelno == logging.WARNING
+    assert (record.vendedor_id, record.servico_id, record.preco_cadastrado, record.preco_cobrado) == (
+        admin_user.id, test_service.id, test_service.preco, 0.01
+    )
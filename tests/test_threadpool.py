@@ -0,0 +1,59 @@
+import asyncio
+import inspect
+
+import anyio
+from fastapi.routing import APIRoute
+
+from main import app
+from utils.notifications import _run_in_background
+from utils.threadpool import configure_threadpool, get_threadpool_stats
+
+
+def test_route_handlers_are_sync():
+    """Test handlers doing DB / bcrypt work run in the threadpool, not on the event loop"""
+    async_handlers = [
+        route.path for route in app.routes
+        if isinstance(route, APIRoute) and inspect.iscoroutinefunction(route.endpoint)
+    ]
+    assert async_handlers == ["/api/health", "/api/system/stats"]
+
+
+def test_threadpool_size_is_configurable(monkeypatch):
+    """Test THREADPOOL_SIZE sizes the limiter and stats report its use"""
+    monkeypatch.setenv("THREADPOOL_SIZE", "7")
+
+    async def main():
+        assert configure_threadpool() == 7
+        started = anyio.Event()
+        release = anyio.Event()
+
+        def work():
+            anyio.from_thread.run_sync(started.set)
+            anyio.from_thread.run(release.wait)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(anyio.to_thread.run_sync, work)
+            await started.wait()
+            stats = get_threadpool_stats()
+            release.set()
+        return stats
+
+    stats = anyio.run(main)
+    assert stats["size"] == 7
+    assert stats["busy"] == 1
+    assert stats["available"] == 6
+
+
+def test_notifications_from_worker_threads_reach_the_loop():
+    """Test emails started by sync handlers are scheduled on the server's loop"""
+    sent = []
+
+    async def send():
+        sent.append(True)
+
+    async def main():
+        await anyio.to_thread.run_sync(_run_in_background, send())
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert sent == [True]